@@ -0,0 +1,179 @@
+# analytics.py
+# Cohort analytics for the Dashboard: who is ahead and who is falling behind.
+#
+# Works on the students x assessments matrix of tutorial percentages that
+# gradebook.matrix() keeps up to date (one row per Student ID, one column per
+# assessment in natural order, NaN where a student was not marked). Every
+# measure is computed for the whole cohort at once:
+#   - percentile rank of each mark within its assessment (top mark = 100),
+#   - z-score of each mark within its assessment,
+#   - delta from the student's previous marked assessment,
+#   - at-risk flags: a drop of more than RISK_DROP points between two
+#     consecutive marked assessments, or RISK_BELOW_COUNT or more marks below
+#     the RISK_BAND grade band (C by default).
+# top_k() finds the best or worst K students with np.argpartition and sorts
+# only those K; the at-risk list and the trajectories use it too. cohort() caches the analysis per data version and settings.
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import charts
+import grading
+import gradebook
+import profiling
+
+RISK_DROP = float(os.environ.get("GRADING_RISK_DROP", "15"))
+RISK_BAND = os.environ.get("GRADING_RISK_BAND", "C")
+RISK_BELOW_COUNT = int(os.environ.get("GRADING_RISK_BELOW_COUNT", "2"))
+# Most student lines drawn over the cohort bands, and most at-risk rows listed
+TRAJECTORY_LIMIT = 20
+AT_RISK_ROWS = 200
+
+
+def assessment_matrix(store):
+    """(students x assessments Percentage frame, names by Student ID)."""
+    values, names, _ = gradebook.matrix(store)
+    tutorials = [c for c in values.columns if c[0] == gradebook.TUTORIAL]
+    matrix = values[tutorials].set_axis([c[1] for c in tutorials], axis=1)
+    # Students with test results only have no row here
+    return matrix[matrix.notna().any(axis=1)], names
+
+
+def band_minimum(band=RISK_BAND, bands=None):
+    """Lowest percentage of a grade band, e.g. 50 for C with the default bands."""
+    for letter, minimum in bands or grading.GRADE_BANDS:
+        if letter == band:
+            return float(minimum)
+    raise ValueError(f"Unknown grade band: {band}")
+
+
+# -------------------------- MEASURES -------------------------- #
+def percentile_ranks(matrix):
+    """Percentile rank (0-100] of each mark among that assessment's marks; ties share a rank."""
+    return matrix.rank(pct=True) * 100
+
+
+def z_scores(matrix):
+    """(mark - assessment mean) / assessment standard deviation; 0 where all marks are equal."""
+    values = matrix.to_numpy(dtype=float)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    z = np.divide(values - mean, std, out=np.zeros_like(values), where=std > 0)
+    return pd.DataFrame(np.where(np.isnan(values), np.nan, z), index=matrix.index, columns=matrix.columns)
+
+
+def deltas(matrix):
+    """Change from the student's previous marked assessment (NaN for the first or a missing mark)."""
+    previous = matrix.ffill(axis=1).shift(1, axis=1)
+    return matrix - previous
+
+
+def latest(frame):
+    """Each row's last non-missing value, and the column it is in (-1 if none)."""
+    values = frame.to_numpy(dtype=float)
+    if not values.size:
+        return np.full(len(values), np.nan), np.full(len(values), -1)
+    present = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+    last = np.where(present.any(axis=1), last, -1)
+    return np.where(last >= 0, values[np.arange(len(values)), last], np.nan), last
+
+
+def top_k(values, k, largest=True):
+    """Positions of the k largest (or smallest) non-missing values, best first.
+
+    np.argpartition finds them in linear time; only those k are sorted.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    k = min(int(k), len(valid))
+    if k <= 0:
+        return np.array([], dtype=int)
+    key = -values[valid] if largest else values[valid]
+    part = np.argpartition(key, k - 1)[:k]
+    return valid[part[np.argsort(key[part], kind="stable")]]
+
+
+def trajectory_bands(matrix, percentiles=charts.PERCENTILES):
+    """Cohort percentiles of each assessment (rows: assessments, columns: percentiles)."""
+    values = matrix.to_numpy(dtype=float)
+    if not values.size:
+        return pd.DataFrame(columns=list(percentiles))
+    return pd.DataFrame(np.nanpercentile(values, percentiles, axis=0).T, index=matrix.columns,
+                        columns=list(percentiles))
+
+
+# -------------------------- COHORT -------------------------- #
+@profiling.timed("analytics.analyze")
+def analyze(matrix, names, drop=RISK_DROP, band=RISK_BAND, below_count=RISK_BELOW_COUNT, bands=None):
+    """One row per student plus the per-mark measures: (table, ranks, z, deltas).
+
+    table has Student ID, Name, Marked, Average, Latest, Latest Change,
+    Percentile (mean rank), Z-Score (mean), Worst Drop, Below <band>,
+    At Risk and Reason.
+    """
+    ranks, z, delta = percentile_ranks(matrix), z_scores(matrix), deltas(matrix)
+    values = matrix.to_numpy(dtype=float)
+    changes = delta.to_numpy(dtype=float)
+    last, last_at = latest(matrix)
+    rows = np.arange(len(values))
+
+    # Largest fall per student; NaN when they have fewer than two marks
+    worst = np.where(np.isnan(changes), np.inf, changes).min(axis=1, initial=np.inf)
+    worst = np.where(np.isinf(worst), np.nan, worst)
+    with np.errstate(invalid="ignore"):
+        below = (values < band_minimum(band, bands)).sum(axis=1)
+    dropped = -worst > drop
+    repeated = below >= below_count
+
+    reason = pd.Series("", index=matrix.index, dtype=object)
+    if dropped.any():
+        reason[dropped] = "dropped " + pd.Series(-worst[dropped]).round(1).map("{:g}".format).to_numpy() + " points"
+    if repeated.any():
+        below_text = f"{below_count}+ marks below {band}"
+        reason[repeated] = np.where(reason[repeated] == "", below_text, reason[repeated] + "; " + below_text)
+
+    table = pd.DataFrame({
+        "Name": names.reindex(matrix.index).to_numpy(),
+        "Marked": (~np.isnan(values)).sum(axis=1),
+        "Average": np.round(np.nanmean(values, axis=1), 2),
+        "Latest": last,
+        "Latest Change": np.where(last_at >= 0, changes[rows, last_at], np.nan),
+        "Percentile": ranks.mean(axis=1).round(1).to_numpy(),
+        "Z-Score": z.mean(axis=1).round(2).to_numpy(),
+        "Worst Drop": np.round(worst, 2),
+        f"Below {band}": below,
+        "At Risk": dropped | repeated,
+        "Reason": reason.to_numpy(),
+    }, index=matrix.index).rename_axis("Student ID").reset_index()
+    return table, ranks, z, delta
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cohort(_store, name, partition, signature, drop, band, below_count):
+    # name, partition, signature and the settings are the cache key; _store is not hashed
+    matrix, names = assessment_matrix(_store)
+    return analyze(matrix, names, drop, band, below_count)
+
+
+def cohort(store, drop=RISK_DROP, band=RISK_BAND, below_count=RISK_BELOW_COUNT):
+    """analyze() of store's scores, cached until the data changes."""
+    return _cohort(store, store.name, store.partition, repr(store.data_signature()), drop, band, below_count)
+
+
+def at_risk(table, limit=AT_RISK_ROWS):
+    """Positions of up to limit at-risk students in table, largest drop first: (positions, total)."""
+    flagged = np.flatnonzero(table["At Risk"].to_numpy(dtype=bool))
+    # Students flagged for low marks alone (fewer than two marks) sort last
+    worst = np.nan_to_num(table["Worst Drop"].to_numpy(dtype=float)[flagged], nan=np.inf)
+    return flagged[top_k(worst, limit, largest=False)], len(flagged)
+
+
+def trajectories(matrix, table, positions, limit=TRAJECTORY_LIMIT):
+    """Long Student/Assessment/Percentage rows for the students at positions of table."""
+    ids = table["Student ID"].to_numpy()[positions[:limit]]
+    labels = (table["Name"].astype("str") + " (" + table["Student ID"].astype("str") + ")").to_numpy()[positions[:limit]]
+    rows = matrix.loc[ids].set_axis(labels, axis=0).rename_axis("Student")
+    return rows.reset_index().melt(id_vars="Student", var_name="Assessment", value_name="Percentage").dropna()
@@ -0,0 +1,225 @@
+# automark.py
+# Auto-marking of multiple-choice (MCQ) papers for the Test Performance tab.
+#
+# Inputs, each a CSV or Excel file:
+#   - an answer key: one row per question with Question and Answer columns
+#     and an optional Weight (marks for the question, default 1). A single
+#     row with one column per question is accepted too.
+#   - a response sheet: one row per student with a Student ID column, an
+#     optional Name column and one column per question in the key.
+# Answers are compared ignoring case and surrounding spaces. The whole sheet
+# is marked at once as a students x questions NumPy array:
+#   - a correct answer earns the question's weight,
+#   - a wrong answer loses negative x weight,
+#   - a blank costs nothing,
+#   - and no student's MCQ mark goes below 0.
+#
+# item_statistics() reports per question:
+#   - Difficulty: share of students who answered correctly (the p-value),
+#   - Discrimination: Difficulty in the top 27% of students minus Difficulty
+#     in the bottom 27%, ranked by marks earned,
+#   - Point-biserial: correlation between getting the question right and
+#     the marks earned on the rest of the paper,
+# plus the number of blanks, the most chosen wrong answer and a review flag.
+import numpy as np
+import pandas as pd
+
+import profiling
+
+# Share of students in each of the upper and lower groups for Discrimination
+GROUP_SHARE = 0.27
+# Review flags: questions almost everyone (or almost no one) gets right,
+# and questions that do not separate strong from weak students
+EASY_ABOVE = 0.9
+HARD_BELOW = 0.2
+DISCRIMINATION_BELOW = 0.2
+
+
+def read_upload(uploaded_file):
+    """An uploaded CSV/XLSX file with every cell read as text."""
+    if uploaded_file.name.lower().endswith(".csv"):
+        return pd.read_csv(uploaded_file, dtype=str)
+    return pd.read_excel(uploaded_file, dtype=str)
+
+
+def _answers(values):
+    """values as stripped, upper-case text; blank cells become NaN."""
+    text = values.astype("str").str.strip().str.upper()
+    return text.where(text != "")
+
+
+def _find_column(df, word, exclude=()):
+    for column in df.columns:
+        if word in column.lower() and column not in exclude:
+            return column
+    return None
+
+
+# -------------------------- ANSWER KEY -------------------------- #
+def parse_key(key):
+    """Answer key as a frame of Question, Answer and Weight, in paper order."""
+    key = key.rename(columns=lambda c: str(c).strip())
+    columns = {c.lower(): c for c in key.columns}
+    if "question" in columns and "answer" in columns:
+        parsed = pd.DataFrame({
+            "Question": key[columns["question"]].astype("str").str.strip(),
+            "Answer": _answers(key[columns["answer"]]),
+            "Weight": pd.to_numeric(key[columns["weight"]], errors="coerce") if "weight" in columns else 1.0,
+        })
+        parsed = parsed[parsed["Question"].notna() & (parsed["Question"] != "")]
+    elif len(key) == 1:
+        parsed = pd.DataFrame({"Question": list(key.columns), "Answer": _answers(key.iloc[0]).to_numpy(), "Weight": 1.0})
+    else:
+        raise ValueError("The answer key needs Question and Answer columns "
+                         "(or a single row with one column per question).")
+    parsed["Weight"] = parsed["Weight"].fillna(1.0).astype(float)
+    if parsed.empty:
+        raise ValueError("The answer key has no questions.")
+    duplicated = parsed.loc[parsed["Question"].duplicated(), "Question"].tolist()
+    if duplicated:
+        raise ValueError(f"Questions listed twice in the answer key: {', '.join(duplicated)}")
+    unanswered = parsed.loc[parsed["Answer"].isna(), "Question"].tolist()
+    if unanswered:
+        raise ValueError(f"No answer given for: {', '.join(unanswered)}")
+    if (parsed["Weight"] < 0).any():
+        raise ValueError("Question weights cannot be negative.")
+    return parsed.reset_index(drop=True)
+
+
+# -------------------------- MARKING -------------------------- #
+@profiling.timed("automark.mark")
+def mark(responses, key, negative=0.0):
+    """Mark every student on the response sheet against a parsed key.
+
+    Returns (marks, correct, chosen):
+      - marks has Student ID, Name, Correct, Wrong, Blank, Earned (marks for
+        correct answers) and MCQ (after negative marking) per student,
+      - correct (bool) and chosen (normalized answers, NaN when blank) are
+        students x questions arrays for item_statistics().
+    """
+    responses = responses.rename(columns=lambda c: str(c).strip())
+    questions = key["Question"].tolist()
+    missing = [q for q in questions if q not in responses.columns]
+    if missing:
+        raise ValueError(f"The response sheet has no column for: {', '.join(missing[:10])}")
+    id_col = _find_column(responses, "id", exclude=questions)
+    if id_col is None:
+        raise ValueError("The response sheet needs a Student ID column.")
+    name_col = _find_column(responses, "name", exclude=questions)
+
+    responses = responses[responses[id_col].notna() & (responses[id_col].astype("str").str.strip() != "")]
+    # Normalize the whole block as one column, then back to students x questions
+    block = responses[questions].to_numpy(dtype=object)
+    chosen = _answers(pd.Series(block.ravel(), dtype=object)).to_numpy(dtype=object).reshape(block.shape)
+    answered = pd.notna(chosen)
+    correct = chosen == key["Answer"].to_numpy(dtype=object)
+    wrong = answered & ~correct
+    weights = key["Weight"].to_numpy()
+    earned = correct @ weights
+
+    marks = pd.DataFrame({
+        "Student ID": responses[id_col].astype("str").str.strip().to_numpy(),
+        "Name": responses[name_col].to_numpy() if name_col else None,
+        "Correct": correct.sum(axis=1),
+        "Wrong": wrong.sum(axis=1),
+        "Blank": (~answered).sum(axis=1),
+        "Earned": earned,
+        "MCQ": np.clip(earned - negative * (wrong @ weights), 0, None).round(2),
+    })
+    return marks, correct, chosen
+
+
+def _flag(difficulty, discrimination):
+    if np.isnan(difficulty):
+        return ""
+    if not np.isnan(discrimination) and discrimination < 0:
+        return "Negative discrimination"
+    if difficulty > EASY_ABOVE:
+        return "Very easy"
+    if difficulty < HARD_BELOW:
+        return "Very hard"
+    if not np.isnan(discrimination) and discrimination < DISCRIMINATION_BELOW:
+        return "Low discrimination"
+    return ""
+
+
+@profiling.timed("automark.item_statistics")
+def item_statistics(key, correct, chosen):
+    """Per-question Difficulty, Discrimination and Point-biserial (see above)."""
+    n, count = correct.shape
+    weights = key["Weight"].to_numpy()
+    hits = correct.astype(float)
+    difficulty = hits.mean(axis=0) if n else np.full(count, np.nan)
+
+    earned = hits @ weights
+    discrimination = np.full(count, np.nan)
+    if n >= 2:
+        group = max(1, int(round(GROUP_SHARE * n)))
+        order = np.argsort(earned, kind="stable")
+        discrimination = hits[order[-group:]].mean(axis=0) - hits[order[:group]].mean(axis=0)
+
+    # Correlate each question with the rest of the paper, not a total that includes it
+    rest = earned[:, None] - hits * weights
+    x = hits - hits.mean(axis=0)
+    y = rest - rest.mean(axis=0)
+    spread = np.sqrt((x ** 2).sum(axis=0) * (y ** 2).sum(axis=0))
+    point_biserial = np.divide((x * y).sum(axis=0), spread, out=np.full(count, np.nan), where=spread > 0)
+
+    # One count over every (question, wrong answer) pair; the first per question is the most chosen
+    answered = pd.notna(chosen)
+    rows, columns = np.nonzero(answered & ~correct)
+    wrong = pd.DataFrame({"question": columns, "answer": chosen[rows, columns]})
+    counts = wrong.value_counts().reset_index().drop_duplicates("question").set_index("question")
+    top_wrong = [
+        f"{counts.at[i, 'answer']} ({counts.at[i, 'count']})" if i in counts.index else ""
+        for i in range(count)
+    ]
+    return pd.DataFrame({
+        "Question": key["Question"],
+        "Answer": key["Answer"],
+        "Weight": weights,
+        "Difficulty": difficulty.round(3),
+        "Discrimination": discrimination.round(3),
+        "Point-biserial": point_biserial.round(3),
+        "Blank": (~answered).sum(axis=0),
+        "Most Chosen Wrong Answer": top_wrong,
+        "Flag": [_flag(p, d) for p, d in zip(difficulty, discrimination)],
+    })
+
+
+# -------------------------- TEST RESULTS -------------------------- #
+def test_scores(mcq, saq, mcq_total, saq_total, desired_total, weight):
+    """(raw, scaled, weighted) test scores, as entered in the Test Performance tab.
+
+    Works on single marks and on arrays of them.
+    """
+    scaling_factor = desired_total / (mcq_total + saq_total) if (mcq_total + saq_total) > 0 else 1
+    raw = mcq + saq
+    scaled = raw * scaling_factor
+    return raw, scaled, (scaled / desired_total) * weight
+
+
+def test_rows(marks, test_name, mcq_total, saq_total, desired_total, weight, saved=None):
+    """Test result rows (data_store.TEST_COLUMNS) for the marked students.
+
+    A student's SAQ mark already saved for this test (in saved) is kept, so
+    auto-marking the MCQ part does not wipe it; otherwise SAQ is 0.
+    """
+    saq = np.zeros(len(marks))
+    if saved is not None and not saved.empty:
+        previous = saved.assign(**{"Student ID": saved["Student ID"].astype("str")})
+        previous = previous.drop_duplicates("Student ID", keep="last").set_index("Student ID")["SAQ"]
+        saq = marks["Student ID"].map(previous).fillna(0.0).to_numpy(dtype=float)
+    mcq = marks["MCQ"].to_numpy(dtype=float)
+    raw, scaled, weighted = test_scores(mcq, saq, mcq_total, saq_total, desired_total, weight)
+    return pd.DataFrame({
+        "Student ID": marks["Student ID"],
+        "Student Name": marks["Name"],
+        "Test Name": test_name,
+        "MCQ": mcq,
+        "SAQ": saq,
+        "Raw Score": raw,
+        "Scaled Score": scaled,
+        "Weighted (%)": weighted,
+        "Total": desired_total,
+    })
@@ -0,0 +1,102 @@
+# benchmarks/fixtures.py
+# Seeded generator for realistic grading-app data files.
+#
+# write_fixtures(folder, students, scores, tests) writes student_list.csv,
+# student_scores.csv and test_results.csv in the app's own formats:
+#   - roster names drawn from common first/last names, so some collide,
+#   - one score row per (student, tutorial) pair, graded with
+#     grading.grade_frame, plus ~2% re-saves left in the append-only log,
+#   - test results with MCQ/SAQ marks scaled the way Tab 6 does.
+# The same arguments always produce the same files.
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FIRST_NAMES = [
+    "Aisyah", "Ahmad", "Nur", "Muhammad", "Siti", "Wei", "Mei", "Ravi", "Priya", "John",
+    "Sarah", "Daniel", "Aina", "Hafiz", "Farah", "Kumar", "Li", "Chen", "Amir", "Nadia",
+]
+LAST_NAMES = [
+    "Abdullah", "Ismail", "Tan", "Lim", "Wong", "Rahman", "Hassan", "Singh", "Lee", "Ng",
+    "Ibrahim", "Yusof", "Chong", "Raj", "Omar", "Ali", "Goh", "Teo", "Bakar", "Zainal",
+]
+TESTS = ["Test 1", "Test 2", "Midterm", "Final"]
+
+
+def roster(students, rng):
+    names = (
+        np.asarray(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), students)].astype(object)
+        + " "
+        + np.asarray(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), students)].astype(object)
+    )
+    ids = [f"2024{i:06d}" for i in range(students)]
+    return pd.DataFrame({"Student ID": ids, "Name": names})
+
+
+def score_rows(student_list, rows, rng):
+    from data_store import CRITERIA
+    from grading import grade_frame, make_rng
+
+    # Enough tutorials that most students have most of them marked
+    tutorials = max(1, math.ceil(rows / max(len(student_list), 1) / 0.9))
+    pairs = rng.choice(len(student_list) * tutorials, min(rows, len(student_list) * tutorials), replace=False)
+    who, tutorial = np.divmod(pairs, tutorials)
+    marks = np.clip(rng.normal(2.6, 1.0, (len(pairs), len(CRITERIA))).round(), 0, 4).astype(int)
+    df = pd.DataFrame(marks, columns=CRITERIA)
+    df.insert(0, "Assessment", [f"Tutorial {t + 1}" for t in tutorial])
+    df.insert(0, "Name", student_list["Name"].to_numpy()[who])
+    df.insert(0, "Student ID", student_list["Student ID"].to_numpy()[who])
+    df = grade_frame(df, rng=make_rng(int(rng.integers(0, 2**31))))
+    # ~2% of marks saved twice, as happens when a grader corrects a submission
+    resaved = df.sample(frac=0.02, random_state=int(rng.integers(0, 2**31)))
+    return pd.concat([df, resaved], ignore_index=True)
+
+
+def test_rows(student_list, rows, rng):
+    pairs = rng.choice(len(student_list) * len(TESTS), min(rows, len(student_list) * len(TESTS)), replace=False)
+    who, test = np.divmod(pairs, len(TESTS))
+    mcq = rng.integers(0, 21, len(pairs)).astype(float)
+    saq = rng.integers(0, 31, len(pairs)).astype(float)
+    raw = mcq + saq
+    scaled = raw * 2
+    return pd.DataFrame({
+        "Student ID": student_list["Student ID"].to_numpy()[who],
+        "Student Name": student_list["Name"].to_numpy()[who],
+        "Test Name": np.asarray(TESTS)[test],
+        "MCQ": mcq, "SAQ": saq, "Raw Score": raw, "Scaled Score": scaled,
+        "Weighted (%)": scaled / 100 * 10, "Total": 100,
+    })
+
+
+def write_fixtures(folder, students, scores, tests=None, seed=0):
+    """Write the three data files into folder. Returns their row counts."""
+    rng = np.random.default_rng(seed)
+    student_list = roster(students, rng)
+    score_df = score_rows(student_list, scores, rng)
+    test_df = test_rows(student_list, tests if tests is not None else students, rng)
+    student_list.to_csv(os.path.join(folder, "student_list.csv"), index=False)
+    score_df.to_csv(os.path.join(folder, "student_scores.csv"), index=False)
+    test_df.to_csv(os.path.join(folder, "test_results.csv"), index=False)
+    return {"students": len(student_list), "scores": len(score_df), "tests": len(test_df)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write seeded grading-app fixtures")
+    parser.add_argument("folder")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--scores", type=int, default=10000)
+    parser.add_argument("--tests", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    os.makedirs(args.folder, exist_ok=True)
+    print(write_fixtures(args.folder, args.students, args.scores, args.tests, args.seed))
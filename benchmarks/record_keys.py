@@ -0,0 +1,144 @@
+# benchmarks/record_keys.py
+# Regression checks for how records are matched by their key columns.
+#
+# Each check runs against a fresh data directory for every backend:
+#   - leading zeros: a Student ID such as "001" is saved, edited and
+#     re-loaded; the edit must replace the record (same Record ID, one live
+#     row) and the ID must come back as "001".
+#   - summaries on re-save: re-saving leading-zero IDs (marks and a test
+#     record) must replace their rows in the dashboard summaries, not add
+#     to them, and summaries.check() must agree with a full recompute.
+#   - delete-all with numeric IDs: marks saved with integer Student IDs are
+#     deleted through the Student Scores picker's value (text); every record
+#     of that student must go, and the others must stay.
+#   - roster leading zeros: an imported roster with IDs such as "001" must
+#     list them as "001" in the student picker and the bulk grid.
+# A check prints what went wrong; the script exits non-zero if any failed.
+#
+#     python benchmarks/record_keys.py [--backend csv|sqlite|all]
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+sys.path.insert(0, os.path.abspath(ROOT))
+
+import pandas as pd  # noqa: E402
+
+import data_store  # noqa: E402
+import grading  # noqa: E402
+import roster_import  # noqa: E402
+import tables  # noqa: E402
+
+
+def _open_backend(backend):
+    os.chdir(tempfile.mkdtemp(prefix=f"record_keys_{backend}_"))
+    if backend == "sqlite":
+        from sqlite_store import SqliteBackend
+        return SqliteBackend(os.path.abspath(data_store.DB_FILE))
+    return data_store.CsvBackend()
+
+
+def _marks(student_id, name, assessment="T1", score=2):
+    return grading.grade_frame(pd.DataFrame([{
+        "Student ID": student_id, "Name": name, "Assessment": assessment,
+        "Accuracy": score, "Clarity": score, "Depth": score, "Completeness": score, "Presentation": score,
+    }]))
+
+
+# -------------------------- CHECKS -------------------------- #
+def check_leading_zeros(store):
+    store.append_scores(_marks("001", "Ana", score=2))
+    first = store.load_scores()
+    store.append_scores(_marks("001", "Ana", score=4))
+    scores = store.load_scores()
+    problems = []
+    if len(scores) != 1:
+        problems.append(f"{len(scores)} live rows after editing 001/T1, expected 1")
+    if scores["Student ID"].tolist() != ["001"]:
+        problems.append(f"Student ID loaded as {scores['Student ID'].tolist()}, expected ['001']")
+    if scores[data_store.RECORD_ID].tolist() != first[data_store.RECORD_ID].tolist():
+        problems.append("the edit got a new Record ID instead of keeping the record's")
+    if len(scores) and int(scores["Total"].iloc[-1]) != 20:
+        problems.append(f"Total is {scores['Total'].iloc[-1]} after the edit, expected 20")
+    return problems
+
+
+def check_resave_summaries(store):
+    store.append_scores(pd.concat([_marks("001", "Ana", score=2), _marks("002", "Ben", score=3)], ignore_index=True))
+    store.append_scores(_marks("001", "Ana", score=4))
+    test = pd.DataFrame([{
+        "Student ID": "007", "Student Name": "Cy", "Test Name": "Midterm",
+        "MCQ": 10, "SAQ": 5, "Raw Score": 15, "Scaled Score": 15, "Weighted (%)": 3.0, "Total": 100,
+    }])
+    store.append_test_results(test)
+    store.append_test_results(test.assign(MCQ=20, **{"Raw Score": 25, "Scaled Score": 25, "Weighted (%)": 5.0}))
+    problems = []
+    if store.count_scores("T1") != 2:
+        problems.append(f"summaries count {store.count_scores('T1')} marks for T1, expected 2")
+    graded = int(store.grade_counts("T1")["Count"].sum())
+    if graded != 2:
+        problems.append(f"summaries count {graded} grades for T1, expected 2")
+    mcq = store.test_overall("Midterm")["MCQ"]
+    if mcq["mean"] != 20:
+        problems.append(f"Midterm MCQ mean is {mcq['mean']}, expected 20 (the re-saved record only)")
+    problems += store.summaries.check()
+    return problems
+
+
+def check_delete_numeric_ids(store):
+    marks = pd.concat([_marks(2024000001, "Ana", "T1"), _marks(2024000001, "Ana", "T2"), _marks(2024000002, "Ben")],
+                      ignore_index=True)
+    store.append_scores(marks)
+    # The Danger Zone picker lists Student IDs from the Student Scores view
+    ids, _ = tables.TableView(store.load_scores()).search("2024000001", "Student ID")
+    deleted = store.delete_scores(ids[0]) if ids else 0
+    left = store.load_scores()["Student ID"].astype(str).tolist()
+    problems = []
+    if ids != ["2024000001"]:
+        problems.append(f"picker offered {ids}, expected ['2024000001']")
+    if deleted != 2:
+        problems.append(f"delete_scores reported {deleted} deleted, expected 2")
+    if left != ["2024000002"]:
+        problems.append(f"live Student IDs after the delete: {left}, expected ['2024000002']")
+    if store.count_scores() != 1:
+        problems.append(f"summaries count {store.count_scores()} marks, expected 1")
+    problems += store.summaries.check()
+    return problems
+
+
+def check_roster_leading_zeros(store):
+    roster_import.save(store, pd.DataFrame({"Student ID": ["001", "010"], "Name": ["Ana", "Ben"]}))
+    student_list, id_col, _ = data_store.load_roster(store.roster_file)
+    index = data_store.load_roster_index(store.roster_file)
+    problems = []
+    if student_list[id_col].tolist() != ["001", "010"]:
+        problems.append(f"bulk grid IDs {student_list[id_col].tolist()}, expected ['001', '010']")
+    if index.ids != ["001", "010"]:
+        problems.append(f"picker IDs {index.ids}, expected ['001', '010']")
+    return problems
+
+
+CHECKS = [check_leading_zeros, check_resave_summaries, check_delete_numeric_ids, check_roster_leading_zeros]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record key regression checks")
+    parser.add_argument("--backend", choices=["csv", "sqlite", "all"], default="all")
+    args = parser.parse_args()
+
+    failed = 0
+    for backend in (["csv", "sqlite"] if args.backend == "all" else [args.backend]):
+        for check in CHECKS:
+            problems = check(_open_backend(backend))
+            failed += bool(problems)
+            print(f"{backend}: {check.__name__}: {'ok' if not problems else 'FAILED'}")
+            for problem in problems:
+                print(f"    {problem}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
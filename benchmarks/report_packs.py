@@ -0,0 +1,60 @@
+# benchmarks/report_packs.py
+# Scaling of the per-student report packs (reports.py) with worker processes.
+#
+# On seeded fixtures (fixtures.py) it builds every student's report into a ZIP
+# with 1, 2, 4, ... worker processes, up to the number of cores, and reports
+# wall time, reports per second and the speed-up over one worker. The time
+# includes starting the worker processes.
+#
+#     python benchmarks/report_packs.py [--students 400] [--format pdf] [--workers 1,2,4]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from fixtures import write_fixtures
+
+
+def worker_counts(limit):
+    counts, n = [], 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    return counts + [limit]
+
+
+def measure(students, fmt, counts):
+    import data_store
+    import reports
+
+    with tempfile.TemporaryDirectory() as folder:
+        write_fixtures(folder, students, students * 10, students * 2)
+        os.chdir(folder)
+        store = data_store.backend("")
+        print(f"{students} students, {fmt} reports, {os.cpu_count()} cores")
+        print(f"{'workers':>8}{'time':>10}{'reports/s':>12}{'speed-up':>10}")
+        base = None
+        for workers in counts:
+            start = time.perf_counter()
+            count = reports.build_zip(store, os.path.join(folder, "reports.zip"), fmt, workers=workers)
+            seconds = time.perf_counter() - start
+            base = base or seconds
+            print(f"{workers:>8}{seconds:>9.1f}s{count / seconds:>12.1f}{base / seconds:>9.1f}x")
+        os.chdir(os.path.dirname(folder))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report pack generation time by worker count")
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--format", default="pdf", choices=["xlsx", "pdf"])
+    parser.add_argument("--workers", help="comma-separated worker counts (default 1, 2, 4, ... up to the cores)")
+    args = parser.parse_args()
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else worker_counts(os.cpu_count() or 1)
+    measure(args.students, args.format, counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/rerun_latency.py
+# Before/after measurement for fragment-scoped reruns in Marks Entry and
+# Test Performance.
+#
+# Each score change in the browser used to rerun the whole script (all six
+# tabs). It now reruns only the entry fragment. This script drives the app
+# headlessly with Streamlit's AppTest on a synthetic data set and reports,
+# per score change:
+#   before: wall time of a full-script rerun with GRADING_NAVIGATION=tabs
+#   after:  time spent in the fragment body (what a fragment rerun executes)
+#
+# AppTest always runs the whole script, so "after" is read from the
+# section_timings the app records for its fragments.
+#
+#     python benchmarks/rerun_latency.py [--students 300] [--rows 20000] [--changes 10]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from fixtures import write_fixtures
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "streamlit_app.py")
+
+
+def measure(navigation, changes):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["GRADING_NAVIGATION"] = navigation
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.run()
+    at.text_input(key="password").input("letmein").run()
+    if navigation == "sidebar":
+        at.sidebar.radio(key="selected_tab").set_value("Marks Entry").run()
+
+    run_ms, fragment_ms = [], []
+    for i in range(changes):
+        at.number_input[0].set_value(i % 5)
+        start = time.perf_counter()
+        at.run()
+        run_ms.append((time.perf_counter() - start) * 1000)
+        fragment_ms.append(at.session_state["section_timings"]["Marks Entry panel (fragment)"])
+    return statistics.median(run_ms), statistics.median(fragment_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--changes", type=int, default=10)
+    args = parser.parse_args()
+
+    app = os.path.abspath(APP)
+    with tempfile.TemporaryDirectory() as folder:
+        write_fixtures(folder, args.students, args.rows)
+        os.chdir(folder)
+        sys.path.insert(0, os.path.dirname(app))
+        tabs_run, fragment = measure("tabs", args.changes)
+        sidebar_run, _ = measure("sidebar", args.changes)
+
+    n = args.changes
+    print(f"{args.rows} score rows, {args.students} students, {n} score changes in Marks Entry")
+    print(f"{'':32}{'reruns':>16}{'median ms/change':>20}")
+    print(f"{'before (all tabs, full rerun)':32}{f'{n} app':>16}{tabs_run:>20.1f}")
+    print(f"{'sidebar section, full rerun':32}{f'{n} app':>16}{sidebar_run:>20.1f}")
+    print(f"{'after (fragment rerun)':32}{f'0 app + {n} frag':>16}{fragment:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
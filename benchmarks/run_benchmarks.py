@@ -0,0 +1,327 @@
+# benchmarks/run_benchmarks.py
+# Scenario benchmarks for the app at 1k / 10k / 100k score records.
+#
+# Seeded fixtures (fixtures.py) are generated once per size; each scenario
+# then runs in a fresh subprocess on its own copy of the data, driving
+# streamlit_app.py headlessly with Streamlit's AppTest:
+#   first_paint       first run of a new session (the login screen)
+#   login             entering the password
+#   switch_sections   visit every sidebar section
+#   dashboard_filters change the overall filter, student and assessment
+#   submit_marks      search, pick a student, enter scores, Submit Marks
+#   delete_records    Danger Zone "Delete Selected Record"
+#   gradebook         open the Gradebook, save one mark, open it again
+# For each scenario it reports wall time of the scenario steps (setup such
+# as logging in first is not counted), the process's peak RSS and the bytes
+# read/written through /proc/self/io (rchar/wchar, Linux only).
+# Before the scenarios it times `python -X importtime -c "import streamlit_app"`
+# (reported as startup/import, with the slowest direct imports listed).
+#
+#     python benchmarks/run_benchmarks.py [--sizes 1k,10k] [--save baseline.json]
+#     python benchmarks/run_benchmarks.py --compare baseline.json [--tolerance 0.25]
+#
+# --compare exits with status 1 if any scenario got slower or bigger than
+# the baseline by more than the tolerance.
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.abspath(os.path.join(HERE, "..", "streamlit_app.py"))
+
+# Score records -> (students, score rows, test rows)
+SIZES = {
+    "1k": (100, 1_000, 200),
+    "10k": (1_000, 10_000, 2_000),
+    "100k": (10_000, 100_000, 20_000),
+}
+METRICS = ("wall_s", "peak_rss_mb", "read_mb", "write_mb")
+# Compared metrics and the absolute change below which a difference is noise
+THRESHOLDS = {"wall_s": 0.05, "peak_rss_mb": 10.0}
+MB = 1024 * 1024
+
+
+# -------------------------- MEASUREMENT -------------------------- #
+def io_counters():
+    """(bytes read, bytes written) by this process so far, or (None, None)."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":") for line in f.read().splitlines() if ":" in line)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+# -------------------------- SCENARIOS -------------------------- #
+def _by_label(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+def _login(at):
+    at.run()
+    at.text_input(key="password").input("letmein").run()
+
+
+def _goto(at, section):
+    at.sidebar.radio(key="selected_tab").set_value(section).run()
+
+
+def first_paint(at):
+    yield
+    at.run()
+
+
+def login(at):
+    at.run()
+    yield
+    at.text_input(key="password").input("letmein").run()
+
+
+def switch_sections(at):
+    _login(at)
+    sections = list(at.sidebar.radio(key="selected_tab").options)
+    yield
+    for section in sections[1:] + sections[:1]:
+        _goto(at, section)
+
+
+def dashboard_filters(at):
+    _login(at)
+    _goto(at, "Dashboard")
+    yield
+    overall = _by_label(at.selectbox, "📑 Filter by Assessment (Overall)")
+    overall.select(overall.options[1]).run()
+    student = _by_label(at.selectbox, "👤 Select Student")
+    student.select(student.options[1]).run()
+    assessment = _by_label(at.selectbox, "📑 Select Assessment")
+    assessment.select(assessment.options[1]).run()
+    _by_label(at.selectbox, "📑 Filter by Assessment (Overall)").select("All Assessments").run()
+
+
+def submit_marks(at, count=3):
+    _login(at)
+    _goto(at, "Marks Entry")
+    yield
+    for i in range(count):
+        # Searching a full Student ID leaves that student picked
+        at.text_input(key="tab2_student_search").input(f"2024{i:06d}").run()
+        assessment = _by_label(at.selectbox, "Select Assessment")
+        assessment.select(assessment.options[1]).run()
+        for j, box in enumerate(at.number_input):
+            box.set_value((i + j) % 5)
+        at.run()
+        _by_label(at.button, "Submit Marks").click().run()
+
+
+def delete_records(at, count=3):
+    _login(at)
+    _goto(at, "Student Scores")
+    yield
+    for _ in range(count):
+        _by_label(at.button, "Delete Selected Record").click().run()
+
+
+def gradebook(at):
+    _login(at)
+    yield
+    _goto(at, "Gradebook")
+    # After one new mark only that student's gradebook row is rebuilt
+    _goto(at, "Marks Entry")
+    at.text_input(key="tab2_student_search").input("2024000000").run()
+    assessment = _by_label(at.selectbox, "Select Assessment")
+    assessment.select(assessment.options[1]).run()
+    _by_label(at.button, "Submit Marks").click().run()
+    _goto(at, "Gradebook")
+
+
+SCENARIOS = {
+    "first_paint": first_paint,
+    "login": login,
+    "switch_sections": switch_sections,
+    "dashboard_filters": dashboard_filters,
+    "submit_marks": submit_marks,
+    "delete_records": delete_records,
+    "gradebook": gradebook,
+}
+
+
+def run_scenario(name):
+    """Run one scenario in the current directory; returns its metrics."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=900)
+    steps = SCENARIOS[name](at)
+    next(steps)  # setup up to the first yield is not timed
+    read0, written0 = io_counters()
+    start = time.perf_counter()
+    for _ in steps:
+        pass
+    wall = time.perf_counter() - start
+    read1, written1 = io_counters()
+    if at.exception:
+        raise RuntimeError(f"{name}: app raised {at.exception[0].message}")
+    return {
+        "wall_s": round(wall, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "read_mb": None if read0 is None else round((read1 - read0) / MB, 2),
+        "write_mb": None if written0 is None else round((written1 - written0) / MB, 2),
+    }
+
+
+def import_profile(top=6):
+    """Seconds to import streamlit_app in a fresh interpreter, plus its slowest direct imports."""
+    work = tempfile.mkdtemp(prefix="bench_import_")
+    try:
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(APP))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import streamlit_app"],
+            cwd=work, env=env, capture_output=True, text=True,
+        )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    total, direct = None, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0 and name.strip() == "streamlit_app":
+            total = int(cumulative) / 1e6
+        elif depth == 1:
+            direct.append((int(cumulative) / 1e6, name.strip()))
+    if total is None:
+        raise RuntimeError(f"import streamlit_app failed:\n{proc.stderr[-2000:]}")
+    return total, sorted(direct, reverse=True)[:top]
+
+
+# -------------------------- DRIVER -------------------------- #
+def measure(fixture_dir, scenario):
+    """Run scenario in a subprocess on a scratch copy of fixture_dir."""
+    work = tempfile.mkdtemp(prefix=f"bench_{scenario}_")
+    try:
+        for name in os.listdir(fixture_dir):
+            shutil.copy2(os.path.join(fixture_dir, name), work)
+        env = dict(os.environ, GRADING_NAVIGATION="sidebar")
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", scenario],
+            cwd=work, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise RuntimeError(f"{scenario} failed:\n{proc.stderr[-2000:]}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def run_all(sizes, scenarios, repeat, seed):
+    from fixtures import write_fixtures
+
+    results = {}
+    total, slowest = import_profile()
+    results["startup/import"] = {"wall_s": round(total, 4), "peak_rss_mb": None, "read_mb": None, "write_mb": None}
+    print(f"[startup] import streamlit_app: {total:.3f} s ("
+          + ", ".join(f"{name} {seconds:.2f}" for seconds, name in slowest) + ")")
+    for size in sizes:
+        students, scores, tests = SIZES[size]
+        with tempfile.TemporaryDirectory(prefix=f"bench_fixtures_{size}_") as fixture_dir:
+            counts = write_fixtures(fixture_dir, students, scores, tests, seed=seed)
+            print(f"[{size}] {counts['students']} students, {counts['scores']} score rows, {counts['tests']} test rows")
+            for scenario in scenarios:
+                runs = [measure(fixture_dir, scenario) for _ in range(repeat)]
+                result = {}
+                for metric in METRICS:
+                    values = [run[metric] for run in runs if run[metric] is not None]
+                    result[metric] = statistics.median(values) if values else None
+                results[f"{size}/{scenario}"] = result
+                print(f"  {scenario:20}" + "".join(f"{_fmt(metric, result[metric]):>16}" for metric in METRICS))
+    return results
+
+
+def _fmt(metric, value):
+    if value is None:
+        return "n/a"
+    return f"{value:.3f} s" if metric == "wall_s" else f"{value:.1f} MB"
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison; returns the list of regressions."""
+    regressions = []
+    print(f"\n{'':28}{'metric':>13}{'baseline':>14}{'now':>14}{'change':>10}")
+    for key, now in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        for metric, noise in THRESHOLDS.items():
+            old, new = before.get(metric), now.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            regressed = new - old > noise and change > tolerance
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{key:28}{metric:>13}{old:>14.3f}{new:>14.3f}{change:>+10.0%}{flag}")
+            if regressed:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grading app scenario benchmarks")
+    parser.add_argument("--sizes", default="1k,10k", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario (median is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown/growth")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+    if args.worker:
+        sys.path.insert(0, os.path.dirname(APP))
+        print(json.dumps(run_scenario(args.worker)))
+        return
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES] + [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown size/scenario: {', '.join(unknown)}")
+
+    print(f"{'':22}" + "".join(f"{metric:>16}" for metric in METRICS))
+    results = run_all(sizes, scenarios, args.repeat, args.seed)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {"python": platform.python_version(), "platform": platform.platform(), "seed": args.seed},
+                "results": results,
+            }, f, indent=2)
+        print(f"\nbaseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/snapshot_memory.py
+# Memory and load time of tutorial scores: CSV parse vs. Parquet snapshot.
+#
+# On seeded fixtures (fixtures.py) it compares, per size:
+#   csv         pd.read_csv + last-row-per-key (the loader before snapshots)
+#   snapshot    snapshot.read() of every column
+#   dashboard   snapshot.read() of Name/Percentage/Grade only
+# reporting the frame's in-memory size (memory_usage(deep=True)), the size
+# st.cache_data stores for it (pickled bytes), and load time. It also times
+# building the snapshot from scratch and merging one appended row.
+#
+#     python benchmarks/snapshot_memory.py [--scores 10000,100000]
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from fixtures import write_fixtures
+
+MB = 1024 * 1024
+
+
+def _timed(func, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def measure(scores):
+    import data_store
+    import snapshot
+
+    keys = list(data_store.SCORE_KEYS)
+    with tempfile.TemporaryDirectory(prefix="snapshot_memory_") as folder:
+        os.chdir(folder)
+        write_fixtures(folder, max(scores // 10, 1), scores, 0)
+
+        def csv_load():
+            return pd.read_csv(data_store.SCORES_FILE).drop_duplicates(subset=keys, keep="last")
+
+        def rebuild():
+            if os.path.exists(snapshot.SNAPSHOT_FILE):
+                os.remove(snapshot.SNAPSHOT_FILE)
+            return snapshot.refresh(data_store.SCORES_FILE, keys)
+
+        _, build_s = _timed(rebuild)
+        rows = {
+            "csv": _timed(csv_load),
+            "snapshot": _timed(snapshot.read),
+            "dashboard": _timed(lambda: snapshot.read(["Name", "Percentage", "Grade"])),
+        }
+        with open(data_store.SCORES_FILE, "a") as f:
+            f.write(csv_load().tail(1).to_csv(header=False, index=False))
+        _, merge_s = _timed(lambda: snapshot.refresh(data_store.SCORES_FILE, keys), repeat=1)
+        files = {name: os.path.getsize(name) / MB for name in (data_store.SCORES_FILE, snapshot.SNAPSHOT_FILE)}
+        os.chdir(os.path.dirname(folder))
+
+    print(f"\n{scores} score rows  (csv {files[data_store.SCORES_FILE]:.1f} MB on disk, "
+          f"parquet {files[snapshot.SNAPSHOT_FILE]:.1f} MB; snapshot build {build_s * 1000:.0f} ms, "
+          f"1-row append merge {merge_s * 1000:.0f} ms)")
+    print(f"{'':12}{'in memory':>12}{'cached':>12}{'load':>12}")
+    base = None
+    for name, (df, seconds) in rows.items():
+        memory = df.memory_usage(deep=True).sum() / MB
+        cached = len(pickle.dumps(df)) / MB
+        base = base or memory
+        print(f"{name:12}{memory:>9.1f} MB{cached:>9.1f} MB{seconds * 1000:>9.0f} ms   ({memory / base:.0%} of csv)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scores memory: CSV vs Parquet snapshot")
+    parser.add_argument("--scores", default="10000,100000", help="comma-separated score row counts")
+    args = parser.parse_args()
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    for scores in args.scores.split(","):
+        measure(int(scores))
+
+
+if __name__ == "__main__":
+    main()
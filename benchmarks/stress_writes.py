@@ -0,0 +1,103 @@
+# benchmarks/stress_writes.py
+# Concurrent-write stress test for the storage backends.
+#
+# N worker processes share one data directory and, at the same time:
+#   - append marks (one row per save, like Submit Marks),
+#   - append test records (like Save Test Record),
+#   - delete some of their own marks (like the Danger Zone), and
+#   - run "Regrade All", a full rewrite that retries on StaleWriteError.
+# Afterwards every mark a worker saved and did not delete must be there
+# exactly once, the files must parse, and the dashboard summaries must match
+# a full recompute.
+#
+#     python benchmarks/stress_writes.py [--workers 8] [--ops 60] [--backend csv|sqlite]
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def _open_backend(folder, backend):
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    os.chdir(folder)
+    sys.path.insert(0, os.path.abspath(ROOT))
+    import data_store
+
+    if backend == "sqlite":
+        from sqlite_store import SqliteBackend
+        return SqliteBackend(data_store.DB_FILE)
+    return data_store.CsvBackend()
+
+
+def worker(folder, backend, worker_id, ops):
+    store = _open_backend(folder, backend)
+    import pandas as pd
+
+    import coordinator
+    import grading
+
+    saved, deleted = set(), set()
+    for i in range(ops):
+        student = f"W{worker_id}-S{i}"
+        marks = pd.DataFrame([{
+            "Student ID": student, "Name": f"Worker {worker_id} Student {i}", "Assessment": "Stress",
+            "Accuracy": i % 5, "Clarity": 4, "Depth": 3, "Completeness": 2, "Presentation": 1,
+        }])
+        store.append_scores(grading.grade_frame(marks))
+        saved.add(student)
+        if i % 5 == 0:
+            store.append_test_results(pd.DataFrame([{
+                "Student ID": student, "Student Name": f"Worker {worker_id} Student {i}", "Test Name": "Stress Test",
+                "MCQ": i % 20, "SAQ": 10, "Raw Score": i % 20 + 10, "Scaled Score": i % 20 + 10,
+                "Weighted (%)": (i % 20 + 10) / 50 * 10, "Total": 100,
+            }]))
+        if i % 7 == 6:
+            victim = f"W{worker_id}-S{i - 3}"
+            store.delete_scores(victim, "Stress")
+            deleted.add(victim)
+        if i == ops // 2:
+            def regrade_attempt():
+                version = store.scores_version()
+                store.save_scores(grading.regrade(store.load_scores())[0], expected=version)
+            coordinator.retry_stale(regrade_attempt, retries=50)
+    return saved - deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-grader write stress test")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=60, help="marks saved per worker")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="stress_writes_")
+    ctx = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ctx.Pool(args.workers) as pool:
+        results = pool.starmap(worker, [(folder, args.backend, w, args.ops) for w in range(args.workers)])
+    elapsed = time.perf_counter() - start
+
+    expected = set().union(*results)
+    store = _open_backend(folder, args.backend)
+    scores = store.load_scores()
+    ids = scores["Student ID"].astype(str)
+    lost = expected - set(ids)
+    unexpected = set(ids) - expected
+    duplicates = int(ids.duplicated().sum())
+    problems = store.summaries.check()
+
+    writes = args.workers * (args.ops + args.ops // 5 + 1 + args.ops // 7 + 1)
+    print(f"{args.backend}: {args.workers} workers, ~{writes} writes in {elapsed:.1f}s ({writes / elapsed:.0f} writes/s)")
+    print(f"expected {len(expected)} marks, found {len(ids)}: "
+          f"{len(lost)} lost, {len(unexpected)} unexpected, {duplicates} duplicated")
+    print(f"summaries: {'consistent' if not problems else problems[:5]}")
+    print(f"data left in {folder}")
+    sys.exit(1 if lost or unexpected or duplicates or problems else 0)
+
+
+if __name__ == "__main__":
+    main()
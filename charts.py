@@ -0,0 +1,110 @@
+# charts.py
+# Dashboard chart builders that aggregate on the server before plotting.
+#
+# One bar per student works for a tutorial group, but the Plotly JSON grows
+# with every row and a service course of thousands stalls the browser. Above
+# CHART_MAX_POINTS rows (env GRADING_CHART_MAX_POINTS) the per-student bar
+# charts switch to a summarized view instead: a fixed-bin histogram with
+# percentile bands, binned with NumPy, whose payload is the same size for 50
+# students or 50,000. Line charts above the threshold use WebGL traces.
+# Plotly is imported inside the builders, so only pages with charts load it.
+import os
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+CHART_MAX_POINTS = int(os.environ.get("GRADING_CHART_MAX_POINTS", "200"))
+HISTOGRAM_BINS = 20
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+# -------------------------- AGGREGATION -------------------------- #
+def _values(values):
+    return pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+
+
+def histogram_data(values, bins=HISTOGRAM_BINS, value_range=(0, 100)):
+    """Counts per fixed-width bin (Bin Start, Bin End, Bin Mid, Count)."""
+    counts, edges = np.histogram(_values(values), bins=bins, range=value_range)
+    return pd.DataFrame({
+        "Bin Start": edges[:-1],
+        "Bin End": edges[1:],
+        "Bin Mid": (edges[:-1] + edges[1:]) / 2,
+        "Count": counts,
+    })
+
+
+def percentile_bands(values, percentiles=PERCENTILES):
+    """{percentile: value} over the non-missing values; empty if there are none."""
+    v = _values(values)
+    if not len(v):
+        return {}
+    return dict(zip(percentiles, np.percentile(v, percentiles)))
+
+
+# -------------------------- FIGURES -------------------------- #
+@profiling.timed()
+def distribution_figure(values, title, label):
+    """Histogram of values with the middle 50% shaded and P10/P50/P90 marked."""
+    import plotly.express as px
+
+    hist = histogram_data(values)
+    fig = px.bar(hist, x="Bin Mid", y="Count", title=title, labels={"Bin Mid": label, "Count": "Students"},
+                 hover_data={"Bin Start": True, "Bin End": True, "Bin Mid": False})
+    fig.update_traces(width=float(hist["Bin End"].iloc[0] - hist["Bin Start"].iloc[0]) * 0.95)
+    bands = percentile_bands(values)
+    if bands:
+        fig.add_vrect(x0=bands[25], x1=bands[75], fillcolor="LightSkyBlue", opacity=0.25, line_width=0,
+                      annotation_text="middle 50%", annotation_position="top left")
+        for p in (10, 50, 90):
+            fig.add_vline(x=bands[p], line_dash="dot", annotation_text=f"P{p}: {bands[p]:.0f}")
+    return fig
+
+
+@profiling.timed()
+def student_bar_chart(df, x, y, title, labels, color_scale="Blues"):
+    """One bar per row up to CHART_MAX_POINTS rows, otherwise distribution_figure.
+
+    Returns (figure, summarized).
+    """
+    import plotly.express as px
+
+    if len(df) <= CHART_MAX_POINTS:
+        fig = px.bar(df, x=x, y=y, color=y, color_continuous_scale=color_scale, title=title, labels=labels)
+        fig.update_layout(xaxis_tickangle=-45)
+        return fig, False
+    return distribution_figure(df[y], f"{title} (distribution of {len(df)} rows)", labels.get(y, y)), True
+
+
+@profiling.timed()
+def line_chart(df, x, y, title, labels):
+    """px.line with markers; WebGL traces above CHART_MAX_POINTS rows."""
+    import plotly.express as px
+
+    render_mode = "webgl" if len(df) > CHART_MAX_POINTS else "auto"
+    return px.line(df, x=x, y=y, markers=True, title=title, labels=labels, render_mode=render_mode)
+
+
+@profiling.timed()
+def trajectory_figure(bands, lines, title):
+    """Cohort P10–P90 and P25–P75 bands and median per assessment, with some students' lines on top.
+
+    bands is analytics.trajectory_bands(); lines has Student, Assessment and
+    Percentage rows. The payload grows with the assessments and the students
+    drawn, not with the cohort.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    x = [str(a) for a in bands.index]
+    for low, high, color, name in ((10, 90, "rgba(135, 206, 250, 0.2)", "P10–P90"),
+                                   (25, 75, "rgba(135, 206, 250, 0.45)", "P25–P75")):
+        fig.add_scatter(x=x, y=bands[high], mode="lines", line_width=0, showlegend=False, hoverinfo="skip")
+        fig.add_scatter(x=x, y=bands[low], mode="lines", line_width=0, fill="tonexty", fillcolor=color, name=name)
+    fig.add_scatter(x=x, y=bands[50], mode="lines", line={"dash": "dash", "color": "grey"}, name="Median")
+    for student, rows in lines.groupby("Student", sort=False):
+        fig.add_scatter(x=rows["Assessment"].astype(str), y=rows["Percentage"], mode="lines+markers", name=student)
+    fig.update_layout(title=title, xaxis_title="Assessment", yaxis_title="Percentage (%)", yaxis_range=[0, 100])
+    return fig
@@ -0,0 +1,149 @@
+# coordinator.py
+# Coordinates writes from several graders (Streamlit sessions or separate
+# processes) sharing one data directory.
+#
+#   write_lock(lock_file)  exclusive inter-process lock (flock on lock_file),
+#                          held for a whole read-modify-write. Re-entrant
+#                          within a thread.
+#   read_lock(lock_file)   shared lock taken while parsing an append-only
+#                          file, so a reader never sees a half-written append.
+#                          A no-op in a thread that holds the write lock.
+#   holds_write_lock(..)   whether the current thread holds the write lock.
+#   atomic_write(path, ..) write a temp file in the same directory, fsync it,
+#                          then os.replace it over path: readers see the old
+#                          file or the new one, never a mix.
+#   StaleWriteError        raised by a write whose expected version no longer
+#                          matches; retry_stale() re-runs the read-compute-
+#                          write attempt on fresh data.
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_TIMEOUT = float(os.environ.get("GRADING_LOCK_TIMEOUT", "30"))
+RETRIES = 5
+
+# Lock files held by the current thread -> "ex" or "sh"
+_local = threading.local()
+
+
+class StaleWriteError(Exception):
+    """The data changed between reading it and writing the result."""
+
+
+def _held():
+    if not hasattr(_local, "held"):
+        _local.held = {}
+    return _local.held
+
+
+def _try_acquire(fd, exclusive):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        else:
+            # msvcrt has no shared mode; readers take the exclusive lock too
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _release(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _lock(lock_file, exclusive):
+    held = _held()
+    key = os.path.abspath(lock_file)
+    if key in held:
+        if exclusive and held[key] != "ex":
+            raise RuntimeError(f"{lock_file}: cannot upgrade a read lock to a write lock")
+        yield
+        return
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not _try_acquire(fd, exclusive):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out after {LOCK_TIMEOUT:g}s waiting for {lock_file}")
+            time.sleep(0.005)
+        held[key] = "ex" if exclusive else "sh"
+        try:
+            yield
+        finally:
+            del held[key]
+            _release(fd)
+    finally:
+        os.close(fd)
+
+
+def write_lock(lock_file):
+    return _lock(lock_file, exclusive=True)
+
+
+def read_lock(lock_file):
+    return _lock(lock_file, exclusive=False)
+
+
+def holds_write_lock(lock_file):
+    """True if the current thread holds the write lock on lock_file."""
+    return _held().get(os.path.abspath(lock_file)) == "ex"
+
+
+def atomic_write(path, write):
+    """Call write(tmp_path), fsync the result, then os.replace it over path."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=folder)
+    os.close(fd)
+    try:
+        write(tmp)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        else:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def append_text(path, text):
+    """Append text with a single write and fsync it."""
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def retry_stale(attempt, retries=RETRIES):
+    """Call attempt() until it stops raising StaleWriteError (at most retries times).
+
+    attempt should read the current version and data, compute, and write
+    with that version as the expected one.
+    """
+    for i in range(retries):
+        try:
+            return attempt()
+        except StaleWriteError:
+            if i == retries - 1:
+                raise
+            # Back off a little so competing writers do not collide again
+            time.sleep(random.uniform(0, 0.05 * (i + 1)))
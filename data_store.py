@@ -0,0 +1,663 @@
+# data_store.py
+# Shared data-access layer for the grading app.
+#
+# Every section of streamlit_app.py reads its CSV files through the loaders
+# below instead of calling pd.read_csv directly. Parsed frames are kept in
+# st.cache_data keyed on (path, mtime, size), so a rerun parses each file at
+# most once and only re-parses files that actually changed on disk. The save
+# helpers write the file and then drop its cache entry on purpose.
+#
+# Scores and test results are append-only logs: saving a mark appends one row
+# instead of rewriting the file, and the loaders keep only the last row per
+# (Student ID, Assessment) / (Student ID, Test Name). Deleting appends a
+# tombstone row (Deleted = 1) for the same key, so deletes and edits never
+# rewrite the file either. Superseded rows and tombstones are dropped by
+# compact(), which runs automatically once enough of them pile up and can
+# also be run on demand (`python data_store.py compact`).
+#
+# Every record carries a stable Record ID. Re-saving a record (an edit)
+# keeps its ID; rows saved before IDs existed get one derived from their key.
+#
+# Scores and test results live behind a pluggable backend: CsvBackend (the
+# default, described above) or SqliteBackend from sqlite_store.py, selected
+# with GRADING_BACKEND=sqlite. The imported roster always stays a CSV file.
+# Callers get the active backend from backend() and go through its methods,
+# so the app never needs to know which one is in use.
+#
+# Each backend keeps its dashboard aggregates in a summaries.Summaries
+# sidecar; every write method below reports the rows it replaced or removed
+# so those aggregates stay current without rescanning.
+#
+# Scores are loaded from snapshot.py's Parquet copy of the live rows
+# (categorical text columns, small integer criteria), which follows the CSV
+# by merging in appended rows, rather than by parsing the whole CSV.
+#
+# Several graders can save at once: every write holds coordinator's
+# exclusive lock on grading.lock for its whole read-modify-write, rewrites
+# are atomic (temp file + os.replace), and readers take a shared lock while
+# parsing an append-only file. See coordinator.py.
+#
+# Data can be split into partitions (one per course / cohort / semester):
+# backend(partition) reads and writes only the files in that partition's
+# folder under PARTITIONS_DIR (its own CSVs, snapshot, summaries, lock and
+# SQLite database). The default partition "" is the working directory, where
+# the files have always lived. See partitions.py.
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+import coordinator
+import profiling
+import snapshot
+import summaries
+from roster import RosterIndex
+
+SCORES_FILE = "student_scores.csv"
+STUDENT_LIST_FILE = "student_list.csv"
+TEST_RESULTS_FILE = "test_results.csv"
+LOCK_FILE = "grading.lock"
+
+CRITERIA = ["Accuracy", "Clarity", "Depth", "Completeness", "Presentation"]
+SCORE_COLUMNS = ["Student ID", "Name", "Assessment"] + CRITERIA + ["Total", "Percentage", "Grade", "Feedback"]
+TEST_COLUMNS = [
+    "Student ID", "Student Name", "Test Name",
+    "MCQ", "SAQ", "Raw Score", "Scaled Score",
+    "Weighted (%)", "Total"
+]
+
+# Stable identity of a score or test record (added by the backends)
+RECORD_ID = "Record ID"
+# Who saved a score record; optional, records from before it existed have none
+GRADER = "Grader"
+# 1 on a tombstone row: the record with that key has been deleted
+DELETED = "Deleted"
+
+# Column types, shared by every backend that needs a schema
+SCORE_TYPES = dict(
+    [("Student ID", "TEXT"), ("Name", "TEXT"), ("Assessment", "TEXT")]
+    + [(c, "INTEGER") for c in CRITERIA]
+    + [("Total", "INTEGER"), ("Percentage", "REAL"), ("Grade", "TEXT"), ("Feedback", "TEXT")]
+    + [(RECORD_ID, "TEXT"), (GRADER, "TEXT")]
+)
+TEST_TYPES = dict(
+    [("Student ID", "TEXT"), ("Student Name", "TEXT"), ("Test Name", "TEXT")]
+    + [(c, "REAL") for c in TEST_COLUMNS[3:]]
+    + [(RECORD_ID, "TEXT")]
+)
+
+BACKEND = os.environ.get("GRADING_BACKEND", "csv").lower()
+DB_FILE = os.environ.get("GRADING_DB", "grading.db")
+
+# Partition folders live under PARTITIONS_DIR; GRADING_PARTITION picks the
+# partition new sessions (and the command-line tools) start in
+PARTITIONS_DIR = os.environ.get("GRADING_PARTITIONS_DIR", "partitions")
+PARTITION = os.environ.get("GRADING_PARTITION", "")
+
+# Last write wins per key when reading the append-only files
+SCORE_KEYS = ("Student ID", "Assessment")
+TEST_KEYS = ("Student ID", "Test Name")
+_KEYS = {SCORES_FILE: SCORE_KEYS, TEST_RESULTS_FILE: TEST_KEYS}
+# Identity columns are parsed as text, so a Student ID such as "001" stays
+# "001" and still matches the same record on the next save
+KEY_DTYPES = {"Student ID": str, "Assessment": str, "Test Name": str, RECORD_ID: str}
+
+
+def _keys(path):
+    """Keys of an append-only file (in any partition), or None."""
+    return _KEYS.get(os.path.basename(path))
+
+# Compact once superseded rows exceed both of these
+COMPACT_MIN_ROWS = 200
+COMPACT_RATIO = 0.25
+
+# Last signature seen per path, so a write can clear exactly the stale entry
+_last_signature = {}
+# Column subsets loaded from the scores snapshot (cache entries to clear)
+_snapshot_columns = set()
+
+
+# -------------------------- PARTITIONS -------------------------- #
+def partition_folder(partition):
+    """Folder of a partition ("" for the default partition, the working directory).
+
+    Partition names are "/"-separated segments, e.g. "BIO101/2024/S1".
+    """
+    if not partition:
+        return ""
+    segments = partition.split("/")
+    for segment in segments:
+        if not segment or segment.startswith(".") or not all(c.isalnum() or c in " _-." for c in segment):
+            raise ValueError(f"Invalid partition name {partition!r}")
+    return os.path.join(PARTITIONS_DIR, *segments)
+
+
+def _lock_for(path):
+    # Each partition folder has its own lock file
+    return os.path.join(os.path.dirname(path), LOCK_FILE)
+
+
+# -------------------------- CACHE KEYS -------------------------- #
+def file_signature(path):
+    """Return (inode, mtime_ns, size) for path, or None when the file does not exist.
+
+    Atomic rewrites always get a new inode, so two rewrites inside one
+    mtime tick still get different signatures.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_csv(path, signature):
+    # signature is only part of the cache key; it changes whenever the file does
+    with profiling.io("read", path):
+        return pd.read_csv(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_log(path, signature, keys):
+    """Parse an append-only file, keeping the last row per key.
+
+    Returns (live_rows, number_of_superseded_rows).
+    """
+    with coordinator.read_lock(_lock_for(path)), profiling.io("read", path):
+        df = pd.read_csv(path, dtype=KEY_DTYPES)
+    return live_rows(df, keys)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_snapshot(path, signature, columns=None):
+    """Live rows of the scores file from its snapshot, optionally only some columns.
+
+    Returns (live_rows, number_of_superseded_rows).
+    """
+    lock = _lock_for(path)
+    with coordinator.read_lock(lock):
+        # A write is about to change the file again; leave the rewrite to the next reader
+        persist = not coordinator.holds_write_lock(lock)
+        return snapshot.load(path, _keys(path), None if columns is None else list(columns),
+                             snapshot.snapshot_path(path), persist)
+
+
+def _read_live(path, signature, columns=None):
+    """(live_rows, superseded_rows) for an append-only file."""
+    if os.path.basename(path) == SCORES_FILE and snapshot.ENABLED:
+        if columns is not None:
+            _snapshot_columns.add(columns)
+        return _read_snapshot(path, signature, columns)
+    live, superseded = _read_log(path, signature, _keys(path))
+    return (live if columns is None else live[[c for c in columns if c in live.columns]]), superseded
+
+
+def _load(path, columns=None):
+    signature = file_signature(path)
+    if signature is None:
+        raise FileNotFoundError(path)
+    _last_signature[path] = signature
+    if _keys(path) is not None:
+        return _read_live(path, signature, None if columns is None else tuple(columns))[0]
+    return _read_csv(path, signature)
+
+
+def superseded_rows(path):
+    """Rows in an append-only file that a later row has replaced."""
+    signature = file_signature(path)
+    if signature is None:
+        return 0
+    return _read_live(path, signature)[1]
+
+
+# -------------------------- RECORDS -------------------------- #
+def _key_strings(df, keys):
+    joined = df[keys[0]].astype(str)
+    for key in keys[1:]:
+        joined = joined + "\x1f" + df[key].astype(str)
+    return joined.tolist()
+
+
+def _missing_ids(df):
+    if RECORD_ID not in df.columns:
+        df[RECORD_ID] = None
+    df[RECORD_ID] = df[RECORD_ID].astype(object)
+    return df[RECORD_ID].isna()
+
+
+def live_rows(raw, keys):
+    """Rows of an append-only frame that are still live: the last row per
+    key, minus deleted records, each with a Record ID.
+
+    Returns (live_rows, number_of_superseded_rows).
+    """
+    keys = list(keys)
+    if not set(keys).issubset(raw.columns):
+        return raw, 0
+    live = raw.drop_duplicates(subset=keys, keep="last")
+    if DELETED in live.columns:
+        live = live[pd.to_numeric(live[DELETED], errors="coerce").fillna(0) == 0].drop(columns=DELETED)
+    live = live.reset_index(drop=True)
+    missing = _missing_ids(live)
+    if missing.any():
+        live.loc[missing, RECORD_ID] = legacy_record_ids(live[missing], keys)
+    live[RECORD_ID] = live[RECORD_ID].astype("str")
+    return live, len(raw) - len(live)
+
+
+def legacy_record_ids(df, keys):
+    """Record IDs for rows saved before IDs existed, derived from their key
+    (which identified them until then), so every reader agrees on them."""
+    return ["k" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:15] for key in _key_strings(df, list(keys))]
+
+
+def assign_record_ids(df_new, replaced, keys):
+    """df_new with a Record ID on every row.
+
+    A row that replaces an existing record (same key) keeps that record's
+    ID, so an edit is the same record; other rows get a new ID.
+    """
+    df_new = df_new.copy()
+    missing = _missing_ids(df_new)
+    if missing.any() and replaced is not None and not replaced.empty and RECORD_ID in replaced.columns:
+        known = dict(zip(_key_strings(replaced, list(keys)), replaced[RECORD_ID]))
+        df_new.loc[missing, RECORD_ID] = [known.get(key) for key in _key_strings(df_new[missing], list(keys))]
+        missing = df_new[RECORD_ID].isna()
+    df_new.loc[missing, RECORD_ID] = [uuid.uuid4().hex[:16] for _ in range(int(missing.sum()))]
+    df_new[RECORD_ID] = df_new[RECORD_ID].astype("str")
+    return df_new
+
+
+def tombstones(removed):
+    """Rows that delete the records in removed when appended.
+
+    A tombstone repeats the whole deleted row, so the file keeps a record of
+    what was removed and every column keeps parsing to the same dtype.
+    """
+    return removed.assign(**{DELETED: 1})
+
+
+def matching_keys(df, other, keys):
+    """Rows of df whose key columns match some row of other (compared as text)."""
+    keys = list(keys)
+    if df.empty or other.empty or not set(keys).issubset(df.columns):
+        return df.iloc[0:0]
+    index = pd.MultiIndex.from_frame(df[keys].astype(str))
+    return df[index.isin(pd.MultiIndex.from_frame(other[keys].astype(str)))]
+
+
+def invalidate(path):
+    """Drop the cached frame for path so the next load re-parses it."""
+    signature = _last_signature.pop(path, None)
+    if signature is not None:
+        _read_csv.clear(path, signature)
+        name = os.path.basename(path)
+        if name in _KEYS:
+            _read_log.clear(path, signature, _KEYS[name])
+        if name == SCORES_FILE:
+            for columns in [None, *_snapshot_columns]:
+                _read_snapshot.clear(path, signature, columns)
+        if name == STUDENT_LIST_FILE:
+            _read_roster.clear(path, signature)
+            _roster_index.clear(path, signature)
+
+
+# -------------------------- ROSTER -------------------------- #
+def load_student_list(path=STUDENT_LIST_FILE):
+    """Raw imported roster (columns exactly as uploaded)."""
+    return _load(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _read_roster(path, signature):
+    # Read as text so IDs such as 001 keep their leading zeros
+    with profiling.io("read", path):
+        student_list = pd.read_csv(path, dtype=str, keep_default_na=False)
+    id_col, name_col = None, None
+    for c in student_list.columns:
+        if "id" in c.lower():
+            id_col = c
+        if "name" in c.lower():
+            name_col = c
+    student_list = student_list.astype(str).apply(lambda x: x.str.strip())
+    return student_list, id_col, name_col
+
+
+def load_roster(path=STUDENT_LIST_FILE):
+    """Roster with whitespace stripped, plus the detected (id_col, name_col).
+
+    Returns (None, None, None) when no roster has been imported.
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return None, None, None
+    _last_signature[path] = signature
+    return _read_roster(path, signature)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _roster_index(path, signature):
+    # Shared, not copied per rerun; RosterIndex is read-only after it is built
+    student_list, id_col, name_col = _read_roster(path, signature)
+    return RosterIndex(student_list, id_col, name_col)
+
+
+def load_roster_index(path=STUDENT_LIST_FILE):
+    """RosterIndex over the imported roster, built once per roster version.
+
+    Returns None when no roster has been imported or it has no ID/name column.
+    """
+    student_list, id_col, name_col = load_roster(path)
+    if student_list is None or not (id_col and name_col):
+        return None
+    return _roster_index(path, _last_signature[path])
+
+
+def save_student_list(df, path=STUDENT_LIST_FILE):
+    _save(df, path)
+
+
+# -------------------------- FRAME QUERIES -------------------------- #
+class FrameScores:
+    """Dashboard queries over an in-memory scores frame.
+
+    CsvBackend answers its queries through this; the dashboard also wraps an
+    imported file in it so both sources share one code path.
+    """
+
+    def __init__(self, df):
+        self.df = df
+
+    def has_scores(self):
+        return True
+
+    def count_scores(self, assessment=None):
+        if "Percentage" not in self.df.columns:
+            return 0
+        return len(self.query_scores(assessment))
+
+    def query_scores(self, assessment=None, name=None, columns=None):
+        df = self.df
+        if assessment is not None:
+            df = df[df["Assessment"] == assessment]
+        if name is not None:
+            df = df[df["Name"] == name]
+        return df if columns is None else df[[c for c in columns if c in df.columns]]
+
+    def assessments(self):
+        return self.df["Assessment"].dropna().unique().tolist()
+
+    def student_names(self):
+        return self.df["Name"].dropna().unique().tolist()
+
+    def grade_counts(self, assessment=None):
+        counts = self.query_scores(assessment)["Grade"].value_counts().reset_index()
+        counts.columns = ["Grade", "Count"]
+        return counts
+
+    def average_by_student(self, assessment=None):
+        return self.query_scores(assessment).groupby("Name", observed=True)["Percentage"].mean().reset_index()
+
+    def top_scores(self, n, assessment=None, largest=True):
+        df = self.query_scores(assessment)
+        return df.nlargest(n, "Percentage") if largest else df.nsmallest(n, "Percentage")
+
+
+# -------------------------- CSV BACKEND -------------------------- #
+def _save(df, path):
+    if _keys(path) is not None and DELETED not in df.columns:
+        # Keep the tombstone column in the header so deletes can be appended
+        df = df.assign(**{DELETED: None})
+    with profiling.io("write", path):
+        coordinator.atomic_write(path, lambda tmp: df.to_csv(tmp, index=False))
+    invalidate(path)
+
+
+def _append(df_new, path):
+    """Append rows to an append-only file without rewriting it."""
+    signature = file_signature(path)
+    if signature is None or signature[-1] == 0:
+        _save(df_new, path)
+        return
+    _last_signature[path] = signature
+    live, superseded = _read_live(path, signature)
+    header = pd.read_csv(path, nrows=0).columns
+    new_columns = not set(df_new.columns).issubset(header)
+    if new_columns or superseded >= max(COMPACT_MIN_ROWS, COMPACT_RATIO * len(live)):
+        # Fold the new rows (and tombstones) into a compacted rewrite instead
+        _save(live_rows(pd.concat([live, df_new], ignore_index=True), _keys(path))[0], path)
+        return
+    text = df_new.reindex(columns=header).to_csv(header=False, index=False)
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            text = "\n" + text
+    with profiling.io("append", path) as op:
+        op.nbytes = len(text.encode("utf-8"))
+        coordinator.append_text(path, text)
+    invalidate(path)
+
+
+class CsvBackend:
+    """Flat CSV files in a partition's folder (the default)."""
+
+    name = "csv"
+
+    def __init__(self, partition=""):
+        self.partition = partition
+        self.folder = partition_folder(partition)
+        self.scores_file = os.path.join(self.folder, SCORES_FILE)
+        self.tests_file = os.path.join(self.folder, TEST_RESULTS_FILE)
+        self.roster_file = os.path.join(self.folder, STUDENT_LIST_FILE)
+        self.lock_file = os.path.join(self.folder, LOCK_FILE)
+        self.summaries = summaries.Summaries(self, os.path.join(self.folder, summaries.SUMMARY_FILE))
+
+    def data_signature(self):
+        return [file_signature(self.scores_file), file_signature(self.tests_file)]
+
+    def scores_version(self):
+        """Pass to save_scores(expected=...) to detect a write in between."""
+        return file_signature(self.scores_file)
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write lock plus the summary update for one write."""
+        with coordinator.write_lock(self.lock_file), self.summaries.updating() as update:
+            yield update
+
+    def _live(self, path):
+        return _load(path) if file_signature(path) is not None else pd.DataFrame()
+
+    def _with_ids(self, df, path):
+        # Rows without a Record ID keep the ID of the live record they replace
+        if RECORD_ID in df.columns and df[RECORD_ID].notna().all():
+            return df
+        return assign_record_ids(df, self._live(path), _keys(path))
+
+    def _delete(self, path, removed):
+        """Append tombstones for the live rows in removed."""
+        if not removed.empty:
+            _append(tombstones(removed), path)
+
+    # ---- tutorial scores ----
+    def load_scores(self, columns=None):
+        """Live score rows; columns limits which columns are read."""
+        return _load(self.scores_file, columns)
+
+    def save_scores(self, df, expected=None):
+        with self._writing() as update:
+            if expected is not None and self.scores_version() != expected:
+                raise coordinator.StaleWriteError(self.scores_file)
+            df = self._with_ids(df, self.scores_file)
+            _save(df, self.scores_file)
+            update.replace_scores(df)
+
+    def append_scores(self, df_new):
+        """Save score rows; a row for an existing key is an edit of that record."""
+        with self._writing() as update:
+            replaced = matching_keys(self._live(self.scores_file), df_new, SCORE_KEYS)
+            df_new = assign_record_ids(df_new, replaced, SCORE_KEYS)
+            _append(df_new, self.scores_file)
+            update.scores(replaced, df_new)
+
+    def delete_scores(self, student_id, assessment=None):
+        """Delete a student's records (optionally one assessment's); returns how many."""
+        with self._writing() as update:
+            # Re-read under the lock so saves that landed meanwhile are kept
+            df = self.load_scores()
+            # Compared as text: the picker passes IDs as strings whatever the column's dtype
+            removed = df["Student ID"].astype(str) == str(student_id)
+            if assessment is not None:
+                removed &= df["Assessment"].astype(str) == str(assessment)
+            self._delete(self.scores_file, df[removed])
+            update.scores(df[removed], None)
+            return int(removed.sum())
+
+    def delete_score_records(self, record_ids):
+        with self._writing() as update:
+            df = self.load_scores()
+            removed = df[df[RECORD_ID].isin(list(record_ids))]
+            self._delete(self.scores_file, removed)
+            update.scores(removed, None)
+
+    def clear_scores(self):
+        with coordinator.write_lock(self.lock_file):
+            columns = self.load_scores().columns if self.has_scores() else SCORE_COLUMNS
+            self.save_scores(pd.DataFrame(columns=columns))
+
+    def has_scores(self):
+        return file_signature(self.scores_file) is not None
+
+    def query_scores(self, assessment=None, name=None, columns=None):
+        needed = None
+        if columns is not None:
+            # Also read the columns the filters look at
+            filters = [c for c, v in (("Assessment", assessment), ("Name", name)) if v is not None]
+            needed = list(dict.fromkeys([*columns, *filters]))
+        return FrameScores(self.load_scores(needed)).query_scores(assessment, name, columns)
+
+    # Dashboard aggregates come from the summaries, not the rows
+    def count_scores(self, assessment=None):
+        return self.summaries.count_scores(assessment)
+
+    def assessments(self):
+        return self.summaries.assessments()
+
+    def student_names(self):
+        return self.summaries.student_names()
+
+    def grade_counts(self, assessment=None):
+        return self.summaries.grade_counts(assessment)
+
+    def average_by_student(self, assessment=None):
+        return self.summaries.average_by_student(assessment)
+
+    def top_scores(self, n, assessment=None, largest=True):
+        return self.summaries.top_scores(n, assessment, largest)
+
+    # ---- test results ----
+    def load_test_results(self):
+        return _load(self.tests_file)
+
+    def save_test_results(self, df):
+        with self._writing() as update:
+            df = self._with_ids(df, self.tests_file)
+            _save(df, self.tests_file)
+            update.replace_tests(df)
+
+    def append_test_results(self, df_new):
+        with self._writing() as update:
+            replaced = matching_keys(self._live(self.tests_file), df_new, TEST_KEYS)
+            df_new = assign_record_ids(df_new, replaced, TEST_KEYS)
+            _append(df_new, self.tests_file)
+            update.tests(replaced, df_new)
+
+    def delete_test_records(self, record_ids):
+        with self._writing() as update:
+            df = self.load_test_results()
+            removed = df[df[RECORD_ID].isin(list(record_ids))]
+            self._delete(self.tests_file, removed)
+            update.tests(removed, None)
+
+    def has_test_results(self):
+        return file_signature(self.tests_file) is not None
+
+    def query_test_results(self, test_name=None):
+        df = self.load_test_results()
+        return df if test_name is None else df[df["Test Name"] == test_name]
+
+    def test_names(self):
+        return self.summaries.test_names()
+
+    def test_overall(self, test_name=None):
+        return self.summaries.test_overall(test_name)
+
+    def test_summary(self, test_name=None):
+        return self.summaries.test_summary(test_name)
+
+    def drop_stale_test_results(self):
+        """Remove a test_results.csv left over with an old column layout."""
+        if not self.has_test_results():
+            return False
+        if set(TEST_COLUMNS).issubset(self.load_test_results().columns):
+            return False
+        with self._writing() as update:
+            os.remove(self.tests_file)
+            invalidate(self.tests_file)
+            update.replace_tests(None)
+        return True
+
+    # ---- maintenance ----
+    def superseded_rows(self):
+        return superseded_rows(self.scores_file) + superseded_rows(self.tests_file)
+
+    def compact(self):
+        # Same rows afterwards; updating() only re-stamps the file signatures
+        with self._writing():
+            return sum(compact(path) for path in (self.scores_file, self.tests_file))
+
+
+# -------------------------- ACTIVE BACKEND -------------------------- #
+@st.cache_resource
+def _make_backend(name, db_file, partition):
+    folder = partition_folder(partition)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if name == "sqlite":
+        from sqlite_store import SqliteBackend
+        return SqliteBackend(db_file, partition)
+    if name != "csv":
+        raise ValueError(f"Unknown GRADING_BACKEND {name!r} (expected 'csv' or 'sqlite')")
+    return CsvBackend(partition)
+
+
+def backend(partition=None):
+    """The backend for a partition (GRADING_PARTITION by default)."""
+    return _make_backend(BACKEND, DB_FILE, PARTITION if partition is None else partition)
+
+
+# -------------------------- COMPACTION -------------------------- #
+def compact(path):
+    """Rewrite an append-only file with only its live rows.
+
+    Returns the number of superseded rows (and tombstones) that were dropped.
+    """
+    if file_signature(path) is None:
+        return 0
+    dropped = superseded_rows(path)
+    if dropped:
+        _save(_load(path), path)
+    return dropped
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["compact"]:
+        print(f"{backend().name}: dropped {backend().compact()} superseded rows")
+    else:
+        print("usage: python data_store.py compact")
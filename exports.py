@@ -0,0 +1,102 @@
+# exports.py
+# Excel and CSV downloads of the saved data.
+#
+# Exports are built only when someone clicks a download button
+# (st.download_button accepts a callable) and are cached per data signature,
+# so they are rebuilt only after the data changes. Workbooks are written with
+# xlsxwriter in constant_memory mode: each sheet is streamed row by row in
+# chunks and flushed to a temporary file as it goes, and the sheets are
+# loaded one at a time, so no extra copy of a table is held while writing.
+import io
+
+import streamlit as st
+
+import profiling
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rows converted to Python values at a time while streaming a sheet
+CHUNK_ROWS = 5000
+
+
+def _write_sheet(workbook, name, df, header_format):
+    sheet = workbook.add_worksheet(name)
+    sheet.write_row(0, 0, [str(c) for c in df.columns], header_format)
+    row = 1
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS].astype(object)
+        # Missing values become blank cells
+        chunk = chunk.where(chunk.notna(), None)
+        for values in chunk.itertuples(index=False, name=None):
+            sheet.write_row(row, 0, values)
+            row += 1
+    sheet.freeze_panes(1, 0)
+
+
+def _sheets(store):
+    """(sheet name, loader) pairs; each loader returns a frame or None."""
+    return [
+        ("Tutorial Scores", lambda: store.load_scores() if store.has_scores() else None),
+        ("Test Results", lambda: store.load_test_results() if store.has_test_results() else None),
+        ("Assessment Summary", store.summaries.assessment_summary),
+        ("Test Summary", store.test_summary),
+    ]
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _workbook(_store, name, partition, signature):
+    # name, partition and signature are the cache key; _store is not hashed
+    with profiling.section("Excel export (build)"):
+        return _build_workbook(_store)
+
+
+def _build_workbook(store):
+    # Imported on first export rather than on every app start
+    import xlsxwriter
+
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True, "in_memory": False})
+    header = workbook.add_format({"bold": True})
+    for sheet_name, load in _sheets(store):
+        df = load()
+        if df is not None and len(df.columns):
+            _write_sheet(workbook, sheet_name, df, header)
+    if not workbook.worksheets():
+        workbook.add_worksheet("No Data")
+    workbook.close()
+    return buffer.getvalue()
+
+
+def workbook(store):
+    """Multi-sheet .xlsx: tutorial scores, test results and both summaries."""
+    return _workbook(store, store.name, store.partition, store.data_signature())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _scores_csv(_store, name, partition, signature):
+    if not _store.has_scores():
+        return b""
+    with profiling.section("CSV export (build)"):
+        return _store.load_scores().to_csv(index=False).encode("utf-8")
+
+
+def scores_csv(store):
+    """All saved tutorial scores as CSV bytes."""
+    return _scores_csv(store, store.name, store.partition, store.data_signature())
+
+
+def frame_csv(df):
+    """Callable for st.download_button that serializes df only on click."""
+    return lambda: df.to_csv(index=False).encode("utf-8")
+
+
+def workbook_button(store, key, label="⬇️ Download All Data (Excel)"):
+    """Download button for workbook(store); nothing is built until it is clicked."""
+    st.download_button(
+        label=label,
+        data=lambda: workbook(store),
+        file_name="grading_export.xlsx",
+        mime=XLSX_MIME,
+        key=key,
+        on_click="ignore",
+    )
@@ -0,0 +1,298 @@
+# gradebook.py
+# Final course grades from tutorial marks and test results.
+#
+# Both sources are pivoted into one students x components matrix keyed by
+# Student ID. Each cell is a percentage:
+#   - a tutorial assessment's Percentage,
+#   - a test's Scaled Score / Total.
+# Missing work is NaN. final_grades() then applies the component weights
+# and the missing-work policy to the whole matrix in one NumPy pass:
+#   - "zero": missing work counts as 0,
+#   - "excuse": missing work is left out, and its weight is shared out over
+#     the student's other components.
+# Optionally each student's lowest drop_lowest tutorial marks are left out
+# in the same way. Weights are relative, so they need not add up to 100.
+# The letter grade uses the usual bands (grading.GRADE_BANDS).
+#
+# The default weight of a test is the weight entered when it was marked.
+# Tutorials share the rest of 100 equally. Weights and policy saved from
+# the Gradebook tab live in gradebook.json in the partition folder.
+#
+# The matrix is cached per partition (MatrixCache) and updated per data
+# version. Each student's rows are fingerprinted by hashing them, and only
+# the students whose fingerprint changed (added, edited or deleted
+# records) are pivoted again. The weighting pass is cheap and runs on
+# every call.
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import coordinator
+import grading
+import profiling
+
+CONFIG_FILE = "gradebook.json"
+TUTORIAL, TEST = "Tutorial", "Test"
+MISSING_POLICIES = {
+    "zero": "Count missing work as 0",
+    "excuse": "Leave missing work out and reweight the rest",
+}
+
+# Columns that define a component value and the student's name, per source
+_SCORE_COLUMNS = ["Student ID", "Name", "Assessment", "Percentage"]
+_TEST_COLUMNS = ["Student ID", "Student Name", "Test Name", "Scaled Score", "Total", "Weighted (%)"]
+
+
+def natural_key(text):
+    """Sort key that puts "Tutorial 2" before "Tutorial 10"."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", str(text))]
+
+
+# -------------------------- PIVOT -------------------------- #
+def _long(scores, tests):
+    """(Student ID, Source, Component, Value, Name) rows from both sources."""
+    parts = []
+    if scores is not None and len(scores):
+        parts.append(pd.DataFrame({
+            "Student ID": scores["Student ID"].astype("str").to_numpy(),
+            "Source": TUTORIAL,
+            "Component": scores["Assessment"].astype("str").to_numpy(),
+            "Value": pd.to_numeric(scores["Percentage"], errors="coerce").to_numpy(dtype=float),
+            "Name": scores["Name"].astype("str").to_numpy(),
+        }))
+    if tests is not None and len(tests):
+        total = pd.to_numeric(tests["Total"], errors="coerce").to_numpy(dtype=float)
+        scaled = pd.to_numeric(tests["Scaled Score"], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(total > 0, scaled / total * 100, np.nan)
+        parts.append(pd.DataFrame({
+            "Student ID": tests["Student ID"].astype("str").to_numpy(),
+            "Source": TEST,
+            "Component": tests["Test Name"].astype("str").to_numpy(),
+            "Value": value,
+            "Name": tests["Student Name"].astype("str").to_numpy(),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=["Student ID", "Source", "Component", "Value", "Name"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def pivot(scores, tests):
+    """(matrix, names): students x (Source, Component) percentages, and names by Student ID."""
+    rows = _long(scores, tests)
+    # Loaders return the live row per key, so each cell has one value
+    matrix = rows.set_index(["Student ID", "Source", "Component"])["Value"]
+    matrix = matrix[~matrix.index.duplicated(keep="last")].unstack(["Source", "Component"])
+    names = rows.drop_duplicates("Student ID", keep="last").set_index("Student ID")["Name"]
+    return _ordered(matrix), names
+
+
+def _ordered(matrix):
+    """Tutorials first, then tests, each in natural name order; empty columns dropped."""
+    matrix = matrix.dropna(axis=1, how="all")
+    columns = sorted(matrix.columns, key=lambda c: (c[0] != TUTORIAL, natural_key(c[1])))
+    return matrix.reindex(columns=pd.MultiIndex.from_tuples(columns, names=["Source", "Component"]))
+
+
+def fingerprints(scores, tests):
+    """One hash per Student ID over all of that student's rows."""
+    parts = []
+    for df, columns in ((scores, _SCORE_COLUMNS), (tests, _TEST_COLUMNS)):
+        if df is None or not len(df):
+            continue
+        # Categories hash by value, so columns are hashed as loaded; a dtype
+        # change between loads only makes every student look changed
+        hashes = pd.util.hash_pandas_object(df[columns], index=False)
+        # A sum does not depend on row order (uint64 wraps around)
+        sums = hashes.groupby(df["Student ID"].to_numpy()).sum()
+        parts.append(sums.set_axis(sums.index.astype("str")))
+    if not parts:
+        return pd.Series(dtype="uint64")
+    return pd.concat(parts).groupby(level=0).sum()
+
+
+class MatrixCache:
+    """The pivoted matrix of one partition, updated student by student."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.signature = None
+        self.prints = None
+        self.matrix = None
+        self.names = None
+        self.recomputed = 0
+
+    def update(self, signature, scores, tests):
+        with self._lock:
+            if signature == self.signature:
+                return self.matrix, self.names
+            prints = fingerprints(scores, tests)
+            if self.matrix is None:
+                self.matrix, self.names = pivot(scores, tests)
+                self.recomputed = len(prints)
+            else:
+                previous = self.prints.reindex(prints.index)
+                changed = prints.index[previous.isna() | (previous != prints)]
+                stale = changed.union(self.prints.index.difference(prints.index))
+                part, names = pivot(_rows_for(scores, "Student ID", changed), _rows_for(tests, "Student ID", changed))
+                kept = self.matrix.drop(index=stale, errors="ignore")
+                self.matrix = _ordered(pd.concat([kept, part]))
+                self.names = pd.concat([self.names.drop(index=stale, errors="ignore"), names])
+                self.recomputed = len(changed)
+            self.prints, self.signature = prints, signature
+            return self.matrix, self.names
+
+
+def _rows_for(df, column, ids):
+    if df is None or not len(df):
+        return df
+    return df[df[column].astype("str").isin(ids)]
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _matrix_cache(name, partition):
+    return MatrixCache()
+
+
+@profiling.timed("gradebook.matrix")
+def matrix(store):
+    """(matrix, names, students recomputed) for store's current data."""
+    cache = _matrix_cache(store.name, store.partition)
+    scores = store.load_scores() if store.has_scores() else None
+    tests = store.load_test_results() if store.has_test_results() else None
+    result = cache.update(repr(store.data_signature()), scores, tests)
+    return (*result, cache.recomputed)
+
+
+# -------------------------- WEIGHTS -------------------------- #
+def entered_test_weights(tests):
+    """{test name: weight entered when marking}, from Weighted (%) = Scaled / Total x weight."""
+    if tests is None or not len(tests):
+        return {}
+    scaled = pd.to_numeric(tests["Scaled Score"], errors="coerce")
+    total = pd.to_numeric(tests["Total"], errors="coerce")
+    weighted = pd.to_numeric(tests["Weighted (%)"], errors="coerce")
+    weight = (weighted * total / scaled).where(scaled > 0)
+    return weight.groupby(tests["Test Name"].astype("str")).median().dropna().round(2).to_dict()
+
+
+def default_weights(columns, test_weights):
+    """Tests keep their entered weight; tutorials share the rest of 100 equally."""
+    weights = {c: float(test_weights.get(c[1], 0.0)) for c in columns if c[0] == TEST}
+    tutorials = [c for c in columns if c[0] == TUTORIAL]
+    share = max(100.0 - sum(weights.values()), 0.0) / len(tutorials) if tutorials else 0.0
+    weights.update({c: round(share, 2) for c in tutorials})
+    return {c: weights[c] for c in columns}
+
+
+def final_grades(matrix, weights, policy="zero", drop_lowest=0, bands=None):
+    """Final (%) and Grade for every student, in one vectorized pass.
+
+    weights maps (Source, Component) to a relative weight (missing: 0).
+    Returns a frame indexed like matrix with Final (%), Grade, Missing and
+    Dropped.
+    """
+    if policy not in MISSING_POLICIES:
+        raise ValueError(f"Unknown missing-work policy: {policy}")
+    values = matrix.to_numpy(dtype=float)
+    w = np.array([float(weights.get(c, 0.0)) for c in matrix.columns])
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    counted = np.ones_like(present) if policy == "zero" else present.copy()
+
+    dropped = np.zeros_like(present)
+    tutorials = np.flatnonzero([c[0] == TUTORIAL for c in matrix.columns])
+    if drop_lowest and len(tutorials):
+        # Lowest counted tutorial marks per student; uncounted ones sort last
+        sub = np.where(counted[:, tutorials], filled[:, tutorials], np.inf)
+        lowest = np.argsort(sub, axis=1, kind="stable")[:, :drop_lowest]
+        rows = np.arange(len(values))[:, None]
+        dropped[rows, tutorials[lowest]] = np.isfinite(sub[rows, lowest])
+        counted &= ~dropped
+
+    effective = counted * w
+    total_weight = effective.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        final = np.where(total_weight > 0, (filled * effective).sum(axis=1) / total_weight, np.nan)
+    grades = np.where(np.isnan(final), "", grading.letter_grades(np.nan_to_num(final), bands))
+    return pd.DataFrame({
+        "Final (%)": final.round(2),
+        "Grade": grades,
+        "Missing": (~present).sum(axis=1),
+        "Dropped": dropped.sum(axis=1),
+    }, index=matrix.index)
+
+
+def gradebook(store, config=None, bands=None):
+    """(gradebook frame, weights used, students recomputed).
+
+    The frame has Student ID, Name, one column per component, Final (%),
+    Grade, Missing and Dropped. config is load_config(store) by default.
+    """
+    values, names, recomputed = matrix(store)
+    config = load_config(store) if config is None else config
+    weights = effective_weights(store, values.columns, config)
+    result = final_grades(values, weights, config.get("policy", "zero"), int(config.get("drop_lowest", 0)), bands)
+    table = values.copy()
+    table.columns = display_names(values.columns)
+    table = pd.concat([table.round(2), result], axis=1)
+    table.insert(0, "Name", names.reindex(table.index).to_numpy())
+    table = table.rename_axis("Student ID").reset_index()
+    return table.sort_values("Student ID", key=lambda ids: ids.map(natural_key)).reset_index(drop=True), weights, recomputed
+
+
+def display_names(columns):
+    """Component names for display; a test named like an assessment gets " (test)"."""
+    tutorials = {c[1] for c in columns if c[0] == TUTORIAL}
+    return [f"{c[1]} (test)" if c[0] == TEST and c[1] in tutorials else c[1] for c in columns]
+
+
+# -------------------------- CONFIG -------------------------- #
+def _config_path(store):
+    return os.path.join(store.folder, CONFIG_FILE)
+
+
+def load_config(store):
+    """Saved {"weights": [{Source, Component, Weight}], "policy", "drop_lowest"}, or defaults."""
+    try:
+        with open(_config_path(store), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"weights": [], "policy": "zero", "drop_lowest": 0}
+
+
+def save_config(store, config):
+    text = json.dumps(config, indent=2)
+
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    coordinator.atomic_write(_config_path(store), write)
+
+
+def effective_weights(store, columns, config):
+    """Saved weights, with defaults for components that have none saved."""
+    tests = store.load_test_results() if store.has_test_results() else None
+    weights = default_weights(columns, entered_test_weights(tests))
+    saved = {(w["Source"], w["Component"]): float(w["Weight"]) for w in config.get("weights", [])}
+    weights.update({c: saved[c] for c in columns if c in saved})
+    return weights
+
+
+if __name__ == "__main__":
+    import sys
+
+    import data_store
+
+    table, _, _ = gradebook(data_store.backend())
+    if len(sys.argv) > 1:
+        table.to_csv(sys.argv[1], index=False)
+        print(f"Wrote {len(table)} students to {sys.argv[1]}")
+    else:
+        print(table.to_string(index=False))
@@ -0,0 +1,159 @@
+# grading.py
+# Letter grades and motivational feedback for tutorial marks.
+#
+# get_letter_grade / get_feedback grade one submission. grade_arrays and
+# grade_frame grade a whole batch column-wise with NumPy (bulk marks entry,
+# imports, "Regrade All"), so no path has to loop over rows.
+#
+# Grade bands are configurable with GRADE_BANDS, e.g. "A:80,B:60,C:50,D:0"
+# (letter:minimum percentage, highest first). Feedback is drawn from a NumPy
+# Generator; set GRADING_FEEDBACK_SEED (or pass rng=) for repeatable picks.
+import os
+
+import numpy as np
+
+from data_store import CRITERIA
+
+MAX_PER_CRITERION = 4
+
+
+# -------------------------- GRADE BANDS -------------------------- #
+def parse_bands(text):
+    """Parse "A:80,B:60,C:50,D:0" into [("A", 80.0), ...], highest first."""
+    bands = []
+    for part in text.split(","):
+        letter, _, minimum = part.partition(":")
+        bands.append((letter.strip(), float(minimum)))
+    bands.sort(key=lambda band: band[1], reverse=True)
+    if not bands or bands[-1][1] > 0:
+        raise ValueError(f"GRADE_BANDS must end with a band starting at 0, got {text!r}")
+    return bands
+
+
+GRADE_BANDS = parse_bands(os.environ.get("GRADE_BANDS", "A:80,B:60,C:50,D:0"))
+
+
+def make_rng(seed=None):
+    """NumPy Generator for feedback picks (GRADING_FEEDBACK_SEED if seed is None)."""
+    if seed is None and os.environ.get("GRADING_FEEDBACK_SEED"):
+        seed = int(os.environ["GRADING_FEEDBACK_SEED"])
+    return np.random.default_rng(seed)
+
+
+_rng = make_rng()
+
+# -------------------------- MOTIVATIONAL FEEDBACK -------------------------- #
+feedback_dict = {
+    "A": [
+        "Phenomenal performance! You’ve shown mastery, clarity, and confidence — keep inspiring others.",
+        "Outstanding! You didn’t just answer, you taught the topic back to us with excellence.",
+        "Superb! You’ve nailed accuracy, depth, and presentation — a true role model.",
+        "Brilliant effort! Every detail was sharp and thoughtful. Keep shining at this level.",
+        "Exceptional work — you’ve turned learning into leadership. Stay consistent, you’re unstoppable."
+    ],
+    "B": [
+        "Strong effort! You’re very close to excellence — just a little polish will get you there.",
+        "Great work overall. You’ve built a solid foundation — now aim for sharper accuracy.",
+        "Well done! Your understanding is clear, and with more detail, you’ll hit the top band.",
+        "Good progress! Keep stretching your explanations to unlock your full potential.",
+        "You’re on the right track! Stay focused and keep refining your answers."
+    ],
+    "C": [
+        "You’ve made a fair attempt — now let’s aim for stronger accuracy and detail.",
+        "Decent effort, but more depth is needed. Push yourself a little more each time.",
+        "You’re building the basics. Stay consistent, and growth will follow.",
+        "Good start! Strengthening clarity and completeness will lift your grade higher.",
+        "Don’t stop here — keep improving step by step, and you’ll surprise yourself."
+    ],
+    "D": [
+        "This round was tough, but it’s only the beginning — you can improve with steady effort.",
+        "Don’t be discouraged! Focus on the core concepts, and progress will come.",
+        "Challenges help us grow. Keep practicing, and your results will rise.",
+        "It’s a slow start, but every step forward counts. Believe in your progress.",
+        "Stay motivated — even small improvements will lead to big achievements."
+    ]
+}
+
+def get_feedback(percentage, bands=None, rng=None):
+    return str(random_feedback([get_letter_grade(percentage, bands)], rng)[0])
+
+def get_letter_grade(percentage, bands=None):
+    for letter, minimum in bands or GRADE_BANDS:
+        if percentage >= minimum:
+            return letter
+    return (bands or GRADE_BANDS)[-1][0]
+
+
+# -------------------------- BATCH GRADING -------------------------- #
+def letter_grades(percentages, bands=None):
+    """Vectorized get_letter_grade for an array/Series of percentages."""
+    bands = bands or GRADE_BANDS
+    p = np.asarray(percentages, dtype=float)
+    return np.select(
+        [p >= minimum for _, minimum in bands[:-1]],
+        [letter for letter, _ in bands[:-1]],
+        default=bands[-1][0],
+    )
+
+
+def random_feedback(grades, rng=None):
+    """One random feedback line per grade, drawn column-wise.
+
+    Grades without a feedback list (custom bands) get an empty string.
+    """
+    rng = rng or _rng
+    grades = np.asarray(grades)
+    feedback = np.full(len(grades), "", dtype=object)
+    for grade, options in feedback_dict.items():
+        mask = grades == grade
+        picks = rng.integers(0, len(options), size=int(mask.sum()))
+        feedback[mask] = np.asarray(options, dtype=object)[picks]
+    return feedback
+
+
+def grade_arrays(criterion_scores, max_per_criterion=MAX_PER_CRITERION, bands=None, rng=None):
+    """Grade a whole batch in one pass.
+
+    criterion_scores is an (n_rows, n_criteria) array-like; missing scores
+    count as 0. Returns a dict of arrays: Total, Percentage, Grade, Feedback.
+    """
+    scores = np.nan_to_num(np.asarray(criterion_scores, dtype=float))
+    totals = scores.sum(axis=1).astype(int)
+    max_score = scores.shape[1] * max_per_criterion
+    percentages = totals / max_score * 100 if max_score > 0 else np.zeros(len(totals))
+    grades = letter_grades(percentages, bands)
+    return {
+        "Total": totals,
+        "Percentage": percentages,
+        "Grade": grades,
+        "Feedback": random_feedback(grades, rng),
+    }
+
+
+def grade_frame(df, criteria=CRITERIA, bands=None, rng=None):
+    """Fill Total, Percentage, Grade and Feedback for every row of df.
+
+    Missing criterion scores count as 0. Returns a new frame.
+    """
+    df = df.copy()
+    df[criteria] = df[criteria].fillna(0).astype(int)
+    for column, values in grade_arrays(df[criteria].to_numpy(), bands=bands, rng=rng).items():
+        df[column] = values
+    return df
+
+
+def regrade(df, criteria=CRITERIA, bands=None, rng=None):
+    """Recompute totals and grades for saved scores (e.g. after a band change).
+
+    Rows whose grade does not change keep their existing feedback.
+    Returns (regraded_frame, number_of_rows_whose_grade_changed).
+    """
+    old_grade = df["Grade"].astype(str).to_numpy() if "Grade" in df.columns else None
+    old_feedback = df["Feedback"].to_numpy() if "Feedback" in df.columns else None
+    regraded = grade_frame(df, criteria, bands, rng)
+    if old_grade is None:
+        return regraded, len(regraded)
+    changed = regraded["Grade"].to_numpy() != old_grade
+    if old_feedback is not None:
+        regraded["Feedback"] = np.where(changed, regraded["Feedback"].to_numpy(), old_feedback)
+    return regraded, int(changed.sum())
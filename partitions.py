@@ -0,0 +1,194 @@
+# partitions.py
+# Course / cohort / semester partitions of the grading data.
+#
+# A partition is a folder under data_store.PARTITIONS_DIR (e.g.
+# partitions/BIO101/2024/S1) holding one group's student list, scores and
+# test results, plus everything derived from them. data_store.backend(name)
+# reads and writes only that folder, so a tutor for one group never loads
+# the rest of the faculty's history. partition.json in the folder records
+# the course, cohort and semester. The default partition "" is the working
+# directory, where the data lived before partitions existed.
+#
+# faculty_report() is the cross-partition path. It visits the partitions one
+# at a time and reads only each one's dashboard summaries (never its rows),
+# keeping a running total. Memory therefore stays that of one partition
+# however many there are. iter_frames() streams each partition's rows in
+# the same way, for reports the summaries cannot answer.
+#
+#     python partitions.py list
+#     python partitions.py create COURSE [COHORT] [SEMESTER]
+#     python partitions.py report [faculty_report.csv]
+import json
+import os
+
+import pandas as pd
+
+import coordinator
+import data_store
+import summaries
+from grading import GRADE_BANDS
+
+META_FILE = "partition.json"
+DEFAULT_LABEL = "Shared (no partition)"
+
+
+def partition_name(course, cohort="", semester=""):
+    """"COURSE/COHORT/SEMESTER" from the non-empty parts."""
+    parts = [str(p).strip() for p in (course, cohort, semester) if str(p).strip()]
+    if not parts:
+        raise ValueError("A partition needs at least a course.")
+    name = "/".join(parts)
+    data_store.partition_folder(name)  # validates
+    return name
+
+
+def label(name):
+    return name or DEFAULT_LABEL
+
+
+def create(course, cohort="", semester=""):
+    """Create (or reuse) the partition for a course/cohort/semester; returns its name."""
+    name = partition_name(course, cohort, semester)
+    folder = data_store.partition_folder(name)
+    os.makedirs(folder, exist_ok=True)
+    meta_file = os.path.join(folder, META_FILE)
+    if not os.path.exists(meta_file):
+        meta = {"course": str(course).strip(), "cohort": str(cohort).strip(), "semester": str(semester).strip()}
+        coordinator.atomic_write(meta_file, lambda tmp: _write_json(tmp, meta))
+    return name
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def describe(name):
+    """{"course", "cohort", "semester"} of a partition ({} for the default one)."""
+    try:
+        with open(os.path.join(data_store.partition_folder(name), META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def list_partitions():
+    """Names of the created partitions, sorted."""
+    names = []
+    for folder, _, files in os.walk(data_store.PARTITIONS_DIR):
+        if META_FILE in files:
+            names.append(os.path.relpath(folder, data_store.PARTITIONS_DIR).replace(os.sep, "/"))
+    return sorted(names)
+
+
+def _has_data(store):
+    return store.has_scores() or store.has_test_results()
+
+
+def all_partitions():
+    """Every partition with data: the default one (if used) and the created ones."""
+    default = [""] if _has_data(data_store.backend("")) else []
+    return default + list_partitions()
+
+
+# -------------------------- CROSS-PARTITION -------------------------- #
+def iter_frames(kind="scores", columns=None, names=None):
+    """Yield (partition, rows) for each partition, loading one at a time.
+
+    kind is "scores" (columns limits the columns read) or "tests".
+    Partitions without such rows are skipped.
+    """
+    for name in all_partitions() if names is None else names:
+        store = data_store.backend(name)
+        if kind == "scores" and store.has_scores():
+            yield name, store.load_scores(columns)
+        elif kind == "tests" and store.has_test_results():
+            yield name, store.load_test_results()
+
+
+def _running(stats):
+    """Summary stats (count/mean/std/min/max) back as mergeable sums."""
+    count = stats["count"]
+    if not count:
+        return {"count": 0, "sum": 0.0, "sumsq": 0.0, "min": None, "max": None}
+    mean, std = stats["mean"], stats["std"]
+    return {"count": count, "sum": mean * count, "sumsq": (std * std + mean * mean) * count,
+            "min": stats["min"], "max": stats["max"]}
+
+
+def _partition_row(name, store):
+    score_stats = store.summaries.score_stats()
+    weighted = store.summaries.test_overall()["Weighted (%)"]
+    counts = store.summaries.grade_counts()
+    grades = dict(zip(counts["Grade"], counts["Count"]))
+    meta = describe(name)
+    row = {
+        "Partition": label(name),
+        **{part.title(): meta.get(part, "") for part in ("course", "cohort", "semester")},
+        "Students": len(store.summaries.student_names()),
+        "Score Records": store.summaries.count_scores(),
+        "Assessments": len(store.summaries.assessments()),
+        "Percentage_mean": score_stats["mean"],
+        "Percentage_std": score_stats["std"],
+        "Percentage_min": score_stats["min"],
+        "Percentage_max": score_stats["max"],
+        **{f"Grade {letter}": grades.get(letter, 0) for letter, _ in GRADE_BANDS},
+        "Tests": len(store.summaries.test_names()),
+        "Test Records": weighted["count"],
+        "Weighted (%)_mean": weighted["mean"],
+    }
+    return row, score_stats, weighted
+
+
+def faculty_report(names=None):
+    """One row per partition plus an "All partitions" total row.
+
+    Only the partitions' summaries are read, one partition at a time; the
+    totals are merged from running count/sum/sum-of-squares, so the overall
+    mean and std are exact.
+    """
+    rows, score_parts, weighted_parts = [], [], []
+    for name in all_partitions() if names is None else names:
+        store = data_store.backend(name)
+        if not _has_data(store):
+            continue
+        row, score_stats, weighted = _partition_row(name, store)
+        rows.append(row)
+        score_parts.append(_running(score_stats))
+        weighted_parts.append(_running(weighted))
+    if not rows:
+        return pd.DataFrame()
+    report = pd.DataFrame(rows)
+    overall = summaries.merge_stats(score_parts)
+    total = {
+        "Partition": "All partitions",
+        "Students": report["Students"].sum(),
+        "Score Records": report["Score Records"].sum(),
+        "Assessments": report["Assessments"].sum(),
+        **{f"Percentage_{stat}": overall[stat] for stat in ("mean", "std", "min", "max")},
+        **{c: report[c].sum() for c in report.columns if c.startswith("Grade ")},
+        "Tests": report["Tests"].sum(),
+        "Test Records": report["Test Records"].sum(),
+        "Weighted (%)_mean": summaries.merge_stats(weighted_parts)["mean"],
+    }
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1:2]
+    if command == ["list"]:
+        for name in all_partitions():
+            print(label(name))
+    elif command == ["create"] and len(sys.argv) > 2:
+        print(f"Created partition {create(*sys.argv[2:5])} in {data_store.PARTITIONS_DIR}")
+    elif command == ["report"]:
+        report = faculty_report()
+        if len(sys.argv) > 2:
+            report.to_csv(sys.argv[2], index=False)
+            print(f"Wrote {len(report)} rows to {sys.argv[2]}")
+        else:
+            print(report.to_string(index=False))
+    else:
+        print("usage: python partitions.py list | create COURSE [COHORT] [SEMESTER] | report [file.csv]")
@@ -0,0 +1,181 @@
+# profiling.py
+# Opt-in per-rerun instrumentation.
+#
+# Off unless GRADING_PROFILE=1 is set or "Profiling" is ticked in the
+# sidebar. While a rerun is being profiled it collects:
+#   - time per app section and per timed helper (sections),
+#   - every file read/write/append and SQLite query with its duration and
+#     size in bytes (io); cached loads only show up when the cache misses,
+#   - optionally a cProfile capture of the whole rerun.
+# Each profiled rerun is appended as one JSON line to GRADING_PROFILE_LOG
+# (default profile.jsonl) and the app shows the breakdown in the sidebar.
+# With profiling off, section() and io() cost one thread-local lookup.
+import cProfile
+import functools
+import io as _io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("GRADING_PROFILE", "").lower() in ("1", "true", "yes", "on")
+LOG_FILE = os.environ.get("GRADING_PROFILE_LOG", "profile.jsonl")
+TOP_FUNCTIONS = 25
+
+_local = threading.local()
+
+
+class Recorder:
+    """Timings collected during one rerun."""
+
+    def __init__(self, kind, label):
+        self.kind, self.label = kind, label
+        self.started = time.time()
+        self.total_ms = None
+        self.sections = {}
+        self.io = []
+        self.profile_file = None
+        self.profile_text = None
+
+    def add_section(self, name, ms):
+        entry = self.sections.setdefault(name, {"ms": 0.0, "calls": 0})
+        entry["ms"] += ms
+        entry["calls"] += 1
+
+    def io_totals(self):
+        """{op: {"count", "bytes", "ms"}} over the recorded file operations."""
+        totals = {}
+        for op in self.io:
+            entry = totals.setdefault(op["op"], {"count": 0, "bytes": 0, "ms": 0.0})
+            entry["count"] += 1
+            entry["bytes"] += op["bytes"] or 0
+            entry["ms"] += op["ms"]
+        return totals
+
+    def to_json(self):
+        return {
+            "ts": round(self.started, 3),
+            "pid": os.getpid(),
+            "kind": self.kind,
+            "label": self.label,
+            "total_ms": round(self.total_ms, 2),
+            "sections": {name: {"ms": round(e["ms"], 2), "calls": e["calls"]} for name, e in self.sections.items()},
+            "io": self.io,
+            "io_totals": self.io_totals(),
+            "profile": self.profile_file,
+        }
+
+
+def current():
+    """The Recorder for the rerun running in this thread, or None."""
+    return getattr(_local, "recorder", None)
+
+
+@contextmanager
+def rerun(kind, label="", capture=False):
+    """Profile the wrapped rerun; yields its Recorder.
+
+    capture=True also runs cProfile and saves the stats next to LOG_FILE.
+    Nested inside another profiled rerun (a fragment during a full run) it
+    just yields the outer Recorder.
+    """
+    if current() is not None:
+        yield current()
+        return
+    recorder = Recorder(kind, label)
+    profiler = cProfile.Profile() if capture else None
+    _local.recorder = recorder
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield recorder
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        recorder.total_ms = (time.perf_counter() - start) * 1000
+        _local.recorder = None
+        if profiler is not None:
+            _save_profile(recorder, profiler)
+        _log(recorder)
+
+
+@contextmanager
+def section(name):
+    """Time the wrapped block as a named section of the current rerun."""
+    recorder = current()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_section(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name=None):
+    """Decorator form of section(), named after the function by default."""
+    def decorate(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Op:
+    nbytes = None
+
+
+@contextmanager
+def io(op, path):
+    """Time a file operation on path.
+
+    The size recorded is the file's size afterwards, unless the block sets
+    nbytes on the yielded object (e.g. the length of an append).
+    """
+    recorder = current()
+    record = _Op()
+    if recorder is None:
+        yield record
+        return
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        nbytes = record.nbytes
+        if nbytes is None:
+            try:
+                nbytes = os.path.getsize(path)
+            except OSError:
+                nbytes = None
+        recorder.io.append({"op": op, "path": os.path.basename(str(path)), "bytes": nbytes, "ms": round(ms, 2)})
+
+
+# -------------------------- OUTPUT -------------------------- #
+def _save_profile(recorder, profiler):
+    folder = os.path.dirname(os.path.abspath(LOG_FILE))
+    recorder.profile_file = os.path.join(folder, f"profile-{int(recorder.started * 1000)}.prof")
+    try:
+        profiler.dump_stats(recorder.profile_file)
+    except OSError:
+        recorder.profile_file = None
+    out = _io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    recorder.profile_text = out.getvalue()
+
+
+def _log(recorder):
+    try:
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(recorder.to_json()) + "\n")
+    except OSError:
+        # Profiling must never break the app (e.g. a read-only deployment)
+        pass
@@ -0,0 +1,272 @@
+# reports.py
+# End-of-term report packs: one file per student, bundled in a ZIP.
+#
+# Each report has the student's tutorial criteria, grades and feedback,
+# their test scores and a trend chart of Percentage across assessments:
+#   - Excel: one sheet with both tables and a native line chart (drawn by
+#     Excel itself when the file is opened),
+#   - PDF: the chart is drawn with matplotlib, so it needs matplotlib.
+#
+# generate() splits the students into chunks of CHUNK_STUDENTS and builds
+# them in a process pool (GRADING_REPORT_WORKERS processes, default one per
+# core), so charts are rendered in the workers and never on the Streamlit
+# thread. A worker writes each report to a temporary folder next to the ZIP;
+# the parent adds finished files to the ZIP on disk and deletes them. Only a
+# few chunks are in flight at a time, so memory stays bounded whatever the
+# cohort size. generate() yields (done, total) after each chunk for a progress
+# bar. Stopping the iteration (close() or an exception, e.g. Streamlit
+# stopping the run because Cancel was clicked) cancels the queued chunks
+# and removes the partial ZIP.
+#
+# Workers are started with "spawn" (forking the multi-threaded Streamlit
+# server is unsafe), so this module imports only what the workers need.
+#
+#     python reports.py [xlsx|pdf] [reports.zip]
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from importlib.util import find_spec
+from multiprocessing import get_context
+
+import pandas as pd
+
+FORMATS = {"xlsx": "Excel (.xlsx)", "pdf": "PDF (.pdf)"}
+WORKERS = int(os.environ.get("GRADING_REPORT_WORKERS", "0")) or os.cpu_count() or 1
+# Students per task: large enough to amortize pickling, small enough for smooth progress
+CHUNK_STUDENTS = 20
+# Chunks queued per worker at any time
+IN_FLIGHT_PER_WORKER = 2
+
+CRITERIA = ["Accuracy", "Clarity", "Depth", "Completeness", "Presentation"]
+SCORE_COLUMNS = ["Assessment", *CRITERIA, "Total", "Percentage", "Grade", "Feedback"]
+TEST_COLUMNS = ["Test Name", "MCQ", "SAQ", "Raw Score", "Scaled Score", "Weighted (%)", "Total"]
+
+
+def available_formats():
+    """FORMATS that can be built here (PDF needs matplotlib)."""
+    return {k: v for k, v in FORMATS.items() if k != "pdf" or find_spec("matplotlib") is not None}
+
+
+def _safe(text):
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(text)).strip("_") or "student"
+
+
+def file_name(student_id, name, fmt):
+    return f"{_safe(name)}_{_safe(student_id)}.{fmt}"
+
+
+# -------------------------- ONE REPORT (WORKER SIDE) -------------------------- #
+def _write_xlsx(path, student, scores, tests):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path)
+    sheet = workbook.add_worksheet("Report")
+    bold = workbook.add_format({"bold": True})
+    title = workbook.add_format({"bold": True, "font_size": 14})
+    wrap = workbook.add_format({"text_wrap": True, "valign": "top"})
+
+    sheet.write(0, 0, f"Report for {student['name']} ({student['id']})", title)
+    if student["partition"]:
+        sheet.write(1, 0, student["partition"])
+    row = 3
+    sheet.write(row, 0, "Tutorial Assessments", bold)
+    sheet.write_row(row + 1, 0, SCORE_COLUMNS, bold)
+    first = row + 2
+    for i, values in enumerate(scores.itertuples(index=False, name=None)):
+        sheet.write_row(first + i, 0, [None if pd.isna(v) else v for v in values])
+    sheet.set_column(len(SCORE_COLUMNS) - 1, len(SCORE_COLUMNS) - 1, 60, wrap)
+    sheet.set_column(0, 0, 18)
+    row = first + max(len(scores), 1) + 1
+
+    sheet.write(row, 0, "Tests", bold)
+    sheet.write_row(row + 1, 0, TEST_COLUMNS, bold)
+    for i, values in enumerate(tests.itertuples(index=False, name=None)):
+        sheet.write_row(row + 2 + i, 0, [None if pd.isna(v) else v for v in values])
+    if tests.empty:
+        sheet.write(row + 2, 0, "No test results")
+    row += len(tests) + 4
+
+    if len(scores):
+        chart = workbook.add_chart({"type": "line"})
+        percentage = SCORE_COLUMNS.index("Percentage")
+        chart.add_series({
+            "name": "Percentage",
+            "categories": ["Report", first, 0, first + len(scores) - 1, 0],
+            "values": ["Report", first, percentage, first + len(scores) - 1, percentage],
+            "marker": {"type": "circle"},
+        })
+        chart.set_title({"name": "Progress Over Assessments"})
+        chart.set_y_axis({"min": 0, "max": 100, "name": "Percentage (%)"})
+        chart.set_legend({"none": True})
+        sheet.insert_chart(row, 0, chart)
+    workbook.close()
+
+
+def _text_table(df):
+    """df as fixed-width text; one text object draws much faster than a table."""
+    return df.to_string(index=False, na_rep="", float_format=lambda v: f"{v:.2f}".rstrip("0").rstrip("."))
+
+
+def _write_pdf(path, student, scores, tests):
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_pdf import PdfPages
+    import matplotlib.pyplot as plt
+
+    # The 14 standard PDF fonts need no embedding, which was most of the writing
+    # time. They only come in "medium", which font lookups would warn about.
+    logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+    with plt.rc_context({"pdf.use14corefonts": True}), PdfPages(path) as pdf:
+        fig = plt.figure(figsize=(8.27, 11.69))  # A4 portrait
+        fig.text(0.08, 0.95, f"Report for {student['name']} ({student['id']})", fontsize=15, weight="bold")
+        if student["partition"]:
+            fig.text(0.08, 0.925, student["partition"], fontsize=10, color="grey")
+
+        chart = fig.add_axes([0.1, 0.66, 0.82, 0.22])
+        if len(scores):
+            chart.plot(scores["Assessment"].astype(str), scores["Percentage"], marker="o")
+            chart.tick_params(axis="x", labelrotation=30, labelsize=8)
+        chart.set_ylim(0, 100)
+        chart.set_ylabel("Percentage (%)")
+        chart.set_title("Progress Over Assessments")
+        chart.grid(alpha=0.3)
+
+        mono = {"family": "monospace", "fontsize": 7, "va": "top"}
+        fig.text(0.08, 0.56, "Tutorial Assessments", fontsize=11, weight="bold")
+        fig.text(0.08, 0.545, _text_table(scores[SCORE_COLUMNS[:-1]]) if len(scores) else "No marks yet", **mono)
+        fig.text(0.08, 0.27, "Tests", fontsize=11, weight="bold")
+        fig.text(0.08, 0.255, _text_table(tests) if len(tests) else "No test results", **mono)
+        pdf.savefig(fig)
+        plt.close(fig)
+
+        if len(scores):
+            fig = plt.figure(figsize=(8.27, 11.69))
+            fig.text(0.08, 0.95, "Feedback", fontsize=13, weight="bold")
+            text = "\n\n".join(f"{a} ({g}): {f}" for a, g, f in
+                                scores[["Assessment", "Grade", "Feedback"]].itertuples(index=False, name=None))
+            fig.text(0.08, 0.92, text, fontsize=9, va="top", wrap=True)
+            pdf.savefig(fig)
+            plt.close(fig)
+
+
+_WRITERS = {"xlsx": _write_xlsx, "pdf": _write_pdf}
+
+
+def _build_chunk(students, fmt, folder):
+    """Write one report per student into folder; returns [(file name, path)]."""
+    written = []
+    for student, scores, tests in students:
+        name = file_name(student["id"], student["name"], fmt)
+        path = os.path.join(folder, name)
+        _WRITERS[fmt](path, student, scores.reindex(columns=SCORE_COLUMNS), tests.reindex(columns=TEST_COLUMNS))
+        written.append((name, path))
+    return written
+
+
+# -------------------------- BATCH (PARENT SIDE) -------------------------- #
+def _students(scores, tests, partition, student_ids=None):
+    """(student, their score rows, their test rows) per student, in order of first record."""
+    by_student = {sid: rows for sid, rows in scores.groupby(scores["Student ID"].astype(str), sort=False)}
+    test_rows = {sid: rows for sid, rows in tests.groupby(tests["Student ID"].astype(str), sort=False)} \
+        if len(tests) else {}
+    ids = list(dict.fromkeys([*by_student, *test_rows])) if student_ids is None else [str(s) for s in student_ids]
+    empty_scores, empty_tests = pd.DataFrame(columns=SCORE_COLUMNS), pd.DataFrame(columns=TEST_COLUMNS)
+    for sid in ids:
+        rows = by_student.get(sid, empty_scores)
+        tried = test_rows.get(sid, empty_tests)
+        names = rows["Name"] if "Name" in rows and len(rows) else tried.get("Student Name", pd.Series(dtype=str))
+        student = {"id": sid, "name": str(names.iloc[-1]) if len(names) else sid, "partition": partition}
+        yield student, rows, tried
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def student_count(scores, tests):
+    ids = set(scores["Student ID"].astype(str)) if len(scores) else set()
+    if len(tests):
+        ids |= set(tests["Student ID"].astype(str))
+    return len(ids)
+
+
+def generate(store, zip_path, fmt="xlsx", student_ids=None, workers=None):
+    """Build every student's report into zip_path; yields (done, total) students.
+
+    Closing the generator early cancels the remaining work and deletes the
+    partial ZIP.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format: {fmt}")
+    scores = store.load_scores() if store.has_scores() else pd.DataFrame(columns=["Student ID", *SCORE_COLUMNS])
+    tests = store.load_test_results() if store.has_test_results() else pd.DataFrame(columns=["Student ID"])
+    # Plain text instead of categories, which would be pickled with every chunk
+    scores = scores.astype({c: "str" for c in scores.select_dtypes("category").columns})
+    total = student_count(scores, tests) if student_ids is None else len(student_ids)
+    partition = getattr(store, "partition", "")
+    chunks = _chunks(_students(scores, tests, partition, student_ids), CHUNK_STUDENTS)
+
+    workers = workers or WORKERS
+    folder = tempfile.mkdtemp(prefix="reports_", dir=os.path.dirname(os.path.abspath(zip_path)))
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    finished = False
+    try:
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            done = 0
+            pending = set()
+            yield done, total
+            while True:
+                while len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.add(pool.submit(_build_chunk, chunk, fmt, folder))
+                if not pending:
+                    break
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    for name, path in future.result():
+                        archive.write(path, name)
+                        os.remove(path)
+                        done += 1
+                yield done, total
+        finished = True
+    finally:
+        # Queued chunks are dropped; running ones finish before their folder goes
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(folder, ignore_errors=True)
+        if not finished and os.path.exists(zip_path):
+            os.remove(zip_path)
+
+
+def build_zip(store, zip_path, fmt="xlsx", student_ids=None, workers=None):
+    """generate() run to the end; returns the number of reports."""
+    done = 0
+    for done, _ in generate(store, zip_path, fmt, student_ids, workers):
+        pass
+    return done
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    import data_store
+
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "xlsx"
+    target = sys.argv[2] if len(sys.argv) > 2 else "reports.zip"
+    start = time.perf_counter()
+    count = build_zip(data_store.backend(), target, fmt)
+    print(f"Wrote {count} {fmt} reports to {target} with {WORKERS} workers "
+          f"in {time.perf_counter() - start:.1f}s")
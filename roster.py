@@ -0,0 +1,90 @@
+# roster.py
+# In-memory index over the imported student list.
+#
+# Built once per roster version (data_store.load_roster_index caches it on
+# the file signature), it answers the lookups the entry forms need without
+# scanning the roster:
+#   - Student ID -> record
+#   - normalized name -> Student IDs (several students can share a name)
+#   - name/ID token prefixes -> Student IDs, for search-as-you-type
+# Pickers select by Student ID, so two students with the same name are
+# never confused.
+import bisect
+import unicodedata
+
+# Upper bound on results returned to a picker
+SEARCH_LIMIT = 50
+
+
+def normalize(text):
+    """Case-, accent- and whitespace-insensitive form of a name or ID."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+class RosterIndex:
+    """Lookups over a roster frame with detected id_col and name_col."""
+
+    def __init__(self, student_list, id_col, name_col):
+        self.id_col, self.name_col = id_col, name_col
+        self.ids = []
+        self.records = {}
+        self.by_name = {}
+        position = {}
+        pairs = set()
+        for record in student_list.to_dict("records"):
+            student_id = str(record[id_col])
+            if student_id in self.records:
+                # Repeated ID: the first row wins, as with the old lookup
+                continue
+            position[student_id] = len(self.ids)
+            self.ids.append(student_id)
+            self.records[student_id] = record
+            name = normalize(record[name_col])
+            self.by_name.setdefault(name, []).append(student_id)
+            for token in name.split() + [normalize(student_id)]:
+                pairs.add((token, position[student_id]))
+        # Sorted (token, roster position) pairs; a prefix is one bisect away
+        pairs = sorted(pairs)
+        self._tokens = [token for token, _ in pairs]
+        self._positions = [pos for _, pos in pairs]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, student_id):
+        return self.records.get(str(student_id))
+
+    def name(self, student_id):
+        record = self.get(student_id)
+        return None if record is None else record[self.name_col]
+
+    def label(self, student_id):
+        """"Name (ID)" for pickers, so equal names stay distinguishable."""
+        return f"{self.name(student_id)} ({student_id})"
+
+    def ids_for_name(self, name):
+        return list(self.by_name.get(normalize(name), []))
+
+    def _prefix_positions(self, prefix):
+        start = bisect.bisect_left(self._tokens, prefix)
+        end = bisect.bisect_left(self._tokens, prefix + "\U0010ffff", start)
+        return set(self._positions[start:end])
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Student IDs matching every word of query as a name/ID prefix.
+
+        Results are in roster order. Returns (ids, total_matches); ids holds
+        at most limit entries. An empty query matches everyone.
+        """
+        words = normalize(query).split()
+        if not words:
+            return self.ids[:limit], len(self.ids)
+        matches = self._prefix_positions(words[0])
+        for word in words[1:]:
+            if not matches:
+                break
+            matches &= self._prefix_positions(word)
+        positions = sorted(matches)
+        return [self.ids[pos] for pos in positions[:limit]], len(positions)
@@ -0,0 +1,225 @@
+# roster_import.py
+# Streaming import of student lists (CSV or Excel) for the Import Students tab.
+#
+# Registrar exports can have tens of thousands of rows and many columns, of
+# which the app needs two. The upload is therefore never loaded whole:
+#   - the header is read first to find the Student ID and Name columns,
+#   - CSV files are read in chunks of CHUNK_ROWS with only those two columns,
+#   - Excel files are walked row by row with openpyxl in read-only mode,
+#     keeping only those two cells.
+# Each chunk is cleaned (whitespace stripped) and validated as it arrives:
+#   - rows without a Student ID or a Name are skipped,
+#   - a Student ID already seen earlier in the upload is skipped (the first
+#     row wins, as in roster.RosterIndex).
+# Every skipped row is counted; the first MAX_ISSUES are listed with their
+# row number. Uploads over MAX_ROWS rows are refused.
+#
+# merge() folds the cleaned rows into the saved roster:
+#   - known Student IDs get the uploaded Name,
+#   - new IDs are appended,
+#   - students missing from the upload are kept.
+# Pass replace=True to start the roster over instead.
+import os
+
+import numpy as np
+import pandas as pd
+
+import coordinator
+import data_store
+import profiling
+
+CHUNK_ROWS = 5000
+PREVIEW_ROWS = 20
+MAX_ISSUES = 1000
+MAX_ROWS = int(os.environ.get("GRADING_ROSTER_MAX_ROWS", "200000"))
+ID_COLUMN, NAME_COLUMN = "Student ID", "Name"
+
+
+def find_columns(header):
+    """(id column, name column) of an upload's header; either may be None.
+
+    An exact "Student ID"/"ID" or "Name"/"Student Name" wins over a column
+    that merely contains the word, so "Programme ID" is not taken for the ID.
+    """
+    header = [str(c).strip() for c in header]
+    lower = [c.lower() for c in header]
+
+    def pick(exact, word, avoid):
+        for i, c in enumerate(lower):
+            if c in exact:
+                return header[i]
+        for i, c in enumerate(lower):
+            if word in c and avoid not in c:
+                return header[i]
+        return None
+
+    return pick(("student id", "id"), "id", "name"), pick(("name", "student name"), "name", "id")
+
+
+def _is_csv(uploaded_file):
+    return uploaded_file.name.lower().endswith(".csv")
+
+
+def _columns(header):
+    id_col, name_col = find_columns(header)
+    if id_col is None or name_col is None:
+        raise ValueError("File must contain 'Student ID' and 'Name' columns.")
+    return id_col, name_col
+
+
+def _cell(value):
+    # Excel stores whole numbers as floats; 2024000001.0 is the ID 2024000001
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return None if value is None else str(value)
+
+
+# -------------------------- READING -------------------------- #
+def _csv_chunks(uploaded_file, rows=None):
+    uploaded_file.seek(0)
+    header = pd.read_csv(uploaded_file, nrows=0).columns
+    id_col, name_col = _columns(header)
+    uploaded_file.seek(0)
+    size = getattr(uploaded_file, "size", 0) or 0
+    reader = pd.read_csv(
+        uploaded_file, usecols=[id_col, name_col], dtype=str, keep_default_na=False,
+        chunksize=rows or CHUNK_ROWS, nrows=rows,
+    )
+    for chunk in reader:
+        done = min(uploaded_file.tell() / size, 1.0) if size else None
+        yield chunk[[id_col, name_col]].set_axis([ID_COLUMN, NAME_COLUMN], axis=1), done
+
+
+def _xlsx_chunks(uploaded_file, rows=None):
+    # Imported on first Excel import rather than on every app start
+    import openpyxl
+
+    uploaded_file.seek(0)
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        cells = sheet.iter_rows(values_only=True)
+        header = next(cells, None)
+        if header is None:
+            raise ValueError("The sheet is empty.")
+        header = ["" if c is None else str(c).strip() for c in header]
+        id_col, name_col = _columns(header)
+        id_at, name_at = header.index(id_col), header.index(name_col)
+        total = sheet.max_row
+        batch, seen = [], 0
+        for row in cells:
+            batch.append((_cell(row[id_at]) if id_at < len(row) else None,
+                          _cell(row[name_at]) if name_at < len(row) else None))
+            seen += 1
+            if len(batch) == (rows or CHUNK_ROWS) or seen == rows:
+                yield pd.DataFrame(batch, columns=[ID_COLUMN, NAME_COLUMN]), min(seen / total, 1.0) if total else None
+                batch = []
+                if seen == rows:
+                    return
+        if batch:
+            yield pd.DataFrame(batch, columns=[ID_COLUMN, NAME_COLUMN]), 1.0
+    finally:
+        workbook.close()
+
+
+def chunks(uploaded_file, rows=None):
+    """(Student ID/Name frame, share of the file read or None) per chunk.
+
+    rows limits how many data rows are read. Raises ValueError when the
+    ID or Name column cannot be found.
+    """
+    return _csv_chunks(uploaded_file, rows) if _is_csv(uploaded_file) else _xlsx_chunks(uploaded_file, rows)
+
+
+def preview(uploaded_file, rows=PREVIEW_ROWS):
+    """The first rows of the upload's Student ID and Name columns."""
+    frames = [chunk for chunk, _ in chunks(uploaded_file, rows)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[ID_COLUMN, NAME_COLUMN])
+
+
+# -------------------------- VALIDATION -------------------------- #
+def read(uploaded_file, on_progress=None):
+    """Clean and validate the whole upload, one chunk at a time.
+
+    Returns (students, issues, counts):
+      - students: unique Student ID/Name rows, in upload order,
+      - issues: Row, Student ID and Problem of the first MAX_ISSUES skipped rows,
+      - counts: rows read, valid, and skipped for each reason.
+    on_progress(share) is called after every chunk.
+    """
+    seen = set()
+    kept, issues, listed = [], [], 0
+    counts = {"rows": 0, "valid": 0, "missing ID": 0, "missing name": 0, "duplicate ID": 0}
+    for chunk, done in chunks(uploaded_file):
+        first_row = counts["rows"] + 2  # 1-based, after the header row
+        counts["rows"] += len(chunk)
+        if counts["rows"] > MAX_ROWS:
+            raise ValueError(f"The file has more than {MAX_ROWS} rows; split it or raise GRADING_ROSTER_MAX_ROWS.")
+        chunk = chunk.apply(lambda column: column.astype("str").str.strip().where(column.notna(), ""))
+        chunk.index = pd.RangeIndex(first_row, first_row + len(chunk))
+
+        problem = pd.Series("", index=chunk.index, dtype=object)
+        problem[chunk[NAME_COLUMN] == ""] = "missing name"
+        problem[chunk[ID_COLUMN] == ""] = "missing ID"
+        ids = chunk[ID_COLUMN]
+        # Only a row that would otherwise be kept can repeat an ID
+        candidates = ids[problem == ""]
+        # Set lookups per row; isin() would copy the whole seen set on every chunk
+        earlier = np.fromiter((i in seen for i in candidates.to_numpy()), dtype=bool, count=len(candidates))
+        problem[candidates.index[candidates.duplicated().to_numpy() | earlier]] = "duplicate ID"
+
+        valid = chunk[problem == ""]
+        seen.update(valid[ID_COLUMN])
+        kept.append(valid)
+        counts["valid"] += len(valid)
+        skipped = problem[problem != ""]
+        for reason, n in skipped.value_counts().items():
+            counts[reason] += n
+        if listed < MAX_ISSUES and len(skipped):
+            rows = pd.DataFrame({"Row": skipped.index, "Student ID": ids[skipped.index], "Problem": skipped})
+            issues.append(rows.head(MAX_ISSUES - listed))
+            listed += len(issues[-1])
+        if on_progress is not None:
+            on_progress(done)
+
+    students = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=[ID_COLUMN, NAME_COLUMN])
+    issues = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=["Row", "Student ID", "Problem"])
+    return students, issues, counts
+
+
+# -------------------------- MERGE -------------------------- #
+def merge(existing, students, replace=False):
+    """Saved roster with the imported students folded in: (roster, added, updated).
+
+    existing is the saved roster frame or None; its own ID/Name column
+    names and any extra columns are kept.
+    """
+    if replace or existing is None or existing.empty:
+        return students.reset_index(drop=True), len(students), 0
+    id_col, name_col = find_columns(existing.columns)
+    if id_col is None or name_col is None:
+        return students.reset_index(drop=True), len(students), 0
+    existing = existing.astype({id_col: "str", name_col: "str"})
+    names = students.set_index(ID_COLUMN)[NAME_COLUMN]
+    current = existing[id_col].str.strip()
+    known = current.isin(names.index)
+    new_names = current[known].map(names)
+    updated = int((new_names != existing.loc[known, name_col].str.strip()).sum())
+    merged = existing.copy()
+    merged.loc[known, name_col] = new_names
+    added = students[~students[ID_COLUMN].isin(current)].rename(columns={ID_COLUMN: id_col, NAME_COLUMN: name_col})
+    return pd.concat([merged, added], ignore_index=True), len(added), updated
+
+
+def save(store, students, replace=False):
+    """Merge students into store's roster under the write lock: (added, updated, total)."""
+    with coordinator.write_lock(store.lock_file):
+        path = store.roster_file
+        existing = None
+        if data_store.file_signature(path) is not None:
+            # Read as text so IDs such as 00123 keep their leading zeros
+            with profiling.io("read", path):
+                existing = pd.read_csv(path, dtype=str, keep_default_na=False)
+        roster, added, updated = merge(existing, students, replace)
+        data_store.save_student_list(roster, path)
+    return added, updated, len(roster)
@@ -0,0 +1,245 @@
+# rubric_analysis.py
+# Reliability of the five-criterion rubric and consistency between graders.
+#
+# From the saved tutorial marks (criteria scored 0-4, one row per record):
+#   - criterion means, standard deviations and how often each score is given,
+#   - the criterion x criterion correlation matrix,
+#   - Cronbach's alpha per assessment: k/(k-1) * (1 - sum of criterion
+#     variances / variance of the total), i.e. how consistently the five
+#     criteria measure one thing,
+#   - per grader and assessment: count, mean, spread and quartiles of
+#     Percentage, and its distribution in PERCENT_BIN-point bins,
+#   - drift: each grader's mean on an assessment against the other graders'
+#     marks on the same assessment. A grader is flagged when the difference is
+#     at least DRIFT_POINTS and Welch's t is at least DRIFT_T, with at least
+#     MIN_RECORDS marks on both sides.
+# Everything is derived from per-group counts, sums, cross-products and
+# histograms, accumulated with np.bincount over BATCH_ROWS rows at a time, so
+# no per-group frames are built however many marks there are. analysis()
+# caches the results per data version. Records saved before the Grader
+# column existed are grouped as UNKNOWN_GRADER.
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import data_store
+import profiling
+from gradebook import natural_key
+from data_store import CRITERIA, GRADER
+from grading import MAX_PER_CRITERION
+
+BATCH_ROWS = 50_000
+PERCENT_BIN = 5
+MIN_RECORDS = int(os.environ.get("GRADING_DRIFT_MIN_RECORDS", "20"))
+DRIFT_POINTS = float(os.environ.get("GRADING_DRIFT_POINTS", "5"))
+DRIFT_T = float(os.environ.get("GRADING_DRIFT_T", "2"))
+UNKNOWN_GRADER = "(not recorded)"
+# Usual reading of Cronbach's alpha, lowest bound first
+ALPHA_LABELS = [(0.9, "Excellent"), (0.8, "Good"), (0.7, "Acceptable"), (0.6, "Questionable"), (0.5, "Poor")]
+
+
+def _batches(n, size=BATCH_ROWS):
+    for start in range(0, n, size):
+        yield slice(start, min(start + size, n))
+
+
+def _accumulate(codes, groups, x):
+    """Per-group row counts, column sums and cross-product sums of x (rows x k)."""
+    k = x.shape[1]
+    n, s, q = np.zeros(groups), np.zeros((groups, k)), np.zeros((groups, k, k))
+    for part in _batches(len(x)):
+        c, v = codes[part], x[part]
+        n += np.bincount(c, minlength=groups)
+        for i in range(k):
+            s[:, i] += np.bincount(c, weights=v[:, i], minlength=groups)
+            for j in range(i, k):
+                q[:, i, j] += np.bincount(c, weights=v[:, i] * v[:, j], minlength=groups)
+    upper = np.triu_indices(k, 1)
+    q[:, upper[1], upper[0]] = q[:, upper[0], upper[1]]
+    return n, s, q
+
+
+def _histogram(codes, groups, bins, values):
+    """Per-group counts of each integer bin (groups x bins)."""
+    counts = np.zeros(groups * bins, dtype=int)
+    for part in _batches(len(values)):
+        counts += np.bincount(codes[part] * bins + values[part], minlength=groups * bins)
+    return counts.reshape(groups, bins)
+
+
+def _covariances(n, s, q):
+    """Sample covariance matrix per group; NaN for groups with fewer than two rows."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s / n[:, None]
+        return (q - n[:, None, None] * mean[:, :, None] * mean[:, None, :]) / (n - 1)[:, None, None]
+
+
+def _quantile(counts, share, width):
+    """Lower edge of the bin holding the given share of each row's counts."""
+    cumulative = counts.cumsum(axis=1)
+    reached = cumulative >= share * cumulative[:, -1:]
+    return np.where(cumulative[:, -1] > 0, reached.argmax(axis=1) * width, np.nan)
+
+
+def alpha_label(alpha):
+    if np.isnan(alpha):
+        return ""
+    return next((label for bound, label in ALPHA_LABELS if alpha >= bound), "Unacceptable")
+
+
+# -------------------------- PREPARE -------------------------- #
+def _prepare(scores):
+    """Rows with every criterion present: (criteria matrix, percentages, assessments, graders)."""
+    criteria = scores.reindex(columns=CRITERIA).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(criteria).any(axis=1)
+    percentage = pd.to_numeric(scores["Percentage"], errors="coerce").to_numpy(dtype=float)
+    graders = scores[GRADER] if GRADER in scores.columns else pd.Series(np.nan, index=scores.index)
+    graders = graders.astype(object).where(graders.notna(), "").astype("str").str.strip()
+    graders = graders.where(graders != "", UNKNOWN_GRADER)
+    keep &= ~np.isnan(percentage)
+    return (criteria[keep], percentage[keep], scores["Assessment"].astype("str").to_numpy()[keep],
+            graders.to_numpy()[keep])
+
+
+# -------------------------- RUBRIC -------------------------- #
+def reliability(criteria, assessments):
+    """(criterion table, correlation matrix, alpha table) from one batched pass."""
+    codes, names = pd.factorize(assessments)
+    # Relabel the codes so assessments come out in natural order
+    order = np.array(sorted(range(len(names)), key=lambda i: natural_key(names[i])), dtype=int)
+    codes, names = np.argsort(order)[codes], names[order]
+    n, s, q = _accumulate(codes, len(names), criteria)
+    # The whole cohort is the per-assessment sums added up, kept as a last group
+    n, s, q = np.append(n, n.sum()), np.vstack([s, s.sum(axis=0)]), np.concatenate([q, q.sum(axis=0)[None]])
+    cov = _covariances(n, s, q)
+
+    levels = MAX_PER_CRITERION + 1
+    given = np.stack([np.bincount(np.clip(criteria[:, i], 0, MAX_PER_CRITERION).astype(int), minlength=levels)
+                      for i in range(len(CRITERIA))])
+    sd = np.sqrt(np.diag(cov[-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s[-1] / n[-1]
+        corr = cov[-1] / np.outer(sd, sd)
+        shares = given / given.sum(axis=1, keepdims=True) * 100
+    criterion_table = pd.DataFrame({"Mean": mean, "SD": sd, "Mean (%)": mean / MAX_PER_CRITERION * 100},
+                                   index=pd.Index(CRITERIA, name="Criterion"))
+    for level in range(levels):
+        criterion_table[f"Scored {level} (%)"] = shares[:, level]
+
+    k = len(CRITERIA)
+    item_variance = np.trace(cov, axis1=1, axis2=2)
+    total_variance = cov.sum(axis=(1, 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = np.where(total_variance > 0, k / (k - 1) * (1 - item_variance / total_variance), np.nan)
+    alpha_table = pd.DataFrame({
+        "Assessment": [*names, "All assessments"],
+        "Records": n.astype(int),
+        "Cronbach's Alpha": alpha.round(3),
+    })
+    alpha_table["Reliability"] = alpha_table["Cronbach's Alpha"].map(alpha_label)
+    return criterion_table.round(2), pd.DataFrame(corr, index=CRITERIA, columns=CRITERIA).round(3), alpha_table
+
+
+# -------------------------- GRADERS -------------------------- #
+def graders(percentage, assessments, grader_names):
+    """(per grader/assessment stats with drift, percentage distributions).
+
+    Quartiles come from the PERCENT_BIN-point histogram; marks are multiples
+    of 5%, so with the default bin they are exact.
+    """
+    pairs = pd.MultiIndex.from_arrays([grader_names, assessments], names=["Grader", "Assessment"])
+    codes, groups = pd.factorize(pairs)
+    order = np.array(sorted(range(len(groups)), key=lambda i: (natural_key(groups[i][0]), natural_key(groups[i][1]))),
+                     dtype=int)
+    codes = np.argsort(order)[codes]
+    groups = pd.MultiIndex.from_tuples([groups[i] for i in order], names=["Grader", "Assessment"])
+    n, s, q = _accumulate(codes, len(groups), percentage[:, None])
+    s, q = s[:, 0], q[:, 0, 0]
+    bins = 100 // PERCENT_BIN + 1
+    # Rounded first so 55% lands in the 55 bin despite float noise
+    binned = np.clip(np.floor(np.round(percentage / PERCENT_BIN, 6)), 0, bins - 1).astype(int)
+    counts = _histogram(codes, len(groups), bins, binned)
+
+    # Everyone on the same assessment, then "everyone else" by subtraction
+    assessment_codes, _ = pd.factorize(groups.get_level_values("Assessment"))
+    all_n, all_s, all_q = (np.bincount(assessment_codes, weights=v) for v in (n, s, q))
+    other_n = all_n[assessment_codes] - n
+    other_s = all_s[assessment_codes] - s
+    other_q = all_q[assessment_codes] - q
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean, other_mean = s / n, other_s / other_n
+        variance = (q - n * mean ** 2) / (n - 1)
+        other_variance = (other_q - other_n * other_mean ** 2) / (other_n - 1)
+        difference = mean - other_mean
+        t = difference / np.sqrt(variance / n + other_variance / other_n)
+    enough = (n >= MIN_RECORDS) & (other_n >= MIN_RECORDS)
+    drifting = enough & (np.abs(difference) >= DRIFT_POINTS) & (np.abs(t) >= DRIFT_T)
+
+    table = pd.DataFrame({
+        "Records": n.astype(int),
+        "Mean (%)": mean,
+        "SD": np.sqrt(variance),
+        "P25": _quantile(counts, 0.25, PERCENT_BIN),
+        "Median": _quantile(counts, 0.5, PERCENT_BIN),
+        "P75": _quantile(counts, 0.75, PERCENT_BIN),
+        "Others' Mean (%)": other_mean,
+        "Difference": difference,
+        "Welch t": t,
+        "Drift": np.where(drifting, np.where(difference > 0, "high", "low"), ""),
+    }, index=groups).round(2).reset_index()
+    distribution = pd.DataFrame(counts, index=groups, columns=np.arange(bins) * PERCENT_BIN)
+    distribution = distribution.rename_axis(columns="Percentage").stack().rename("Records").reset_index()
+    distribution["Share (%)"] = (distribution["Records"] / np.repeat(n, bins) * 100).round(1)
+    return table, distribution
+
+
+def grader_summary(table):
+    """One row per grader: records, mean difference from other graders (weighted by records), flags."""
+    compared = table[table["Difference"].notna()]
+    weights = compared["Records"]
+    summary = pd.DataFrame({
+        "Records": table.groupby("Grader")["Records"].sum(),
+        "Assessments": table.groupby("Grader").size(),
+        "Mean Difference": (compared["Difference"] * weights).groupby(compared["Grader"]).sum()
+        / weights.groupby(compared["Grader"]).sum(),
+        "Flagged High": table["Drift"].eq("high").groupby(table["Grader"]).sum(),
+        "Flagged Low": table["Drift"].eq("low").groupby(table["Grader"]).sum(),
+    })
+    return summary.round(2).rename_axis("Grader").reset_index()
+
+
+# -------------------------- CACHED ENTRY POINT -------------------------- #
+@profiling.timed("rubric_analysis.analyze")
+def analyze(scores):
+    """{"criteria", "correlations", "alpha", "graders", "summary", "distribution"} frames."""
+    criteria, percentage, assessments, grader_names = _prepare(scores)
+    criterion_table, correlations, alpha = reliability(criteria, assessments)
+    table, distribution = graders(percentage, assessments, grader_names)
+    return {
+        "criteria": criterion_table,
+        "correlations": correlations,
+        "alpha": alpha,
+        "graders": table,
+        "summary": grader_summary(table),
+        "distribution": distribution,
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _analysis(_store, name, partition, signature):
+    # name, partition and signature are the cache key; _store is not hashed
+    return analyze(_store.load_scores(columns=["Assessment", *CRITERIA, "Percentage", GRADER]))
+
+
+def analysis(store):
+    """analyze() of store's saved scores, cached until they change."""
+    return _analysis(store, store.name, store.partition, store.scores_version())
+
+
+if __name__ == "__main__":
+    results = analysis(data_store.backend())
+    for title, key in (("Criteria", "criteria"), ("Correlations", "correlations"), ("Cronbach's alpha", "alpha"),
+                       ("Graders", "summary")):
+        print(f"\n{title}\n{results[key].to_string()}")
@@ -0,0 +1,274 @@
+# snapshot.py
+# Columnar snapshot of the live tutorial scores, kept next to the CSV.
+#
+# student_scores.csv stays the file every write goes to (append-only, see
+# data_store.py). student_scores.parquet holds its live rows (last row per
+# key) in a compact form and is what the app actually loads:
+#   - Name, Assessment, Grade and Grader are categorical (dictionary-encoded),
+#   - the criteria and Total are int8 when every value fits,
+#   - Feedback is stored as an int16 code into grading.feedback_dict (plus
+#     any other sentences found in the file) and loaded as a categorical.
+# Deleted records (tombstones) are dropped like superseded rows. The key
+# columns (data_store.KEY_DTYPES) are always parsed as text.
+# The snapshot records the CSV signature it was built from. When the CSV
+# has only grown by appends since then, refresh() parses just the appended
+# tail and merges it in; after a rewrite it rebuilds from the whole CSV.
+# read() memory-maps the file and can load only the columns asked for.
+#
+# Readers share the CSV's read lock, so two of them can find the snapshot
+# out of date at once. refresh() runs under the snapshot's own exclusive
+# lock (SNAPSHOT_LOCK) so only one of them rebuilds it; the other then finds
+# it current. Each read takes the metadata and the rows from one open file,
+# so it never mixes the footer of one version with the pages of the next.
+# A write's own load (under the CSV's write lock) merges the appended tail
+# in memory and leaves the file as it is: the write is about to append
+# again, so the next reader rewrites the snapshot once for all of them.
+#
+# Disable with GRADING_SNAPSHOT=0 (scores are then parsed from the CSV).
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import coordinator
+import data_store
+import profiling
+
+SNAPSHOT_FILE = "student_scores.parquet"
+SNAPSHOT_LOCK = "student_scores.parquet.lock"
+ENABLED = os.environ.get("GRADING_SNAPSHOT", "1").lower() not in ("0", "false", "no", "off")
+CATEGORICAL = ["Name", "Assessment", "Grade", "Grader"]
+_META_KEY = b"grading_snapshot"
+# Bytes of the CSV just before the snapshot's end, checked before merging a tail
+_FINGERPRINT_BYTES = 64
+
+
+# -------------------------- ENCODING -------------------------- #
+def feedback_texts():
+    """Every sentence in grading.feedback_dict, in a fixed order (code = position)."""
+    from grading import feedback_dict
+
+    return [text for options in feedback_dict.values() for text in options]
+
+
+def _feedback_version(texts):
+    # Codes are positions in feedback_texts(); a changed list invalidates them
+    return hashlib.sha1(json.dumps(texts).encode("utf-8")).hexdigest()[:12]
+
+
+def _small_int(values):
+    """values as the smallest integer dtype that holds them, or unchanged."""
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.isna().any() or not (numbers == numbers.round()).all():
+        return values
+    for dtype in ("int8", "int16", "int32"):
+        info = np.iinfo(dtype)
+        if numbers.empty or (numbers.min() >= info.min and numbers.max() <= info.max):
+            return numbers.astype(dtype)
+    return values
+
+
+def encode(df):
+    """Scores frame with the low-memory dtypes described above."""
+    df = df.copy()
+    for column in CATEGORICAL:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    for column in data_store.CRITERIA + ["Total"]:
+        if column in df.columns:
+            df[column] = _small_int(df[column])
+    if "Feedback" in df.columns:
+        known = feedback_texts()
+        extra = sorted(set(map(str, _distinct(df["Feedback"]))) - set(known))
+        df["Feedback"] = pd.Categorical(df["Feedback"], categories=known + extra)
+    return df
+
+
+def _distinct(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.categories
+    return values.dropna().unique()
+
+
+def _concat(live, tail):
+    """live + tail rows, keeping live's categorical columns categorical."""
+    tail = tail.copy()
+    for column in live.columns:
+        if isinstance(live[column].dtype, pd.CategoricalDtype) and column in tail.columns:
+            categories = live[column].cat.categories
+            new = pd.Index(_distinct(tail[column])).difference(categories)
+            if len(new):
+                live[column] = live[column].cat.add_categories(new)
+            tail[column] = pd.Categorical(tail[column], categories=live[column].cat.categories)
+    return pd.concat([live, tail], ignore_index=True)
+
+
+# -------------------------- FILE -------------------------- #
+def snapshot_path(csv_path):
+    """The snapshot next to csv_path (each partition folder has its own)."""
+    return os.path.join(os.path.dirname(csv_path), SNAPSHOT_FILE)
+
+
+def lock_path(path=SNAPSHOT_FILE):
+    """Lock file serializing rebuilds of the snapshot at path."""
+    return os.path.join(os.path.dirname(path), SNAPSHOT_LOCK)
+
+
+def _meta(parquet):
+    return json.loads((parquet.schema_arrow.metadata or {})[_META_KEY])
+
+
+def read_meta(path=SNAPSHOT_FILE):
+    """The snapshot's metadata dict, or None if there is no usable snapshot."""
+    import pyarrow.parquet as pq
+
+    try:
+        with pq.ParquetFile(path) as parquet:
+            return _meta(parquet)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _fingerprint(data):
+    return data[-_FINGERPRINT_BYTES:].hex()
+
+
+def write(df, signature, superseded, fingerprint, csv_columns, path=SNAPSHOT_FILE):
+    """Save live rows df as the snapshot of a CSV with the given signature
+    and header (csv_columns)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = encode(df)
+    known = feedback_texts()
+    meta = {
+        "source": list(signature),
+        "superseded": int(superseded),
+        "fingerprint": fingerprint,
+        "columns": list(df.columns),
+        "csv_columns": list(csv_columns),
+        "feedback_version": _feedback_version(known),
+        # Snapshots from before the key columns were read as text are rebuilt
+        "text_keys": True,
+        "feedback_extra": [],
+    }
+    if "Feedback" in df.columns:
+        meta["feedback_extra"] = list(df["Feedback"].cat.categories[len(known):])
+        df["Feedback"] = df["Feedback"].cat.codes.astype("int16")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta)})
+    with profiling.io("write", path):
+        coordinator.atomic_write(path, lambda tmp: pq.write_table(table, tmp))
+    return meta
+
+
+def read(columns=None, path=SNAPSHOT_FILE):
+    """Live score rows from the snapshot, optionally only some columns."""
+    import pyarrow.parquet as pq
+
+    with profiling.io("read", path) as op, pq.ParquetFile(path, memory_map=True) as parquet:
+        # Metadata and rows from the same open file, so a replace in between cannot mix versions
+        meta = _meta(parquet)
+        if columns is not None:
+            columns = [c for c in columns if c in meta["columns"]]
+        table = parquet.read(columns=columns)
+        op.nbytes = table.nbytes
+    df = table.to_pandas()
+    if "Feedback" in df.columns:
+        categories = feedback_texts() + meta["feedback_extra"]
+        df["Feedback"] = pd.Categorical.from_codes(df["Feedback"].to_numpy(), categories=categories)
+    return df
+
+
+# -------------------------- REFRESH -------------------------- #
+def _key_kind(series):
+    dtype = series.cat.categories.dtype if isinstance(series.dtype, pd.CategoricalDtype) else series.dtype
+    return dtype.kind
+
+
+def _read_tail(csv_path, meta, size):
+    """Rows appended to csv_path since the snapshot, or None if it was not just appended to."""
+    start = meta["source"][-1]
+    check = min(start, _FINGERPRINT_BYTES)
+    with open(csv_path, "rb") as f:
+        f.seek(start - check)
+        data = f.read(size - start + check)
+    if _fingerprint(data[:check]) != meta["fingerprint"]:
+        return None, data
+    with profiling.io("read", csv_path) as op:
+        op.nbytes = len(data) - check
+        try:
+            tail = pd.read_csv(io.BytesIO(data[check:]), header=None, names=meta["csv_columns"],
+                               dtype=data_store.KEY_DTYPES)
+        except pd.errors.EmptyDataError:
+            tail = pd.DataFrame(columns=meta["csv_columns"])
+    return tail, data
+
+
+def refresh(csv_path, keys, path=SNAPSHOT_FILE):
+    """Bring the snapshot up to date with csv_path; returns its metadata.
+
+    Call with the CSV's read lock held (data_store does), so no append lands
+    while the file is being read. The rebuild itself takes lock_path(path)
+    exclusively.
+    """
+    with coordinator.write_lock(lock_path(path)):
+        return _refresh(csv_path, keys, path)[0]
+
+
+def load(csv_path, keys, columns=None, path=SNAPSHOT_FILE, persist=True):
+    """(live rows, superseded rows) of csv_path through its snapshot.
+
+    With persist=False, rows appended since the snapshot are merged in
+    memory and the snapshot file is not rewritten.
+    """
+    with coordinator.write_lock(lock_path(path)):
+        meta, merged = _refresh(csv_path, keys, path, persist)
+        if merged is None:
+            return read(columns, path), meta["superseded"]
+    if columns is not None:
+        merged = merged[[c for c in columns if c in merged.columns]]
+    return merged, meta["superseded"]
+
+
+def _refresh(csv_path, keys, path, persist=True):
+    """(metadata, merged rows or None); the rows are only returned when not persisted."""
+    signature = data_store.file_signature(csv_path)
+    meta = read_meta(path)
+    usable = (
+        meta is not None
+        and "csv_columns" in meta
+        and meta["feedback_version"] == _feedback_version(feedback_texts())
+        and meta.get("text_keys", False)
+    )
+    if usable and meta["source"] == list(signature):
+        return meta, None
+
+    keys = list(keys)
+    if usable and meta["source"][0] == signature[0] and meta["source"][-1] < signature[-1]:
+        # Same file, grown by appends: merge in only the new rows
+        tail, data = _read_tail(csv_path, meta, signature[-1])
+        live = read(path=path) if tail is not None else None
+        if tail is not None and all(_key_kind(live[k]) == _key_kind(tail[k]) for k in keys if k in live.columns):
+            appended = len(tail)
+            tail = tail.drop_duplicates(subset=keys, keep="last")
+            # Narrow to rows sharing the first key before the full (string) key match
+            candidates = live[live[keys[0]].isin(tail[keys[0]])]
+            replaced = data_store.matching_keys(candidates, tail, keys)
+            # Tombstones in the tail only remove; they add no live row
+            combined = _concat(live.drop(index=replaced.index), data_store.live_rows(tail, keys)[0])
+            superseded = meta["superseded"] + len(live) + appended - len(combined)
+            if not persist:
+                return {**meta, "superseded": superseded}, encode(combined)
+            return write(combined, signature, superseded, _fingerprint(data), meta["csv_columns"], path), None
+
+    with open(csv_path, "rb") as f:
+        data = f.read(signature[-1])
+    with profiling.io("read", csv_path) as op:
+        op.nbytes = len(data)
+        raw = pd.read_csv(io.BytesIO(data), dtype=data_store.KEY_DTYPES)
+    live, superseded = data_store.live_rows(raw, keys)
+    return write(live, signature, superseded, _fingerprint(data), raw.columns, path), None
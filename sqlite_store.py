@@ -0,0 +1,379 @@
+# sqlite_store.py
+# SQLite storage backend for the grading app (GRADING_BACKEND=sqlite).
+#
+# Scores and test results live in one local database file in WAL mode, so
+# several graders can save at the same time without rewriting anything.
+# (Student ID, Assessment) and (Student ID, Test Name) are unique indexes, so
+# a repeated save replaces the earlier row (last write wins, as with the CSV
+# files). Dashboard filters run as SQL instead of pandas scans, and their
+# results are cached per data version: every write bumps a counter in the
+# meta table, which is part of each cache key. Dashboard aggregates come
+# from a summaries sidecar (<db name>_summaries.json) stamped with that
+# version. Deleting a record removes its row; Record IDs are kept in a
+# column, and rows from before IDs existed are given one when the database
+# is opened. Each partition (see data_store.py) has its own database file,
+# named like GRADING_DB, in the partition's folder.
+#
+# One-shot migration from the existing CSV files:
+#     python sqlite_store.py migrate [grading.db]
+# (set GRADING_PARTITION to migrate one partition)
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+import coordinator
+import data_store
+import profiling
+import summaries
+from data_store import RECORD_ID, SCORE_TYPES, TEST_TYPES
+
+SCORES_TABLE = "scores"
+TESTS_TABLE = "test_results"
+
+_TABLES = {
+    SCORES_TABLE: (SCORE_TYPES, data_store.SCORE_KEYS),
+    TESTS_TABLE: (TEST_TYPES, data_store.TEST_KEYS),
+}
+_INDEXES = [
+    (SCORES_TABLE, ["Assessment"]),
+    (SCORES_TABLE, ["Name"]),
+    (TESTS_TABLE, ["Test Name"]),
+]
+
+
+def _q(name):
+    """Quote a column name ("Student ID", "Weighted (%)", ...)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+@contextmanager
+def connect(db_file):
+    # Autocommit mode; writers open their own BEGIN IMMEDIATE transaction
+    conn = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _query(db_file, version, sql, params=()):
+    # version is only part of the cache key; it changes on every write
+    with connect(db_file) as conn, profiling.io("query", db_file) as op:
+        df = pd.read_sql_query(sql, conn, params=params)
+        op.nbytes = int(df.memory_usage(index=False).sum())
+    return df
+
+
+def _select_in(conn, table, column, values):
+    """Rows of table whose column is one of values."""
+    values = list(values)
+    # Stay well under SQLite's bound-parameter limit
+    parts = [
+        pd.read_sql_query(
+            f"SELECT * FROM {table} WHERE {_q(column)} IN ({', '.join('?' * len(chunk))})", conn, params=chunk,
+        )
+        for chunk in (values[i:i + 500] for i in range(0, len(values), 500))
+    ]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def _rows(df, columns):
+    df = df.reindex(columns=columns).astype(object)
+    return df.where(df.notna(), None).to_numpy().tolist()
+
+
+class SqliteBackend:
+    """Scores and test results in a local SQLite database."""
+
+    name = "sqlite"
+
+    def __init__(self, db_file, partition=""):
+        self.partition = partition
+        self.folder = data_store.partition_folder(partition)
+        if self.folder:
+            db_file = os.path.join(self.folder, os.path.basename(db_file))
+        self.db_file = db_file
+        self.roster_file = os.path.join(self.folder, data_store.STUDENT_LIST_FILE)
+        self.summaries = summaries.Summaries(self, os.path.splitext(db_file)[0] + "_summaries.json")
+        # SQLite serializes the writes itself; the lock keeps the summaries in step
+        self.lock_file = db_file + ".lock"
+        with connect(db_file) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (version INTEGER NOT NULL)")
+            if conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0:
+                conn.execute("INSERT INTO meta (version) VALUES (0)")
+            for table, (types, keys) in _TABLES.items():
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    + ", ".join(f"{_q(c)} {t}" for c, t in types.items()) + ")"
+                )
+                # Add columns introduced after the table was created
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for c, t in types.items():
+                    if c not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {_q(c)} {t}")
+                conn.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_key ON {table} ("
+                    + ", ".join(_q(c) for c in keys) + ")"
+                )
+                self._backfill_ids(conn, table, keys)
+            for table, columns in _INDEXES:
+                name = table + "_" + "_".join(c.lower().replace(" ", "_") for c in columns)
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {table} ("
+                    + ", ".join(_q(c) for c in columns) + ")"
+                )
+
+    @staticmethod
+    def _backfill_ids(conn, table, keys):
+        # Rows stored before record IDs get the ID the CSV backend derives for them
+        legacy = pd.read_sql_query(f"SELECT rowid AS row_id, * FROM {table} WHERE {_q(RECORD_ID)} IS NULL", conn)
+        if legacy.empty:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            f"UPDATE {table} SET {_q(RECORD_ID)} = ? WHERE rowid = ?",
+            zip(data_store.legacy_record_ids(legacy, keys), legacy["row_id"].tolist()),
+        )
+        conn.execute("UPDATE meta SET version = version + 1")
+        conn.execute("COMMIT")
+
+    # ---- plumbing ----
+    def version(self):
+        with connect(self.db_file) as conn:
+            return conn.execute("SELECT version FROM meta").fetchone()[0]
+
+    def data_signature(self):
+        return self.version()
+
+    def scores_version(self):
+        """Pass to save_scores(expected=...) to detect a write in between."""
+        return self.version()
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write lock plus the summary update for one write."""
+        with coordinator.write_lock(self.lock_file), self.summaries.updating() as update:
+            yield update
+
+    def _read(self, sql, params=()):
+        return _query(self.db_file, self.version(), sql, tuple(params))
+
+    def _write(self, statements, expected=None):
+        """Run (sql, rows) pairs in one transaction and bump the data version.
+
+        With expected set, raise StaleWriteError instead if the version has
+        moved on since it was read.
+        """
+        with connect(self.db_file) as conn, profiling.io("write", self.db_file):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if expected is not None and conn.execute("SELECT version FROM meta").fetchone()[0] != expected:
+                    raise coordinator.StaleWriteError(self.db_file)
+                for sql, rows in statements:
+                    conn.executemany(sql, rows)
+                conn.execute("UPDATE meta SET version = version + 1")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _upsert(self, table, df):
+        columns = list(_TABLES[table][0])
+        sql = (
+            f"INSERT OR REPLACE INTO {table} (" + ", ".join(_q(c) for c in columns) + ") "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        return sql, _rows(df, columns)
+
+    def _select(self, table, where=None, params=(), columns=None):
+        selected = "*" if columns is None else ", ".join(_q(c) for c in columns if c in _TABLES[table][0])
+        sql = f"SELECT {selected} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(f"{_q(c)} = ?" for c in where)
+        return self._read(sql + " ORDER BY rowid", params)
+
+    def _count(self, table):
+        return int(self._read(f"SELECT COUNT(*) AS n FROM {table}")["n"].iloc[0])
+
+    def _replaced(self, table, df_new):
+        """Stored rows that upserting df_new will overwrite."""
+        with connect(self.db_file) as conn:
+            stored = _select_in(conn, table, "Student ID", df_new["Student ID"].astype(str).unique())
+        if stored.empty:
+            return stored
+        return data_store.matching_keys(stored, df_new, _TABLES[table][1])
+
+    def _with_ids(self, table, df):
+        # Rows without a Record ID keep the ID of the stored row with their key
+        if RECORD_ID in df.columns and df[RECORD_ID].notna().all():
+            return df
+        return data_store.assign_record_ids(df, self._select(table), _TABLES[table][1])
+
+    def _delete_records(self, table, record_ids):
+        """Delete rows by Record ID in one write; returns the rows removed."""
+        record_ids = [str(i) for i in record_ids]
+        with connect(self.db_file) as conn:
+            removed = _select_in(conn, table, RECORD_ID, record_ids)
+        if not removed.empty:
+            self._write([(f"DELETE FROM {table} WHERE {_q(RECORD_ID)} = ?", [(i,) for i in record_ids])])
+        return removed
+
+    # ---- tutorial scores ----
+    def load_scores(self, columns=None):
+        df = self._select(SCORES_TABLE, columns=columns)
+        if df.empty:
+            raise FileNotFoundError(SCORES_TABLE)
+        return df
+
+    def save_scores(self, df, expected=None):
+        with self._writing() as update:
+            df = self._with_ids(SCORES_TABLE, df)
+            self._write([(f"DELETE FROM {SCORES_TABLE}", [()]), self._upsert(SCORES_TABLE, df)], expected)
+            update.replace_scores(df)
+
+    def append_scores(self, df_new):
+        with self._writing() as update:
+            replaced = self._replaced(SCORES_TABLE, df_new)
+            df_new = data_store.assign_record_ids(df_new, replaced, data_store.SCORE_KEYS)
+            self._write([self._upsert(SCORES_TABLE, df_new)])
+            update.scores(replaced, df_new)
+
+    def delete_scores(self, student_id, assessment=None):
+        """Delete a student's records (optionally one assessment's); returns how many."""
+        where = {"Student ID": str(student_id)}
+        if assessment is not None:
+            where["Assessment"] = assessment
+        sql = f"DELETE FROM {SCORES_TABLE} WHERE " + " AND ".join(f"{_q(c)} = ?" for c in where)
+        with self._writing() as update:
+            removed = self._select(SCORES_TABLE, list(where), list(where.values()))
+            self._write([(sql, [tuple(where.values())])])
+            update.scores(removed, None)
+            return len(removed)
+
+    def delete_score_records(self, record_ids):
+        with self._writing() as update:
+            update.scores(self._delete_records(SCORES_TABLE, record_ids), None)
+
+    def clear_scores(self):
+        with self._writing() as update:
+            self._write([(f"DELETE FROM {SCORES_TABLE}", [()])])
+            update.replace_scores(None)
+
+    def has_scores(self):
+        return self._count(SCORES_TABLE) > 0
+
+    def query_scores(self, assessment=None, name=None, columns=None):
+        where = {c: v for c, v in (("Assessment", assessment), ("Name", name)) if v is not None}
+        return self._select(SCORES_TABLE, list(where), list(where.values()), columns)
+
+    # Dashboard aggregates come from the summaries, not the table
+    def count_scores(self, assessment=None):
+        return self.summaries.count_scores(assessment)
+
+    def assessments(self):
+        return self.summaries.assessments()
+
+    def student_names(self):
+        return self.summaries.student_names()
+
+    def grade_counts(self, assessment=None):
+        return self.summaries.grade_counts(assessment)
+
+    def average_by_student(self, assessment=None):
+        return self.summaries.average_by_student(assessment)
+
+    def top_scores(self, n, assessment=None, largest=True):
+        return self.summaries.top_scores(n, assessment, largest)
+
+    # ---- test results ----
+    def load_test_results(self):
+        df = self._select(TESTS_TABLE)
+        if df.empty:
+            raise FileNotFoundError(TESTS_TABLE)
+        return df
+
+    def save_test_results(self, df):
+        with self._writing() as update:
+            df = self._with_ids(TESTS_TABLE, df)
+            self._write([(f"DELETE FROM {TESTS_TABLE}", [()]), self._upsert(TESTS_TABLE, df)])
+            update.replace_tests(df)
+
+    def append_test_results(self, df_new):
+        with self._writing() as update:
+            replaced = self._replaced(TESTS_TABLE, df_new)
+            df_new = data_store.assign_record_ids(df_new, replaced, data_store.TEST_KEYS)
+            self._write([self._upsert(TESTS_TABLE, df_new)])
+            update.tests(replaced, df_new)
+
+    def delete_test_records(self, record_ids):
+        with self._writing() as update:
+            update.tests(self._delete_records(TESTS_TABLE, record_ids), None)
+
+    def has_test_results(self):
+        return self._count(TESTS_TABLE) > 0
+
+    def query_test_results(self, test_name=None):
+        if test_name is None:
+            return self._select(TESTS_TABLE)
+        return self._select(TESTS_TABLE, ["Test Name"], [test_name])
+
+    def test_names(self):
+        return self.summaries.test_names()
+
+    def test_overall(self, test_name=None):
+        return self.summaries.test_overall(test_name)
+
+    def test_summary(self, test_name=None):
+        return self.summaries.test_summary(test_name)
+
+    def drop_stale_test_results(self):
+        # The table schema is managed above; there is no legacy layout to drop
+        return False
+
+    # ---- maintenance ----
+    def superseded_rows(self):
+        # Replaced rows are overwritten in place, nothing accumulates
+        return 0
+
+    def compact(self):
+        with connect(self.db_file) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        with coordinator.write_lock(self.lock_file):
+            self.summaries.rebuild()
+        return 0
+
+
+# -------------------------- MIGRATION -------------------------- #
+def migrate_from_csv(db_file=data_store.DB_FILE, partition=data_store.PARTITION):
+    """Copy a partition's student_scores.csv and test_results.csv into its database.
+
+    Rows are read through the CSV backend, so superseded rows are already
+    resolved (last write wins). Existing rows in the database are replaced.
+    Returns (score_rows, test_rows) copied.
+    """
+    csv, db = data_store.CsvBackend(partition), SqliteBackend(db_file, partition)
+    scores = csv.load_scores() if csv.has_scores() else pd.DataFrame(columns=data_store.SCORE_COLUMNS)
+    tests = csv.load_test_results() if csv.has_test_results() else pd.DataFrame(columns=data_store.TEST_COLUMNS)
+    db.save_scores(scores)
+    db.save_test_results(tests)
+    return len(scores), len(tests)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["migrate"]:
+        target = sys.argv[2] if len(sys.argv) > 2 else data_store.DB_FILE
+        n_scores, n_tests = migrate_from_csv(target)
+        where = f" of partition {data_store.PARTITION}" if data_store.PARTITION else ""
+        print(f"Migrated {n_scores} score rows and {n_tests} test rows into {target}{where}")
+        print("Start the app with GRADING_BACKEND=sqlite to use it.")
+    else:
+        print("usage: python sqlite_store.py migrate [grading.db]")
@@ -1,22 +1,27 @@
 # grading_app.py
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-import random
-from io import BytesIO  # for Excel export
 import os
-import plotly
-
-# Ensure test_results.csv exists and load it
-TEST_RESULTS_FILE = "test_results.csv"
-
-if not os.path.exists(TEST_RESULTS_FILE):
-    # Create with proper columns if not found
-    pd.DataFrame(columns=["Test Name", "Student ID", "Student Name", "MCQ Score", "SAQ Score",
-                          "Total Raw", "Scaled (to 100)", "Final Weight (%)", "Weighted Score"]).to_csv(TEST_RESULTS_FILE, index=False)
-
-test_results = pd.read_csv(TEST_RESULTS_FILE)
+import tempfile
+import time
+from contextlib import closing, contextmanager, nullcontext
+from pathlib import Path
+
+import analytics
+import automark
+import charts
+import coordinator
+import data_store
+import exports
+import gradebook
+import grading
+import partitions
+import profiling
+import reports
+import roster_import
+import rubric_analysis
+import tables
+from grading import get_feedback, get_letter_grade, grade_frame
 
 
 # -------------------------- PASSWORD PROTECTION -------------------------- #
@@ -35,145 +40,168 @@ def check_password():
         if st.session_state["password"] == "letmein":
             st.session_state["password_correct"] = True
             del st.session_state["password"]
+            if "login_partition" in st.session_state:
+                st.session_state["partition_pending"] = st.session_state["login_partition"]
         else:
             st.session_state["password_correct"] = False
 
-    if "password_correct" not in st.session_state:
-        st.text_input("Enter Password:", type="password", on_change=password_entered, key="password")
-        return False
-    elif not st.session_state["password_correct"]:
+    if not st.session_state.get("password_correct"):
+        # Course / cohort to work in; can be changed later in the sidebar
+        names = partitions.list_partitions()
+        if names:
+            st.selectbox("Course / Cohort", [""] + names, index=_partition_index([""] + names),
+                         format_func=partitions.label, key="login_partition")
         st.text_input("Enter Password:", type="password", on_change=password_entered, key="password")
-        st.error("Incorrect password")
+        if "password_correct" in st.session_state:
+            st.error("Incorrect password")
         return False
     else:
         return True
 
-# -------------------------- MOTIVATIONAL FEEDBACK -------------------------- #
-feedback_dict = {
-    "A": [
-        "Phenomenal performance! You’ve shown mastery, clarity, and confidence — keep inspiring others.",
-        "Outstanding! You didn’t just answer, you taught the topic back to us with excellence.",
-        "Superb! You’ve nailed accuracy, depth, and presentation — a true role model.",
-        "Brilliant effort! Every detail was sharp and thoughtful. Keep shining at this level.",
-        "Exceptional work — you’ve turned learning into leadership. Stay consistent, you’re unstoppable."
-    ],
-    "B": [
-        "Strong effort! You’re very close to excellence — just a little polish will get you there.",
-        "Great work overall. You’ve built a solid foundation — now aim for sharper accuracy.",
-        "Well done! Your understanding is clear, and with more detail, you’ll hit the top band.",
-        "Good progress! Keep stretching your explanations to unlock your full potential.",
-        "You’re on the right track! Stay focused and keep refining your answers."
-    ],
-    "C": [
-        "You’ve made a fair attempt — now let’s aim for stronger accuracy and detail.",
-        "Decent effort, but more depth is needed. Push yourself a little more each time.",
-        "You’re building the basics. Stay consistent, and growth will follow.",
-        "Good start! Strengthening clarity and completeness will lift your grade higher.",
-        "Don’t stop here — keep improving step by step, and you’ll surprise yourself."
-    ],
-    "D": [
-        "This round was tough, but it’s only the beginning — you can improve with steady effort.",
-        "Don’t be discouraged! Focus on the core concepts, and progress will come.",
-        "Challenges help us grow. Keep practicing, and your results will rise.",
-        "It’s a slow start, but every step forward counts. Believe in your progress.",
-        "Stay motivated — even small improvements will lead to big achievements."
-    ]
-}
-
-def get_feedback(percentage):
-    if percentage >= 80:
-        return random.choice(feedback_dict["A"])
-    elif percentage >= 60:
-        return random.choice(feedback_dict["B"])
-    elif percentage >= 50:
-        return random.choice(feedback_dict["C"])
-    else:
-        return random.choice(feedback_dict["D"])
-
-def get_letter_grade(percentage):
-    if percentage >= 80:
-        return "A"
-    elif percentage >= 60:
-        return "B"
-    elif percentage >= 50:
-        return "C"
-    else:
-        return "D"
-
-# -------------------------- APP START -------------------------- #
-if check_password():
-    st.title("📊 Grading Application")
-    st.write("Secure grading system with tutorial **numerical rubric scoring** (0–4 per criterion) and for test advancement analysis .")
 
-    # -------------------------- SIDEBAR NAVIGATION -------------------------- #
-    st.sidebar.title("📚 Navigation")
-
-    # Define sidebar radio buttons (shortcuts to tabs)
-    selected_tab = st.sidebar.radio(
-        "Jump to:",
-        [
-            "Rubric Reference",
-            "Marks Entry",
-            "Student Scores",
-            "Dashboard",
-            "Import Students",
-            "Test Performance"
-        ]
+def _partition_index(options):
+    current = st.session_state.get("partition", data_store.PARTITION)
+    return options.index(current) if current in options else 0
+
+
+# -------------------------- PARTITIONS -------------------------- #
+def partition_sidebar():
+    """Sidebar picker for the active course / cohort partition; returns its name."""
+    if "partition_pending" in st.session_state:
+        st.session_state["partition"] = st.session_state.pop("partition_pending")
+    options = [""] + partitions.list_partitions()
+    if data_store.PARTITION and data_store.PARTITION not in options:
+        options.append(data_store.PARTITION)
+    if st.session_state.get("partition") not in options:
+        st.session_state["partition"] = options[_partition_index(options)]
+    partition = st.sidebar.selectbox(
+        "🏫 Course / Cohort", options, format_func=partitions.label,
+        key="partition", help="Only this partition's students, scores and test results are loaded.",
     )
-
-    # Save selection to session state for persistent tracking
-    st.session_state["selected_tab"] = selected_tab
-
-    # -------------------------- TABS -------------------------- #
-    tab_rubric, tab2, tab3, tab4, tab5, tab_test = st.tabs(
-        ["Rubric Reference", "Marks Entry", "Student Scores", "Dashboard", "Import Students", "Test Performance"]
+    with st.sidebar.expander("➕ New Course / Cohort"):
+        course = st.text_input("Course", key="new_partition_course")
+        cohort = st.text_input("Cohort (optional)", key="new_partition_cohort")
+        semester = st.text_input("Semester (optional)", key="new_partition_semester")
+        if st.button("Create and Switch", key="new_partition_create"):
+            try:
+                st.session_state["partition_pending"] = partitions.create(course, cohort, semester)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.rerun()
+    return partition
+
+
+# -------------------------- RERUN INSTRUMENTATION -------------------------- #
+@contextmanager
+def section_timer(name):
+    """Record how long the wrapped block took (ms) in section_timings."""
+    start = time.perf_counter()
+    try:
+        with profiling.section(name):
+            yield
+    finally:
+        st.session_state.setdefault("section_timings", {})[name] = (time.perf_counter() - start) * 1000
+
+
+def profiled(kind, label):
+    """profiling.rerun() when profiling is on for this session, else a no-op yielding None."""
+    if not st.session_state.get("profiling", profiling.ENABLED):
+        return nullcontext()
+    return profiling.rerun(kind, label, capture=st.session_state.pop("profile_capture", False))
+
+
+def render_profile(recorder):
+    """Sidebar breakdown of one profiled rerun."""
+    with st.sidebar.expander(f"🔬 Profile: {recorder.total_ms:.0f} ms this rerun", expanded=True):
+        sections = pd.DataFrame(
+            [(name, e["ms"], e["calls"]) for name, e in recorder.sections.items()],
+            columns=["Section", "ms", "Calls"],
+        )
+        st.dataframe(sections.sort_values("ms", ascending=False).round(1), hide_index=True)
+        if recorder.io:
+            io_ops = pd.DataFrame(recorder.io).rename(columns={"op": "Op", "path": "File", "bytes": "Bytes"})
+            st.dataframe(io_ops, hide_index=True)
+            totals = recorder.io_totals()
+            st.caption(" · ".join(f"{op}: {t['count']}× {t['bytes'] / 1024:.0f} KB in {t['ms']:.0f} ms" for op, t in totals.items()))
+        else:
+            st.caption("No file reads or writes (all loads were cached).")
+        if recorder.profile_text:
+            st.code(recorder.profile_text, language=None)
+            if recorder.profile_file:
+                st.caption(f"Full cProfile stats: `{recorder.profile_file}`")
+        st.button("📸 Capture next rerun with cProfile", on_click=lambda: st.session_state.update(profile_capture=True))
+        st.caption(f"Logged to `{profiling.LOG_FILE}`")
+
+
+def count_rerun(kind):
+    """Count full-script ("app") and fragment-only ("fragment") reruns."""
+    counts = st.session_state.setdefault("rerun_counts", {"app": 0, "fragment": 0})
+    counts[kind] += 1
+
+
+# -------------------------- GRADER -------------------------- #
+def current_grader():
+    """Name entered in the sidebar's Grader box, saved with every mark (None if blank)."""
+    return st.session_state.get("grader", "").strip() or None
+
+
+# -------------------------- STUDENT PICKER -------------------------- #
+def student_picker(index, key):
+    """Search box plus a bounded list of matches from the roster index.
+
+    Students are picked by ID, so equal names stay distinct.
+    Returns (student_id, student_name), or (None, None) when nothing matches.
+    """
+    query = st.text_input(
+        "🔍 Search Student (name or ID)",
+        key=f"{key}_search",
+        placeholder=f"Type a name or ID to search {len(index)} students",
     )
-
-    # -------------------------- TAB RUBRIC -------------------------- #
-    with tab_rubric:
-        st.header("Marking Description Criteria (Rubric)")
-        st.markdown("""
-        | Score | Percentage Range | Accuracy | Clarity | Depth | Completeness | Presentation |
-        |-------|-----------------|---------|--------|-------|--------------|--------------|
-        | **4 (Excellent)** | 80–100% | All correct, precise terminology | Well-structured, logical | Beyond basics | Fully addresses all parts | Neat, organised |
-        | **3 (Good)**     | 65–79% | Mostly correct, minor errors | Generally clear | Good understanding | Minor omissions | Mostly neat |
-        | **2 (Fair)**     | 50–64% | Several errors | Sometimes confusing | Basic understanding | Partial response | Somewhat disorganised |
-        | **1 (Poor)**     | <50% | Many incorrect answers | Unclear | Very limited | Incomplete | Messy |
-        | **0 (No Attempt)** | - | No evidence | No clarity | No depth | No completeness | No presentation |
-        """, unsafe_allow_html=True)
-
-
-    # -------------------------- TAB 2 - MARKS ENTRY -------------------------- #
-    with tab2:
-        st.header("Enter Student Marks")
-        criteria = ["Accuracy", "Clarity", "Depth", "Completeness", "Presentation"]
-
-        # Load student list
-        student_list = None
-        id_col, name_col = None, None
-        try:
-            student_list = pd.read_csv("student_list.csv")
-            for c in student_list.columns:
-                if "id" in c.lower(): id_col = c
-                if "name" in c.lower(): name_col = c
-            student_list = student_list.astype(str).apply(lambda x: x.str.strip())
-        except FileNotFoundError:
-            pass
-
-        # Existing assessments
+    ids, total = index.search(query)
+    if not ids:
+        st.warning("No student matches that search.")
+        return None, None
+    if total > len(ids):
+        st.caption(f"Showing the first {len(ids)} of {total} matches; keep typing to narrow the list.")
+    student_id = st.selectbox("Select Student", ids, format_func=index.label, key=f"{key}_pick")
+    st.write(f"**Student ID:** {student_id}")
+    return student_id, index.name(student_id)
+
+
+# -------------------------- TAB RUBRIC -------------------------- #
+def render_rubric():
+    st.header("Marking Description Criteria (Rubric)")
+    st.markdown("""
+    | Score | Percentage Range | Accuracy | Clarity | Depth | Completeness | Presentation |
+    |-------|-----------------|---------|--------|-------|--------------|--------------|
+    | **4 (Excellent)** | 80–100% | All correct, precise terminology | Well-structured, logical | Beyond basics | Fully addresses all parts | Neat, organised |
+    | **3 (Good)**     | 65–79% | Mostly correct, minor errors | Generally clear | Good understanding | Minor omissions | Mostly neat |
+    | **2 (Fair)**     | 50–64% | Several errors | Sometimes confusing | Basic understanding | Partial response | Somewhat disorganised |
+    | **1 (Poor)**     | <50% | Many incorrect answers | Unclear | Very limited | Incomplete | Messy |
+    | **0 (No Attempt)** | - | No evidence | No clarity | No depth | No completeness | No presentation |
+    """, unsafe_allow_html=True)
+    st.caption("Letter grade bands: " + ", ".join(f"**{letter}** ≥ {minimum:g}%" for letter, minimum in grading.GRADE_BANDS))
+
+
+# -------------------------- TAB 2 - MARKS ENTRY -------------------------- #
+# Fragment: changing a score reruns only this panel (live total/grade preview),
+# not the whole script. Saving happens only when Submit Marks is pressed.
+@st.fragment
+def marks_entry_panel():
+    count_rerun("fragment")
+    with profiled("fragment", "Marks Entry panel"), section_timer("Marks Entry panel (fragment)"):
+        criteria = data_store.CRITERIA
+        roster = data_store.load_roster_index(store.roster_file)
         try:
-            scores_df = pd.read_csv("student_scores.csv")
-            existing_assessments = scores_df["Assessment"].dropna().unique().tolist()
+            existing_assessments = store.assessments()
         except FileNotFoundError:
             existing_assessments = []
 
         col1, col2 = st.columns([1, 2])
         with col1:
-            if student_list is not None and name_col and id_col:
-                student_name = st.selectbox("Select Student Name", student_list[name_col].tolist())
-                match = student_list.loc[student_list[name_col] == student_name, id_col]
-                student_id = match.values[0] if not match.empty else "N/A"
-                st.write(f"**Student ID:** {student_id}")
+            if roster is not None:
+                student_id, student_name = student_picker(roster, key="tab2_student")
             else:
                 student_id = st.text_input("Student ID")
                 student_name = st.text_input("Student Name")
@@ -197,416 +225,784 @@ if check_password():
         st.info(f"📌 Total: **{total}/{max_score}** | Score: **{percentage:.1f}%** | Grade: **{grade}**")
 
         if st.button("Submit Marks"):
+            if student_id is None:
+                st.warning("⚠️ Please pick a student first.")
+                return
             feedback = get_feedback(percentage)
             df_new = pd.DataFrame(
-                [[student_id, student_name, assessment, *scores.values(), total, percentage, grade, feedback]],
-                columns=["Student ID", "Name", "Assessment"] + criteria + ["Total", "Percentage", "Grade", "Feedback"]
+                [[student_id, student_name, assessment, *scores.values(), total, percentage, grade, feedback,
+                  current_grader()]],
+                columns=[*data_store.SCORE_COLUMNS, data_store.GRADER]
             )
-            try:
-                df = pd.read_csv("student_scores.csv")
-                df = pd.concat([df, df_new], ignore_index=True)
-            except FileNotFoundError:
-                df = df_new
-            df.to_csv("student_scores.csv", index=False)
+            store.append_scores(df_new)
             st.success(f"Marks for {student_name} ({assessment}) saved ✅")
             st.write(df_new)
             st.info(f"💡 Feedback: *{feedback}*")
 
-            # 🔽 Download updated scores as Excel
-            excel_buffer = BytesIO()
-            df.to_excel(excel_buffer, index=False, engine="openpyxl")
-            st.download_button(
-                label="⬇️ Download Student Scores (Excel)",
-                data=excel_buffer.getvalue(),
-                file_name="student_scores.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="download_excel_tab2"
-            )
+            # 🔽 Download updated scores as Excel (built only when clicked)
+            exports.workbook_button(store, key="download_excel_tab2")
 
-    # -------------------------- TAB 3 - STUDENT SCORES -------------------------- #
-    with tab3:
-        st.header("📊 Student Scores Database")
 
-        # Choose which dataset to use
-        use_imported = st.checkbox("🔄 Use Imported Student List (from Tab 5)")
+def render_marks_entry():
+    st.header("Enter Student Marks")
+    criteria = data_store.CRITERIA
 
-        try:
-            if use_imported:
-                # Load from student_list.csv (imported in Tab 5)
-                df = pd.read_csv("student_list.csv")
-                st.success("✅ Showing data from imported student list (Tab 5)")
+    # Load student list
+    student_list, id_col, name_col = data_store.load_roster(store.roster_file)
+
+    # Existing assessments
+    try:
+        existing_assessments = store.assessments()
+    except FileNotFoundError:
+        existing_assessments = []
+
+    entry_mode = st.radio("Entry Mode", ["Single Student", "Bulk (Whole Cohort)"], horizontal=True, key="tab2_entry_mode")
+
+    if entry_mode == "Single Student":
+        marks_entry_panel()
+
+    # Bulk mode: one editable grid for the whole roster, saved in a single write
+    elif student_list is None or not (name_col and id_col):
+        st.warning("⚠️ Bulk entry needs an imported student list. Please import one in Tab 5.")
+    else:
+        assessment_options = ["-- New Assessment --"] + existing_assessments
+        selected_assessment = st.selectbox("Select Assessment", assessment_options, key="tab2_bulk_assessment")
+        if selected_assessment == "-- New Assessment --":
+            assessment = st.text_input("Enter New Assessment Name", key="tab2_bulk_new_assessment")
+        else:
+            assessment = selected_assessment
+
+        # Prefill with marks already saved for this assessment
+        grid = pd.DataFrame({"Student ID": student_list[id_col], "Name": student_list[name_col]})
+        if assessment in existing_assessments:
+            saved = store.query_scores(assessment=assessment)[["Student ID"] + criteria]
+            saved = saved.assign(**{"Student ID": saved["Student ID"].astype(str)})
+            grid = grid.merge(saved.drop_duplicates("Student ID", keep="last"), on="Student ID", how="left")
+        else:
+            grid = grid.assign(**{crit: None for crit in criteria})
+        grid[criteria] = grid[criteria].astype("float64")
+
+        st.caption("Leave a row blank to skip that student. Nothing is saved until you press **Submit All Marks**.")
+        with st.form("tab2_bulk_form"):
+            edited = st.data_editor(
+                grid,
+                column_config={
+                    crit: st.column_config.NumberColumn(f"{crit} (0–4)", min_value=0, max_value=4, step=1)
+                    for crit in criteria
+                },
+                disabled=["Student ID", "Name"],
+                hide_index=True,
+                use_container_width=True,
+                key=f"tab2_bulk_grid_{assessment}"
+            )
+            bulk_submitted = st.form_submit_button("Submit All Marks")
+
+        if bulk_submitted:
+            # Only rows with at least one mark that differ from what is already saved
+            marked = edited[criteria].notna().any(axis=1)
+            changed = (edited[criteria].fillna(-1) != grid[criteria].fillna(-1)).any(axis=1)
+            batch = edited[marked & changed]
+            if not assessment:
+                st.warning("⚠️ Please enter an assessment name.")
+            elif batch.empty:
+                st.info("No new or changed marks to save.")
             else:
-                # Load from student_scores.csv (marks entry)
-                df = pd.read_csv("student_scores.csv")
-                expected_columns = ["Student ID", "Name", "Assessment"] + criteria + ["Total", "Percentage", "Grade", "Feedback"]
-                df = df[[col for col in expected_columns if col in df.columns]]
-                st.success("✅ Showing data from student scores")
+                batch = grade_frame(batch.assign(Assessment=assessment, **{data_store.GRADER: current_grader()}))[
+                    [*data_store.SCORE_COLUMNS, data_store.GRADER]]
+                store.append_scores(batch)
+                st.success(f"Marks for {len(batch)} student(s) in {assessment} saved ✅")
+                st.dataframe(batch, hide_index=True)
+
+
+# -------------------------- TAB 3 - STUDENT SCORES -------------------------- #
+def record_labels(scores):
+    """{Record ID: "Student ID - Name (Assessment)"} for the record pickers."""
+    labels = (scores["Student ID"].astype(str) + " - " + scores["Name"].astype(str)
+              + " (" + scores["Assessment"].astype(str) + ")")
+    return dict(zip(scores[data_store.RECORD_ID], labels))
+
+
+def record_picker(view, label, key):
+    """Search box plus a bounded list of matching records; returns a Record ID or None."""
+    query = st.text_input("🔍 Search Records (name, Student ID or assessment)", key=f"{key}_search")
+    ids, total = view.search(query, data_store.RECORD_ID)
+    if not ids:
+        st.warning("No record matches that search.")
+        return None
+    if total > len(ids):
+        st.caption(f"Showing the first {len(ids)} of {total} matches; keep typing to narrow the list.")
+    labels = record_labels(view.rows_for(data_store.RECORD_ID, ids))
+    return st.selectbox(label, ids, format_func=labels.get, key=key)
+
+
+def paged_table(view, key, filters=()):
+    """Search, filter, sort and page a TableView; only the visible page is sent to the browser."""
+    top = st.columns([2] + [1] * len(filters))
+    query = top[0].text_input("🔎 Search", key=f"{key}_query", placeholder="Name, Student ID or assessment")
+    chosen = {
+        column: top[i + 1].multiselect(column, view.values(column), key=f"{key}_filter_{column}")
+        for i, column in enumerate(filters)
+    }
+    bottom = st.columns(4)
+    sort_by = bottom[0].selectbox("Sort by", [None, *view.df.columns], key=f"{key}_sort",
+                                  format_func=lambda c: "Saved order" if c is None else c)
+    ascending = bottom[1].radio("Order", ["Ascending", "Descending"], key=f"{key}_order",
+                                horizontal=True) == "Ascending"
+    size = bottom[2].selectbox("Rows per page", tables.PAGE_SIZES, index=1, key=f"{key}_size")
+
+    positions = view.select(query, chosen, sort_by, ascending)
+    pages = max(1, -(-len(positions) // size))
+    # A narrower search can leave the remembered page past the end
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = bottom[3].number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    with profiling.section("Scores table (page)"):
+        st.dataframe(view.page(positions, page, size), hide_index=True)
+    start = (page - 1) * size
+    st.caption(f"Rows {min(start + 1, len(positions))}–{min(start + size, len(positions))} of {len(positions)} "
+               f"matching ({len(view)} in total).")
+
+
+def edit_record_form(scores, record_id):
+    """Change the marks of one saved record; it keeps its Record ID."""
+    record = scores[scores[data_store.RECORD_ID] == record_id]
+    if record.empty:
+        return
+    current = record.iloc[0]
+    with st.form("tab3_edit_form"):
+        columns = st.columns(2)
+        marks = {}
+        for i, crit in enumerate(data_store.CRITERIA):
+            with columns[i % 2]:
+                marks[crit] = st.number_input(
+                    f"{crit} (0–4)", min_value=0, max_value=4, value=int(current[crit]), step=1,
+                    key=f"tab3_edit_{crit}_{record_id}",
+                )
+        if st.form_submit_button("💾 Save Changes"):
+            # regrade() keeps the feedback unless the grade changes; the record is now credited to this grader
+            edited = grading.regrade(record.assign(**marks, **{data_store.GRADER: current_grader()}))[0]
+            store.append_scores(edited[[*data_store.SCORE_COLUMNS, data_store.GRADER, data_store.RECORD_ID]])
+            st.session_state["tab3_flash"] = (
+                f"✅ Updated {current['Name']} ({current['Assessment']}): "
+                f"{edited['Percentage'].iloc[0]:.1f}% ({edited['Grade'].iloc[0]})."
+            )
+            st.rerun()
 
-            st.dataframe(df)
 
-            if not df.empty:
-                st.subheader("Summary Statistics")
-                st.write(df.describe(include="all"))
+def render_student_scores():
+    st.header("📊 Student Scores Database")
 
-                # Download button
-                csv = df.to_csv(index=False).encode("utf-8")
-                st.download_button("⬇️ Download Data (CSV)", csv, "student_data.csv", "text/csv")
+    flash = st.session_state.pop("tab3_flash", None)
+    if flash:
+        st.success(flash)
 
-            # 🔽 Danger Zone only available when using student_scores.csv
-            if not use_imported:
-                st.subheader("Danger Zone")
-
-                # Option 1: Delete ALL records for a Student ID
-                student_ids = df["Student ID"].dropna().unique().tolist()
-                if student_ids:
-                    student_to_delete = st.selectbox("Select Student ID to Delete ALL Records", student_ids)
-                    if st.button("Delete ALL Records for Selected Student"):
-                        df = df[df["Student ID"] != student_to_delete]
-                        df.to_csv("student_scores.csv", index=False)
-                        st.warning(f"⚠️ All records for student ID {student_to_delete} have been deleted.")
-                        st.rerun()
+    # Choose which dataset to use
+    use_imported = st.checkbox("🔄 Use Imported Student List (from Tab 5)")
 
-                # Option 2: Delete ONE specific record
-                st.markdown("---")
-                st.write("🗑️ Delete a Specific Record")
-                if "Assessment" in df.columns:
-                    records = df[["Student ID", "Assessment", "Name"]].astype(str)
-                    records["Display"] = records["Student ID"] + " - " + records["Name"] + " (" + records["Assessment"] + ")"
-                    record_to_delete = st.selectbox("Select Record to Delete", records["Display"].tolist())
-                    if st.button("Delete Selected Record"):
-                        row_index = records[records["Display"] == record_to_delete].index[0]
-                        df = df.drop(index=row_index)
-                        df.to_csv("student_scores.csv", index=False)
-                        st.warning(f"⚠️ Record {record_to_delete} has been deleted.")
+    try:
+        # Views are built once per data version; each rerun sends one page
+        if use_imported:
+            # Load from student_list.csv (imported in Tab 5)
+            view = tables.roster_view(store.roster_file)
+            st.success("✅ Showing data from imported student list (Tab 5)")
+            paged_table(view, "tab3_roster")
+        else:
+            # Load from student_scores.csv (marks entry)
+            view = tables.scores_view(store)
+            st.success("✅ Showing data from student scores")
+            paged_table(view, "tab3_scores", filters=["Assessment", "Grade"])
+
+        if len(view):
+            st.subheader("Summary Statistics")
+            with profiling.section("Summary statistics (cached)"):
+                numeric, text = view.summary()
+            if numeric is not None:
+                st.dataframe(numeric)
+            if text is not None:
+                st.dataframe(text)
+
+            # Download buttons; files are generated only when clicked
+            csv = exports.frame_csv(view.df) if use_imported else (lambda: exports.scores_csv(store))
+            st.download_button("⬇️ Download Data (CSV)", csv, "student_data.csv", "text/csv", on_click="ignore")
+            if not use_imported:
+                exports.workbook_button(store, key="download_excel_tab3")
+
+        # 🔽 Danger Zone only available when using student_scores.csv
+        if not use_imported:
+            # Saves are appended; compaction drops rows replaced by a later save
+            st.subheader("🧹 Maintenance")
+            superseded = store.superseded_rows()
+            st.caption(f"{superseded} superseded row(s) waiting to be compacted.")
+            if st.button("Compact Data Files", disabled=superseded == 0):
+                dropped = store.compact()
+                st.success(f"✅ Compacted data files ({dropped} superseded rows removed).")
+                st.rerun()
+
+            # Dashboard aggregates are updated on every save; this recomputes them from scratch
+            if st.button("🧮 Check & Rebuild Dashboard Summaries"):
+                problems = store.summaries.check()
+                store.summaries.rebuild()
+                if problems:
+                    st.warning("Summaries were out of date and have been rebuilt:\n\n- " + "\n- ".join(problems[:10]))
+                else:
+                    st.success("✅ Dashboard summaries match the saved data.")
+
+            # Recompute totals/grades for every saved mark (e.g. after changing GRADE_BANDS)
+            if st.button("♻️ Regrade All"):
+                start = time.perf_counter()
+
+                # Regrade the latest data; if another grader saves first, start over
+                def regrade_attempt():
+                    version = store.scores_version()
+                    result = grading.regrade(store.load_scores())
+                    store.save_scores(result[0], expected=version)
+                    return result
+
+                regraded, changed = coordinator.retry_stale(regrade_attempt)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                st.success(f"✅ Regraded {len(regraded)} records in {elapsed_ms:.0f} ms ({changed} grade(s) changed).")
+
+            # Records are picked by Record ID, so identical-looking rows stay distinct
+            st.subheader("✏️ Edit a Record")
+            record_to_edit = record_picker(view, "Select Record to Edit", key="tab3_edit_record")
+            if record_to_edit is not None:
+                edit_record_form(view.rows_for(data_store.RECORD_ID, [record_to_edit]), record_to_edit)
+
+            st.subheader("Danger Zone")
+
+            # Option 1: Delete ALL records for a Student ID
+            query = st.text_input("🔍 Search Student ID or name", key="tab3_delete_student_search")
+            student_ids, total = view.search(query, "Student ID")
+            if total > len(student_ids):
+                st.caption(f"Showing the first {len(student_ids)} of {total} students; keep typing to narrow the list.")
+            if student_ids:
+                student_to_delete = st.selectbox("Select Student ID to Delete ALL Records", student_ids,
+                                                 key="tab3_delete_student")
+                if st.button("Delete ALL Records for Selected Student"):
+                    deleted = store.delete_scores(student_to_delete)
+                    if deleted:
+                        st.session_state["tab3_flash"] = (
+                            f"🗑️ Deleted all {deleted} record(s) for student ID {student_to_delete}."
+                        )
                         st.rerun()
+                    st.error(f"No records found for student ID {student_to_delete}; nothing was deleted.")
 
-                # Option 3: Delete ALL data
-                st.markdown("---")
-                if st.button("🚨 Delete ALL Records", type="primary"):
-                    pd.DataFrame(columns=df.columns).to_csv("student_scores.csv", index=False)
-                    st.error("⚠️ All student data has been permanently deleted!")
-                    st.rerun()
-            
-        except FileNotFoundError:
-            st.info("No student data available yet. Please add marks in the 'Marks Entry' tab or import in Tab 5.")
-
-    # -------------------------- TAB 4 - DASHBOARD -------------------------- #
-    with tab4:
-        st.header("📊 Dashboard - Student Performance Overview")
+            # Option 2: Delete ONE specific record
+            st.markdown("---")
+            st.write("🗑️ Delete a Specific Record")
+            record_to_delete = record_picker(view, "Select Record to Delete", key="tab3_delete_record")
+            if st.button("Delete Selected Record") and record_to_delete is not None:
+                labels = record_labels(view.rows_for(data_store.RECORD_ID, [record_to_delete]))
+                store.delete_score_records([record_to_delete])
+                st.warning(f"⚠️ Record {labels[record_to_delete]} has been deleted.")
+                st.rerun()
+
+            # Option 3: Delete ALL data
+            st.markdown("---")
+            if st.button("🚨 Delete ALL Records", type="primary"):
+                store.clear_scores()
+                st.error("⚠️ All student data has been permanently deleted!")
+                st.rerun()
+
+    except FileNotFoundError:
+        st.info("No student data available yet. Please add marks in the 'Marks Entry' tab or import in Tab 5.")
+
+
+# -------------------------- TAB 4 - DASHBOARD -------------------------- #
+def summarized_caption(rows):
+    return (f"{rows} rows: showing the score distribution with percentile bands instead of one bar each "
+            f"(more than {charts.CHART_MAX_POINTS}; set GRADING_CHART_MAX_POINTS to change).")
+
+
+def _discard_report_zip():
+    previous = st.session_state.pop("tab4_reports_zip", None)
+    if previous and os.path.exists(previous["path"]):
+        os.remove(previous["path"])
+
+
+def report_packs_panel():
+    """One report per student (criteria, feedback, tests, trend chart), as a ZIP."""
+    formats = reports.available_formats()
+    # Still set from a run that never finished: Cancel was clicked (or the page left)
+    if st.session_state.pop("tab4_reports_running", False):
+        st.warning("Report generation was cancelled.")
+    fmt = st.radio("Report format", list(formats), format_func=formats.get, horizontal=True,
+                   key="tab4_reports_format")
+    st.caption(f"Reports are built in {reports.WORKERS} worker processes and written straight into the ZIP.")
+
+    if st.button("📦 Generate Reports for Every Student", key="tab4_reports_generate"):
+        _discard_report_zip()
+        handle, zip_path = tempfile.mkstemp(prefix="report_packs_", suffix=".zip")
+        os.close(handle)
+        # Any click reruns the app, which stops this run and cancels the pool
+        st.button("⏹️ Cancel", key="tab4_reports_cancel")
+        bar = st.progress(0.0, text="Starting worker processes...")
+        st.session_state["tab4_reports_running"] = True
+        start = time.perf_counter()
+        with profiling.section("Report packs (build)"), closing(reports.generate(store, zip_path, fmt)) as progress:
+            for done, total in progress:
+                bar.progress(done / total if total else 1.0, text=f"{done} of {total} reports")
+        st.session_state["tab4_reports_running"] = False
+        st.session_state["tab4_reports_zip"] = {"path": zip_path, "format": fmt, "count": done,
+                                                "seconds": time.perf_counter() - start}
+
+    built = st.session_state.get("tab4_reports_zip")
+    if built and os.path.exists(built["path"]):
+        st.success(f"✅ {built['count']} {formats.get(built['format'], built['format'])} reports "
+                   f"built in {built['seconds']:.1f}s.")
+        st.download_button(
+            "⬇️ Download Report Packs (ZIP)",
+            data=Path(built["path"]).read_bytes,
+            file_name=f"report_packs_{built['format']}.zip",
+            mime="application/zip",
+            key="tab4_reports_download",
+            on_click="ignore",
+        )
+
+
+def cohort_analytics_panel():
+    """At-risk students, top/bottom K by average and trajectories against the cohort bands."""
+    cols = st.columns(3)
+    drop = cols[0].number_input("Flag a drop of more than (points)", min_value=0.0, max_value=100.0,
+                                value=analytics.RISK_DROP, step=5.0, key="tab4_risk_drop")
+    below_count = cols[1].number_input(f"...or this many marks below {analytics.RISK_BAND}", min_value=1,
+                                       value=analytics.RISK_BELOW_COUNT, step=1, key="tab4_risk_below")
+    k = cols[2].number_input("Top / bottom K students", min_value=1, max_value=100, value=10, step=1,
+                             key="tab4_top_k")
+
+    with profiling.section("Cohort analytics"):
+        table, _, _, _ = analytics.cohort(store, drop, analytics.RISK_BAND, below_count)
+    if table.empty:
+        st.info("No tutorial marks to analyze yet.")
+        return
+    at_risk, flagged = analytics.at_risk(table)
+    cols = st.columns(3)
+    cols[0].metric("Students", len(table))
+    cols[1].metric("At Risk", flagged, f"{flagged / len(table):.0%} of the cohort", delta_color="off")
+    cols[2].metric("Median Average", f"{table['Average'].median():.1f}%")
+
+    st.write("**⚠️ Students at Risk**")
+    shown = ["Student ID", "Name", "Average", "Latest", "Latest Change", "Worst Drop", "Percentile", "Z-Score",
+             "Reason"]
+    if flagged:
+        st.dataframe(table.iloc[at_risk][shown], hide_index=True)
+        if flagged > len(at_risk):
+            st.caption(f"Showing the {len(at_risk)} largest drops of {flagged} flagged students; "
+                       "the CSV below lists everyone.")
+    else:
+        st.success("No student is flagged with these settings.")
+
+    top = analytics.top_k(table["Average"], k)
+    bottom = analytics.top_k(table["Average"], k, largest=False)
+    ranked = ["Student ID", "Name", "Average", "Percentile", "Z-Score"]
+    col1, col2 = st.columns(2)
+    col1.write(f"**Top {len(top)} Students (average)**")
+    col1.dataframe(table.iloc[top][ranked], hide_index=True)
+    col2.write(f"**Bottom {len(bottom)} Students (average)**")
+    col2.dataframe(table.iloc[bottom][ranked], hide_index=True)
+
+    groups = {
+        "At-risk students": at_risk,
+        f"Top {k}": top,
+        f"Bottom {k}": bottom,
+    }
+    shown_group = st.radio("Trajectories of", list(groups), horizontal=True, key="tab4_trajectories")
+    matrix, _ = analytics.assessment_matrix(store)
+    lines = analytics.trajectories(matrix, table, groups[shown_group])
+    fig = charts.trajectory_figure(analytics.trajectory_bands(matrix), lines,
+                                   f"{shown_group} against the cohort")
+    st.plotly_chart(fig, use_container_width=True)
+    if len(groups[shown_group]) > analytics.TRAJECTORY_LIMIT:
+        st.caption(f"Showing the first {analytics.TRAJECTORY_LIMIT} of {len(groups[shown_group])} students.")
+    st.download_button("⬇️ Download Cohort Analytics (CSV)", exports.frame_csv(table), "cohort_analytics.csv",
+                       "text/csv", on_click="ignore", key="tab4_analytics_download")
+
+
+def rubric_analysis_panel():
+    """Criterion statistics, correlations, Cronbach's alpha and grader drift."""
+    import plotly.express as px
+
+    with profiling.section("Rubric analysis"):
+        results = rubric_analysis.analysis(store)
+    criteria, alpha, graders = results["criteria"], results["alpha"], results["graders"]
+    if not len(graders):
+        st.info("No complete rubric marks to analyze yet.")
+        return
+
+    overall = alpha.iloc[-1]
+    overall_alpha = overall["Cronbach's Alpha"]
+    cols = st.columns(3)
+    cols[0].metric("Records", int(overall["Records"]))
+    cols[1].metric("Cronbach's Alpha (all)", f"{overall_alpha:.2f}", overall["Reliability"] or None,
+                   delta_color="off")
+    cols[2].metric("Graders", graders["Grader"].nunique())
+
+    col1, col2 = st.columns(2)
+    fig = px.bar(criteria.reset_index(), x="Criterion", y="Mean", error_y="SD", range_y=[0, grading.MAX_PER_CRITERION],
+                 title="Mean Score per Criterion (± SD)")
+    col1.plotly_chart(fig, use_container_width=True)
+    fig = px.imshow(results["correlations"], text_auto=".2f", zmin=-1, zmax=1, color_continuous_scale="RdBu",
+                    title="Criterion Correlations")
+    col2.plotly_chart(fig, use_container_width=True)
+    st.dataframe(criteria, use_container_width=True)
+
+    st.write("**Cronbach's Alpha per Assessment**")
+    st.dataframe(alpha, hide_index=True)
+
+    st.write("**Grader Consistency**")
+    if set(graders["Grader"]) <= {rubric_analysis.UNKNOWN_GRADER}:
+        st.info("No grader names are recorded yet. Enter your name under 🧑‍🏫 Grader in the sidebar when marking.")
+        return
+    st.dataframe(results["summary"], hide_index=True)
+    flagged = graders[graders["Drift"] != ""]
+    if len(flagged):
+        st.warning(f"{len(flagged)} grader/assessment pair(s) differ from the other graders by at least "
+                   f"{rubric_analysis.DRIFT_POINTS:g} points (Welch t ≥ {rubric_analysis.DRIFT_T:g}).")
+        st.dataframe(flagged, hide_index=True)
+    else:
+        st.success("No grader stands out from the others on any assessment.")
 
-        # Choose dataset source
-        use_imported = st.checkbox("🔄 Use Imported Student List (from Tab 5)", key="tab4_checkbox")
+    assessment = st.selectbox("Percentage distribution by grader for", list(alpha["Assessment"].iloc[:-1]),
+                              key="tab4_rubric_assessment")
+    shown = results["distribution"]
+    shown = shown[(shown["Assessment"] == assessment) & (shown["Records"] > 0)]
+    fig = px.bar(shown, x="Percentage", y="Share (%)", color="Grader", barmode="group", hover_data=["Records"],
+                 title=f"{assessment}: Percentage by Grader")
+    st.plotly_chart(fig, use_container_width=True)
+    with st.expander("All graders and assessments"):
+        st.dataframe(graders, hide_index=True)
 
-        try:
-            if use_imported:
-                df = pd.read_csv("student_list.csv")
-                st.success("✅ Showing data from imported student list (Tab 5)")
 
-                if not {"Percentage", "Grade"}.issubset(df.columns):
-                    st.warning("⚠️ Imported file does not contain scores/grades. Only student info will be displayed.")
-                    st.dataframe(df)
-                else:
-                    st.info("Imported file contains scores/grades. Proceeding with dashboard analysis.")
-            else:
-                df = pd.read_csv("student_scores.csv")
-                st.success("✅ Showing data from student_scores.csv")
+def render_dashboard():
+    # Plotly is only needed here; importing it lazily keeps it off the login screen
+    import plotly.express as px
 
-            # ================== TOP SECTION (ALL STUDENTS) ==================
-            st.subheader("📊 Overall Performance Overview")
+    st.header("📊 Dashboard - Student Performance Overview")
 
-            # Assessment filter
-            assessments = ["All Assessments"] + sorted(df["Assessment"].dropna().unique().tolist())
-            selected_assessment_overall = st.selectbox("📑 Filter by Assessment (Overall)", assessments)
+    # Choose dataset source
+    use_imported = st.checkbox("🔄 Use Imported Student List (from Tab 5)", key="tab4_checkbox")
 
-            df_overall = df.copy()
-            if selected_assessment_overall != "All Assessments":
-                df_overall = df_overall[df_overall["Assessment"] == selected_assessment_overall]
+    try:
+        if use_imported:
+            df = data_store.load_student_list(store.roster_file)
+            st.success("✅ Showing data from imported student list (Tab 5)")
 
-            col1, col2 = st.columns(2)
+            if not {"Percentage", "Grade"}.issubset(df.columns):
+                st.warning("⚠️ Imported file does not contain scores/grades. Only student info will be displayed.")
+                st.dataframe(df)
+            else:
+                st.info("Imported file contains scores/grades. Proceeding with dashboard analysis.")
+            scores = data_store.FrameScores(df)
+        else:
+            # Filters and aggregations below are pushed down to the backend
+            if not store.has_scores():
+                raise FileNotFoundError(data_store.SCORES_FILE)
+            scores = store
+            st.success("✅ Showing data from student_scores.csv")
 
-            with col1:
-                st.write("**Grade Distribution**")
-                if not df_overall.empty:
-                    grade_counts = df_overall["Grade"].value_counts().reset_index()
-                    grade_counts.columns = ["Grade", "Count"]
+        # ================== TOP SECTION (ALL STUDENTS) ==================
+        st.subheader("📊 Overall Performance Overview")
 
-                    fig = px.pie(
-                        grade_counts,
-                        values="Count",
-                        names="Grade",
-                        hole=0.3,
-                    )
-                    fig.update_traces(textinfo="percent+label")
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No data available for grade distribution.")
-
-            with col2:
-                st.write("**Average Percentage by Student**")
-                if not df_overall.empty:
-                    avg_scores = df_overall.groupby("Name")["Percentage"].mean().reset_index()
-                    fig_avg = px.bar(
-                        avg_scores,
-                        x="Name",
-                        y="Percentage",
-                        color="Percentage",
-                        color_continuous_scale="Blues",
-                        labels={"Percentage": "Average (%)", "Name": "Student"},
-                        title="Average Percentage by Student"
-                    )
-                    fig_avg.update_layout(xaxis_tickangle=-45)
-                    st.plotly_chart(fig_avg, use_container_width=True)
-                else:
-                    st.info("No data available for student averages.")
-
-            # ================== STUDENT FILTER SECTION ==================
-            st.subheader("🎯 Individual Student Performance")
-
-            student_options = ["All Students"] + df["Name"].dropna().unique().tolist()
-            selected_student = st.selectbox("👤 Select Student", student_options)
-
-            assessments = ["All Assessments"] + df["Assessment"].dropna().unique().tolist()
-            selected_assessment = st.selectbox("📑 Select Assessment", assessments)
-
-            df_filtered = df.copy()
-            if selected_assessment != "All Assessments":
-                df_filtered = df_filtered[df_filtered["Assessment"] == selected_assessment]
-            if selected_student != "All Students":
-                df_filtered = df_filtered[df_filtered["Name"] == selected_student]
-
-            if {"Percentage", "Grade"}.issubset(df_filtered.columns) and not df_filtered.empty:
-                if selected_student == "All Students":
-                    st.subheader(f"Percentage Scores ({selected_assessment})")
-                    fig = px.bar(
-                        df_filtered,
-                        x="Name",
-                        y="Percentage",
-                        color="Percentage",
-                        color_continuous_scale="Blues",
-                        title="Percentage Scores by Student",
-                        labels={"Percentage": "Percentage (%)", "Name": "Students"}
-                    )
-                    fig.update_layout(xaxis_tickangle=-45)
-                    st.plotly_chart(fig, use_container_width=True)
+        # Assessment filter
+        assessments = ["All Assessments"] + sorted(scores.assessments())
+        selected_assessment_overall = st.selectbox("📑 Filter by Assessment (Overall)", assessments)
+        overall_filter = None if selected_assessment_overall == "All Assessments" else selected_assessment_overall
 
-                else:
-                    avg_score = df_filtered["Percentage"].mean()
-                    latest_grade = df_filtered["Grade"].iloc[-1]
-                    st.metric(f"Average Score for {selected_student}", f"{avg_score:.1f}%", latest_grade)
-
-                    st.subheader(f"📈 Progress Over Time - {selected_student}")
-                    fig3 = px.line(
-                        df_filtered,
-                        x="Assessment",
-                        y="Percentage",
-                        markers=True,
-                        title=f"Performance Trend for {selected_student}",
-                        labels={"Percentage": "Percentage (%)", "Assessment": "Assessment"}
-                    )
-                    fig3.update_traces(line=dict(color="green"))
-                    st.plotly_chart(fig3, use_container_width=True)
-
-                    st.subheader(f"📋 Detailed Scores for {selected_student}")
-                    criteria = ["Accuracy", "Clarity", "Depth", "Completeness", "Presentation"]
-                    available_columns = [c for c in criteria if c in df.columns]
-                    base_columns = ["Assessment"] + available_columns + ["Total", "Percentage", "Grade", "Feedback"]
-
-                    student_table = df_filtered[base_columns].reset_index(drop=True)
-                    st.dataframe(student_table)
-
-                    csv = student_table.to_csv(index=False).encode("utf-8")
-                    st.download_button(
-                        f"⬇️ Download {selected_student}'s Scores (CSV)",
-                        csv,
-                        f"{selected_student}_scores.csv",
-                        "text/csv",
-                        key=f"download_{selected_student}"
-                    )
+        # Counts only; the saved-scores aggregates are read from the summaries
+        has_overall = scores.count_scores(overall_filter) > 0
 
-            # ---- Top & Bottom Performers ----
-            st.subheader("🏆 Top & Bottom Performers")
-            if not df_overall.empty and "Percentage" in df_overall.columns:
-                top_n = 10
-                bottom_n = 10
+        col1, col2 = st.columns(2)
 
-                top_performers = df_overall.nlargest(top_n, "Percentage")
-                fig_top = px.bar(
-                    top_performers,
-                    x="Name",
-                    y="Percentage",
-                    color="Percentage",
-                    color_continuous_scale="Greens",
-                    title=f"Top {top_n} Performers",
-                    labels={"Percentage": "Percentage (%)", "Name": "Student"}
+        with col1:
+            st.write("**Grade Distribution**")
+            if has_overall:
+                grade_counts = scores.grade_counts(overall_filter)
+
+                fig = px.pie(
+                    grade_counts,
+                    values="Count",
+                    names="Grade",
+                    hole=0.3,
                 )
-                fig_top.update_layout(xaxis_tickangle=-45)
-                st.plotly_chart(fig_top, use_container_width=True)
+                fig.update_traces(textinfo="percent+label")
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("No data available for grade distribution.")
 
-                bottom_performers = df_overall.nsmallest(bottom_n, "Percentage")
-                fig_bottom = px.bar(
-                    bottom_performers,
+        with col2:
+            st.write("**Average Percentage by Student**")
+            if has_overall:
+                avg_scores = scores.average_by_student(overall_filter)
+                fig_avg, summarized = charts.student_bar_chart(
+                    avg_scores,
                     x="Name",
                     y="Percentage",
-                    color="Percentage",
-                    color_continuous_scale="Reds",
-                    title=f"Bottom {bottom_n} Performers",
-                    labels={"Percentage": "Percentage (%)", "Name": "Student"}
+                    labels={"Percentage": "Average (%)", "Name": "Student"},
+                    title="Average Percentage by Student"
                 )
-                fig_bottom.update_layout(xaxis_tickangle=-45)
-                st.plotly_chart(fig_bottom, use_container_width=True)
+                st.plotly_chart(fig_avg, use_container_width=True)
+                if summarized:
+                    st.caption(summarized_caption(len(avg_scores)))
             else:
-                st.info("No data available for Top & Bottom Performers.")
+                st.info("No data available for student averages.")
 
-            st.subheader("⬇️ Download Student Data")
-            csv = df_filtered.to_csv(index=False).encode("utf-8")
-            st.download_button("Download Filtered Student Data (CSV)", csv, "student_scores_filtered.csv", "text/csv")
+        # ================== STUDENT FILTER SECTION ==================
+        st.subheader("🎯 Individual Student Performance")
 
-        except FileNotFoundError:
-            st.info("📈 No student data available yet. Please add marks in the 'Marks Entry' tab or import a file in Tab 5.")
+        student_options = ["All Students"] + scores.student_names()
+        selected_student = st.selectbox("👤 Select Student", student_options)
 
-        # ------------------ Load and Display Test Performance Summary ------------------ #
-        st.markdown("---")
-        st.subheader("🧪 Test Performance Summary (from Test Performance Tab)")
+        assessments = ["All Assessments"] + scores.assessments()
+        selected_assessment = st.selectbox("📑 Select Assessment", assessments)
 
-        TEST_RESULTS_FILE = "test_results.csv"
+        df_filtered = scores.query_scores(
+            assessment=None if selected_assessment == "All Assessments" else selected_assessment,
+            name=None if selected_student == "All Students" else selected_student,
+            # The all-students chart needs only these; a student's table needs every column
+            columns=["Name", "Percentage", "Grade"] if selected_student == "All Students" else None,
+        )
 
-        if os.path.exists(TEST_RESULTS_FILE):
-            test_results = pd.read_csv(TEST_RESULTS_FILE)
+        if {"Percentage", "Grade"}.issubset(df_filtered.columns) and not df_filtered.empty:
+            if selected_student == "All Students":
+                st.subheader(f"Percentage Scores ({selected_assessment})")
+                fig, summarized = charts.student_bar_chart(
+                    df_filtered,
+                    x="Name",
+                    y="Percentage",
+                    title="Percentage Scores by Student",
+                    labels={"Percentage": "Percentage (%)", "Name": "Students"}
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                if summarized:
+                    st.caption(summarized_caption(len(df_filtered)))
 
-            required_cols = {"Student Name", "Test Name", "MCQ", "SAQ", "Total", "Weighted"}
-            if not required_cols.issubset(test_results.columns):
-                st.warning("⚠️ Some columns (MCQ/SAQ/Total/Weighted) are missing in test_results.csv.")
-                st.dataframe(test_results.head())
             else:
-                test_list = ["All Tests"] + sorted(test_results["Test Name"].dropna().unique().tolist())
-                selected_test = st.selectbox("Select Test", test_list, key="tab4_test_filter")
-
-                df_display = test_results.copy()
-                if selected_test != "All Tests":
-                    df_display = df_display[df_display["Test Name"] == selected_test]
-
-                # Calculate averages, min, and max
-                avg_mcq, min_mcq, max_mcq = df_display["MCQ"].mean(), df_display["MCQ"].min(), df_display["MCQ"].max()
-                avg_saq, min_saq, max_saq = df_display["SAQ"].mean(), df_display["SAQ"].min(), df_display["SAQ"].max()
-                avg_total, min_total, max_total = df_display["Total"].mean(), df_display["Total"].min(), df_display["Total"].max()
-                avg_weighted = df_display["Weighted"].mean()
-
-                # Display metrics with min/max under average
-                col1, col2, col3, col4 = st.columns(4)
-                col1.metric("MCQ (Avg)", f"{avg_mcq:.1f}", f"Min: {min_mcq:.0f} | Max: {max_mcq:.0f}")
-                col2.metric("SAQ (Avg)", f"{avg_saq:.1f}", f"Min: {min_saq:.0f} | Max: {max_saq:.0f}")
-                col3.metric("Total (Avg)", f"{avg_total:.1f}", f"Min: {min_total:.0f} | Max: {max_total:.0f}")
-                col4.metric("Weighted (Avg %)", f"{avg_weighted:.1f}%", "")
-
-                # Average, Min, Max by Test
-                st.write("### 📈 Average, Min & Max Scores by Test")
-                summary_stats = (
-                    df_display.groupby("Test Name")[["MCQ", "SAQ", "Total", "Weighted"]]
-                    .agg(["mean", "min", "max"])
-                    .reset_index()
-                )
-                # Flatten column names
-                summary_stats.columns = ["Test Name"] + [
-                    f"{col}_{stat}" for col, stat in summary_stats.columns if col != "Test Name"
-                ]
-
-                # Melt data for visualization (Average only for chart)
-                avg_scores_melted = (
-                    df_display.groupby("Test Name")[["MCQ", "SAQ", "Total"]]
-                    .mean()
-                    .reset_index()
-                    .melt(id_vars="Test Name", var_name="Category", value_name="Average Score")
+                avg_score = df_filtered["Percentage"].mean()
+                latest_grade = df_filtered["Grade"].iloc[-1]
+                st.metric(f"Average Score for {selected_student}", f"{avg_score:.1f}%", latest_grade)
+
+                st.subheader(f"📈 Progress Over Time - {selected_student}")
+                fig3 = charts.line_chart(
+                    df_filtered,
+                    x="Assessment",
+                    y="Percentage",
+                    title=f"Performance Trend for {selected_student}",
+                    labels={"Percentage": "Percentage (%)", "Assessment": "Assessment"}
                 )
-
-                # Plotly chart: Average scores by Test
-                fig = px.bar(
-                    avg_scores_melted,
-                    x="Test Name",
-                    y="Average Score",
-                    color="Category",
-                    barmode="group",
-                    title="Average MCQ, SAQ, and Total Scores by Test",
-                    labels={"Average Score": "Average Marks", "Test Name": "Test"},
-                    color_discrete_sequence=px.colors.qualitative.Pastel
+                fig3.update_traces(line=dict(color="green"))
+                st.plotly_chart(fig3, use_container_width=True)
+
+                st.subheader(f"📋 Detailed Scores for {selected_student}")
+                criteria = ["Accuracy", "Clarity", "Depth", "Completeness", "Presentation"]
+                available_columns = [c for c in criteria if c in df_filtered.columns]
+                base_columns = ["Assessment"] + available_columns + ["Total", "Percentage", "Grade", "Feedback"]
+
+                student_table = df_filtered[base_columns].reset_index(drop=True)
+                st.dataframe(student_table)
+
+                csv = exports.frame_csv(student_table)
+                st.download_button(
+                    f"⬇️ Download {selected_student}'s Scores (CSV)",
+                    csv,
+                    f"{selected_student}_scores.csv",
+                    "text/csv",
+                    key=f"download_{selected_student}",
+                    on_click="ignore",
                 )
-                st.plotly_chart(fig, use_container_width=True)
-
-                # Display summary table safely (format only numeric columns)
-                st.write("### 📋 Detailed Test Summary (Average, Min, Max)")
-                numeric_cols = summary_stats.select_dtypes(include=["float64", "int64"]).columns
-                st.dataframe(summary_stats.style.format(subset=numeric_cols, formatter="{:.1f}"))
 
+        # ---- Top & Bottom Performers ----
+        st.subheader("🏆 Top & Bottom Performers")
+        if has_overall:
+            top_n = 10
+            bottom_n = 10
+
+            top_performers = scores.top_scores(top_n, overall_filter)
+            fig_top = px.bar(
+                top_performers,
+                x="Name",
+                y="Percentage",
+                color="Percentage",
+                color_continuous_scale="Greens",
+                title=f"Top {top_n} Performers",
+                labels={"Percentage": "Percentage (%)", "Name": "Student"}
+            )
+            fig_top.update_layout(xaxis_tickangle=-45)
+            st.plotly_chart(fig_top, use_container_width=True)
+
+            bottom_performers = scores.top_scores(bottom_n, overall_filter, largest=False)
+            fig_bottom = px.bar(
+                bottom_performers,
+                x="Name",
+                y="Percentage",
+                color="Percentage",
+                color_continuous_scale="Reds",
+                title=f"Bottom {bottom_n} Performers",
+                labels={"Percentage": "Percentage (%)", "Name": "Student"}
+            )
+            fig_bottom.update_layout(xaxis_tickangle=-45)
+            st.plotly_chart(fig_bottom, use_container_width=True)
         else:
-            st.info("📈 No test results yet. Please add some in the 'Test Performance' tab.")
+            st.info("No data available for Top & Bottom Performers.")
 
-    # -------------------------- TAB 5 - IMPORT STUDENTS -------------------------- #
-    with tab5:
-        st.header("📂 Import Student Names (CSV or Excel)")
+        if not use_imported:
+            st.subheader("🧭 Cohort Analytics")
+            cohort_analytics_panel()
+            st.subheader("📐 Rubric Reliability & Graders")
+            rubric_analysis_panel()
 
-        uploaded_file = st.file_uploader("Upload Student Data File", type=["csv", "xlsx"])
+        st.subheader("⬇️ Download Student Data")
+        csv = exports.frame_csv(df_filtered)
+        st.download_button("Download Filtered Student Data (CSV)", csv, "student_scores_filtered.csv", "text/csv",
+                           on_click="ignore")
 
-        if uploaded_file is not None:
-            try:
-                # Read file depending on extension
-                if uploaded_file.name.endswith(".csv"):
-                    student_list = pd.read_csv(uploaded_file)
-                else:
-                    student_list = pd.read_excel(uploaded_file)
+    except FileNotFoundError:
+        st.info("📈 No student data available yet. Please add marks in the 'Marks Entry' tab or import a file in Tab 5.")
 
-                # Clean data (remove spaces, force strings)
-                student_list = student_list.astype(str).apply(lambda x: x.str.strip())
-                st.success(f"✅ {uploaded_file.name} uploaded successfully!")
-                st.dataframe(student_list)
-
-                # Validate required columns
-                if not any("id" in c.lower() for c in student_list.columns) or not any("name" in c.lower() for c in student_list.columns):
-                    st.warning("⚠️ File must contain 'Student ID' and 'Name' columns.")
-                else:
-                    student_list.to_csv("student_list.csv", index=False)
-                    st.success("Student list saved for future use.")
+    # ------------------ Report packs (one file per student) ------------------ #
+    if store.has_scores() or store.has_test_results():
+        st.markdown("---")
+        st.subheader("📦 End-of-Term Report Packs")
+        report_packs_panel()
+
+    # ------------------ Load and Display Test Performance Summary ------------------ #
+    st.markdown("---")
+    st.subheader("🧪 Test Performance Summary (from Test Performance Tab)")
+
+    if store.has_test_results() and store.test_names():
+        test_list = ["All Tests"] + sorted(store.test_names())
+        selected_test = st.selectbox("Select Test", test_list, key="tab4_test_filter")
+        test_filter = None if selected_test == "All Tests" else selected_test
+
+        # Averages, min, and max from the running test summaries
+        overall = store.test_overall(test_filter)
+        mcq, saq, total, weighted = (overall[m] for m in ["MCQ", "SAQ", "Total", "Weighted (%)"])
+
+        # Display metrics with min/max under average
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("MCQ (Avg)", f"{mcq['mean']:.1f}", f"Min: {mcq['min']:.0f} | Max: {mcq['max']:.0f}")
+        col2.metric("SAQ (Avg)", f"{saq['mean']:.1f}", f"Min: {saq['min']:.0f} | Max: {saq['max']:.0f}")
+        col3.metric("Total (Avg)", f"{total['mean']:.1f}", f"Min: {total['min']:.0f} | Max: {total['max']:.0f}")
+        col4.metric("Weighted (Avg %)", f"{weighted['mean']:.1f}%", "")
+
+        # Average, Min, Max by Test
+        st.write("### 📈 Average, Min & Max Scores by Test")
+        summary_stats = store.test_summary(test_filter)
+
+        # Melt data for visualization (Average only for chart)
+        avg_scores_melted = (
+            summary_stats[["Test Name", "MCQ_mean", "SAQ_mean", "Total_mean"]]
+            .rename(columns={"MCQ_mean": "MCQ", "SAQ_mean": "SAQ", "Total_mean": "Total"})
+            .melt(id_vars="Test Name", var_name="Category", value_name="Average Score")
+        )
+
+        # Plotly chart: Average scores by Test
+        fig = px.bar(
+            avg_scores_melted,
+            x="Test Name",
+            y="Average Score",
+            color="Category",
+            barmode="group",
+            title="Average MCQ, SAQ, and Total Scores by Test",
+            labels={"Average Score": "Average Marks", "Test Name": "Test"},
+            color_discrete_sequence=px.colors.qualitative.Pastel
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Display summary table safely (format only numeric columns)
+        st.write("### 📋 Detailed Test Summary (Average, Min, Max)")
+        numeric_cols = summary_stats.select_dtypes(include=["float64", "int64"]).columns
+        st.dataframe(summary_stats.style.format(subset=numeric_cols, formatter="{:.1f}"))
 
-            except Exception as e:
-                st.error(f"Error reading uploaded file: {e}")
+    else:
+        st.info("📈 No test results yet. Please add some in the 'Test Performance' tab.")
+
+    # ------------------ Faculty Overview (all partitions) ------------------ #
+    st.markdown("---")
+    st.subheader("🏛️ Faculty Overview (all courses and cohorts)")
+    st.caption("Built on demand from each partition's dashboard summaries, one partition at a time.")
+    if st.button("Build Faculty Report", key="tab4_faculty_report"):
+        report = partitions.faculty_report()
+        if report.empty:
+            st.info("No course or cohort has any data yet.")
+        else:
+            numeric_cols = report.select_dtypes(include="float").columns
+            st.dataframe(report.style.format(subset=numeric_cols, formatter="{:.1f}", na_rep=""), hide_index=True)
+            st.download_button("⬇️ Download Faculty Report (CSV)", exports.frame_csv(report), "faculty_report.csv",
+                               "text/csv", on_click="ignore")
 
-    # -------------------------- TAB 6 - TEST PERFORMANCE -------------------------- #
-    with tab_test:
-        st.header("🧪 Test Student Performance")
-        st.markdown("---")
 
-        import os
+# -------------------------- TAB 5 - IMPORT STUDENTS -------------------------- #
+def render_import_students():
+    st.header("📂 Import Student Names (CSV or Excel)")
 
-        TEST_RESULTS_FILE = "test_results.csv"
+    uploaded_file = st.file_uploader("Upload Student Data File", type=["csv", "xlsx"], key="tab5_upload")
 
-        # Load student list if available
+    if uploaded_file is not None:
         try:
-            student_list = pd.read_csv("student_list.csv")
-            id_col, name_col = None, None
-            for c in student_list.columns:
-                if "id" in c.lower():
-                    id_col = c
-                if "name" in c.lower():
-                    name_col = c
-            student_list = student_list.astype(str).apply(lambda x: x.str.strip())
-        except FileNotFoundError:
-            student_list = None
-            id_col, name_col = None, None
+            # Only the Student ID and Name columns of the first rows are read here
+            st.success(f"✅ {uploaded_file.name} uploaded successfully!")
+            st.caption(f"Preview of the first {roster_import.PREVIEW_ROWS} rows (Student ID and Name only):")
+            st.dataframe(roster_import.preview(uploaded_file), hide_index=True)
+        except ValueError as e:
+            st.warning(f"⚠️ {e}")
+            return
+        except Exception as e:
+            st.error(f"Error reading uploaded file: {e}")
+            return
+
+        has_roster = data_store.file_signature(store.roster_file) is not None
+        mode = st.radio(
+            "Import mode",
+            ["Merge into the current student list", "Replace the current student list"],
+            key="tab5_mode", horizontal=True, disabled=not has_roster,
+            help="Merging updates the names of known Student IDs, adds new students and keeps everyone else.",
+        )
+        if st.button("📥 Import Students", key="tab5_import"):
+            bar = st.progress(0.0, text="Reading the file...")
+            try:
+                with profiling.section("Roster import"):
+                    students, issues, counts = roster_import.read(
+                        uploaded_file,
+                        on_progress=lambda done: bar.progress(done or 0.0, text="Reading and checking rows..."),
+                    )
+                    if students.empty:
+                        raise ValueError("No valid rows to import.")
+                    added, updated, total = roster_import.save(store, students, replace=mode.startswith("Replace"))
+            except ValueError as e:
+                st.warning(f"⚠️ {e}")
+                return
+            except Exception as e:
+                st.error(f"Error reading uploaded file: {e}")
+                return
+            bar.progress(1.0, text="Done")
+            st.success(f"Student list saved for future use: {added} added, {updated} renamed, {total} students in total.")
+            skipped = counts["rows"] - counts["valid"]
+            if skipped:
+                st.warning(
+                    f"⚠️ Skipped {skipped} of {counts['rows']} rows: {counts['missing ID']} without a Student ID, "
+                    f"{counts['missing name']} without a Name, {counts['duplicate ID']} repeating an earlier Student ID."
+                )
+                st.dataframe(issues, hide_index=True)
+                if skipped > len(issues):
+                    st.caption(f"Showing the first {len(issues)} skipped rows.")
+
+
+# -------------------------- TAB 6 - TEST PERFORMANCE -------------------------- #
+# Fragment: test configuration and score inputs rerun only this panel, so the
+# raw/scaled/weighted preview updates without a full app rerun.
+@st.fragment
+def test_entry_panel(test_name):
+    count_rerun("fragment")
+    with profiled("fragment", "Test Performance panel"), section_timer("Test Performance panel (fragment)"):
+        # Load student list if available
+        roster = data_store.load_roster_index(store.roster_file)
 
         col1, col2 = st.columns(2)
 
         with col1:
-            # Select test and student
-            predefined_tests = ["Test 1", "Test 2", "Midterm", "Final"]
-            test_choice = st.selectbox("Select Test Name", predefined_tests + ["Other"], key="tab6_test_choice")
-            if test_choice == "Other":
-                test_name = st.text_input("Enter Custom Test Name", key="tab6_custom_test")
-            else:
-                test_name = test_choice
-
-            if student_list is not None and name_col and id_col:
-                student_name = st.selectbox("Select Student Name", student_list[name_col].tolist(), key="tab6_student_name")
-                match = student_list.loc[student_list[name_col] == student_name, id_col]
-                student_id = match.values[0] if not match.empty else "N/A"
-                st.write(f"**Student ID:** {student_id}")
+            if roster is not None:
+                student_id, student_name = student_picker(roster, key="tab6_student")
             else:
                 student_id = st.text_input("Student ID", key="tab6_manual_id")
                 student_name = st.text_input("Student Name", key="tab6_manual_name")
@@ -626,9 +1022,9 @@ if check_password():
             mcq_score = st.number_input("MCQ Score", min_value=0.0, max_value=float(mcq_total), value=0.0, key="tab6_mcq_score")
             saq_score = st.number_input("Short Answer Score", min_value=0.0, max_value=float(saq_total), value=0.0, key="tab6_saq_score")
 
-            total_score_raw = mcq_score + saq_score
-            total_score_scaled = total_score_raw * scaling_factor
-            weighted_score = (total_score_scaled / desired_total) * test_weight
+            total_score_raw, total_score_scaled, weighted_score = automark.test_scores(
+                mcq_score, saq_score, mcq_total, saq_total, desired_total, test_weight
+            )
 
             st.markdown("---")
             st.write(f"**Raw Score:** {total_score_raw}/{mcq_total + saq_total}")
@@ -637,29 +1033,12 @@ if check_password():
 
         st.markdown("---")
 
-        # ------------------- ONE-TIME CLEANUP (optional) ------------------- #
-        # This removes old file with wrong columns — only runs once
-        if "tab6_reset_csv" not in st.session_state:
-            if os.path.exists(TEST_RESULTS_FILE):
-                os.remove(TEST_RESULTS_FILE)
-                st.warning("🧹 Old test_results.csv removed — new clean file will be created.")
-            st.session_state["tab6_reset_csv"] = True
-
         # ------------------- SAVE TEST RESULT ------------------- #
         if st.button("💾 Save Test Record"):
+            if student_id is None:
+                st.warning("⚠️ Please pick a student first.")
+                return
             try:
-                columns = [
-                    "Student ID", "Student Name", "Test Name",
-                    "MCQ", "SAQ", "Raw Score", "Scaled Score",
-                    "Weighted (%)", "Total"
-                ]
-
-                # Load existing data
-                if os.path.exists(TEST_RESULTS_FILE):
-                    df_existing = pd.read_csv(TEST_RESULTS_FILE)
-                else:
-                    df_existing = pd.DataFrame(columns=columns)
-
                 # Add new record
                 new_data = pd.DataFrame([{
                     "Student ID": student_id,
@@ -673,42 +1052,287 @@ if check_password():
                     "Total": desired_total
                 }])
 
-                # Combine and remove duplicates
-                df_combined = pd.concat([df_existing, new_data], ignore_index=True)
-                df_combined.drop_duplicates(subset=["Student ID", "Test Name"], keep="last", inplace=True)
+                # Append; duplicates are resolved (last wins) when the file is read
+                store.append_test_results(new_data)
+            except Exception as e:
+                st.error(f"❌ Error saving result: {e}")
+            else:
+                # Full rerun so the saved results table below picks up the new row
+                st.session_state["tab6_flash"] = f"✅ Test result saved for {student_name} in {test_name}."
+                st.rerun()
+
+
+# Fragment: auto-marks a whole MCQ response sheet against an answer key
+@st.fragment
+def automark_panel(test_name):
+    count_rerun("fragment")
+    with profiled("fragment", "Auto-mark panel"), section_timer("Auto-mark panel (fragment)"):
+        st.caption("Answer key: Question and Answer columns, optional Weight (default 1 mark). "
+                   "Response sheet: one row per student with Student ID, optional Name, and one column per question.")
+        col1, col2 = st.columns(2)
+        with col1:
+            key_file = st.file_uploader("Upload Answer Key", type=["csv", "xlsx"], key="tab6_auto_key")
+        with col2:
+            sheet_file = st.file_uploader("Upload Response Sheet", type=["csv", "xlsx"], key="tab6_auto_sheet")
+        if key_file is None or sheet_file is None:
+            return
 
-                # Save to CSV
-                df_combined.to_csv(TEST_RESULTS_FILE, index=False)
-                st.success(f"✅ Test result saved for {student_name} in {test_name}.")
+        try:
+            key = automark.parse_key(automark.read_upload(key_file))
+            responses = automark.read_upload(sheet_file)
+        except Exception as e:
+            st.error(f"Error reading uploaded file: {e}")
+            return
+
+        # Same configuration as a manual entry; the MCQ total comes from the key
+        mcq_total = float(key["Weight"].sum())
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("### ⚙️ Test Configuration")
+            st.write(f"**Total MCQ Marks:** {mcq_total:g} ({len(key)} questions)")
+            saq_total = st.number_input("Total Short Answer Marks", min_value=0,
+                                        value=st.session_state.get("tab6_saq_total", 30), step=1, key="tab6_auto_saq_total")
+            desired_total = st.number_input("Desired Total Marks (e.g., 100)", min_value=10,
+                                            value=st.session_state.get("tab6_desired_total", 100), step=10,
+                                            key="tab6_auto_desired_total")
+            test_weight = st.number_input("Test Weightage (%)", min_value=0.0,
+                                          value=st.session_state.get("tab6_weight", 10.0), step=0.5, key="tab6_auto_weight")
+        with col2:
+            st.markdown("### ➖ Negative Marking")
+            negative = st.number_input("Marks lost per wrong answer (fraction of the question's weight)",
+                                       min_value=0.0, max_value=1.0, value=0.0, step=0.25, key="tab6_auto_negative")
+            st.caption("Blank answers never lose marks, and no student's MCQ mark goes below 0.")
 
+        try:
+            marks, correct, chosen = automark.mark(responses, key, negative)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if marks.empty:
+            st.warning("⚠️ The response sheet has no students.")
+            return
+
+        # Names from the imported roster when the sheet has none
+        roster = data_store.load_roster_index(store.roster_file)
+        if roster is not None:
+            marks["Name"] = marks["Name"].fillna(marks["Student ID"].map(roster.name))
+            unknown = int(marks["Student ID"].map(roster.get).isna().sum())
+            if unknown:
+                st.warning(f"⚠️ {unknown} Student ID(s) on the sheet are not on the imported student list.")
+        if marks["Student ID"].duplicated().any():
+            st.warning("⚠️ Some Student IDs appear more than once; the last row for each is saved.")
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Students", len(marks))
+        col2.metric("MCQ (Avg)", f"{marks['MCQ'].mean():.1f}", f"Min: {marks['MCQ'].min():g} | Max: {marks['MCQ'].max():g}")
+        col3.metric("Questions", len(key))
+        col4.metric("Blank Answers", int(marks["Blank"].sum()))
+
+        st.write("### 🧾 Marks")
+        st.dataframe(marks, hide_index=True)
+
+        st.write("### 📐 Item Statistics")
+        items = automark.item_statistics(key, correct, chosen)
+        flagged = int((items["Flag"] != "").sum())
+        st.caption(f"Difficulty = share answering correctly; Discrimination = top 27% minus bottom 27%. "
+                   f"{flagged} question(s) flagged for review.")
+        st.dataframe(items, hide_index=True)
+        st.download_button("⬇️ Download Item Statistics (CSV)", exports.frame_csv(items), "item_statistics.csv",
+                           "text/csv", on_click="ignore")
+
+        if st.button(f"💾 Save MCQ Marks for {len(marks)} Students", key="tab6_auto_save"):
+            if not test_name:
+                st.warning("⚠️ Please enter a test name first.")
+                return
+            saved = store.query_test_results(test_name) if store.has_test_results() else None
+            rows = automark.test_rows(marks, test_name, mcq_total, saq_total, desired_total, test_weight, saved)
+            store.append_test_results(rows.drop_duplicates("Student ID", keep="last"))
+            st.session_state["tab6_flash"] = f"✅ MCQ marks saved for {len(rows)} students in {test_name}."
+            st.rerun()
+
+
+def render_test_performance():
+    st.header("🧪 Test Student Performance")
+    st.markdown("---")
+
+    flash = st.session_state.pop("tab6_flash", None)
+    if flash:
+        st.success(flash)
+
+    # Select test (outside the fragment: the saved results below follow it)
+    predefined_tests = ["Test 1", "Test 2", "Midterm", "Final"]
+    test_choice = st.selectbox("Select Test Name", predefined_tests + ["Other"], key="tab6_test_choice")
+    if test_choice == "Other":
+        test_name = st.text_input("Enter Custom Test Name", key="tab6_custom_test")
+    else:
+        test_name = test_choice
+
+    # ------------------- ONE-TIME CLEANUP (optional) ------------------- #
+    # This removes old file with wrong columns — only runs once
+    if "tab6_reset_csv" not in st.session_state:
+        if store.drop_stale_test_results():
+            st.warning("🧹 Old test_results.csv removed — new clean file will be created.")
+        st.session_state["tab6_reset_csv"] = True
+
+    mode = st.radio("Entry Mode", ["Manual entry", "Auto-mark MCQ from answer sheets"],
+                    horizontal=True, key="tab6_mode")
+    if mode == "Manual entry":
+        test_entry_panel(test_name)
+    else:
+        automark_panel(test_name)
+
+    # ------------------- DISPLAY AND DELETE ------------------- #
+    if store.has_test_results():
+        st.subheader("📊 Saved Test Results")
+
+        # Filter by test
+        df_filtered = store.query_test_results(test_name)
+        st.dataframe(df_filtered)
+
+        # Delete record section
+        st.markdown("### ❌ Delete Student Test Record")
+        # By Record ID: two students can share a name
+        labels = dict(zip(
+            df_filtered[data_store.RECORD_ID],
+            df_filtered["Student Name"].astype(str) + " (" + df_filtered["Student ID"].astype(str) + ")",
+        ))
+        del_record = st.selectbox(
+            "Select Student to Delete", list(labels), format_func=labels.get, key="tab6_delete_student"
+        )
+
+        if st.button("🗑️ Delete Selected Record") and del_record is not None:
+            try:
+                store.delete_test_records([del_record])
+                st.success(f"✅ Deleted record for **{labels[del_record]}** in **{test_name}**.")
             except Exception as e:
-                st.error(f"❌ Error saving result: {e}")
+                st.error(f"Error deleting record: {e}")
+    else:
+        st.info("No saved test results yet.")
+
+
+# -------------------------- TAB 7 - GRADEBOOK -------------------------- #
+def gradebook_settings(weights, config):
+    """Weights, missing-work policy and dropped tutorials; returns the settings to apply."""
+    with st.expander("⚖️ Weights and Missing Work"):
+        rows = pd.DataFrame([{"Source": s, "Component": c, "Weight": w} for (s, c), w in weights.items()])
+        edited = st.data_editor(
+            rows, disabled=["Source", "Component"], hide_index=True, key="tab7_weights",
+            column_config={"Weight": st.column_config.NumberColumn(min_value=0.0, step=0.5, format="%g")},
+        )
+        edited["Weight"] = edited["Weight"].fillna(0.0)
+        st.caption(f"Weights are relative (they add up to {edited['Weight'].sum():g}). Test weights default to the "
+                   "weight entered when marking; tutorials share the rest of 100.")
+        policies = list(gradebook.MISSING_POLICIES)
+        policy = st.radio("Missing work", policies, index=policies.index(config.get("policy", "zero")),
+                          format_func=gradebook.MISSING_POLICIES.get, horizontal=True, key="tab7_policy")
+        tutorials = int((rows["Source"] == gradebook.TUTORIAL).sum()) if len(rows) else 0
+        drop_lowest = st.number_input(
+            "Drop each student's lowest tutorial marks", min_value=0, max_value=max(tutorials - 1, 0),
+            value=min(int(config.get("drop_lowest", 0)), max(tutorials - 1, 0)), step=1, key="tab7_drop_lowest",
+        )
+        settings = {"weights": edited.to_dict("records"), "policy": policy, "drop_lowest": int(drop_lowest)}
+        if st.button("💾 Save Weights", key="tab7_save"):
+            gradebook.save_config(store, settings)
+            st.success("✅ Gradebook settings saved for this course.")
+    return settings
+
+
+def render_gradebook():
+    import plotly.express as px
+
+    st.header("🎓 Final Course Gradebook")
+    st.caption("Tutorial marks and test results combined into one weighted final grade per student.")
+    if not store.has_scores() and not store.has_test_results():
+        st.info("No saved marks or test results yet.")
+        return
+
+    with profiling.section("Gradebook (matrix)"):
+        matrix, _, _ = gradebook.matrix(store)
+    if matrix.empty:
+        st.info("No saved marks or test results yet.")
+        return
+    config = gradebook.load_config(store)
+    settings = gradebook_settings(gradebook.effective_weights(store, matrix.columns, config), config)
+    with profiling.section("Gradebook (grades)"):
+        table, _, recomputed = gradebook.gradebook(store, settings)
+
+    final = table["Final (%)"]
+    cols = st.columns(4)
+    cols[0].metric("Students", len(table))
+    cols[1].metric("Class Average", f"{final.mean():.1f}%")
+    cols[2].metric("Highest", f"{final.max():.1f}%")
+    cols[3].metric("Lowest", f"{final.min():.1f}%")
+    if recomputed < len(table):
+        st.caption(f"Recomputed {recomputed} of {len(table)} students for the latest data; "
+                   "the rest came from the cached gradebook.")
+
+    letters = [letter for letter, _ in grading.GRADE_BANDS]
+    counts = table["Grade"].value_counts().reindex(letters, fill_value=0)
+    fig = px.bar(x=counts.index, y=counts.to_numpy(), labels={"x": "Grade", "y": "Students"},
+                 title="Final Grade Distribution")
+    st.plotly_chart(fig)
+
+    paged_table(tables.TableView(table), "tab7_gradebook", filters=["Grade"])
+    st.download_button("⬇️ Download Gradebook (CSV)", exports.frame_csv(table), "gradebook.csv", "text/csv",
+                       on_click="ignore", key="tab7_download")
 
-        # ------------------- DISPLAY AND DELETE ------------------- #
-        if os.path.exists(TEST_RESULTS_FILE):
-            st.subheader("📊 Saved Test Results")
-            df_display = pd.read_csv(TEST_RESULTS_FILE)
-
-            # Filter by test
-            df_filtered = df_display[df_display["Test Name"] == test_name]
-            st.dataframe(df_filtered)
-
-            # Delete record section
-            st.markdown("### ❌ Delete Student Test Record")
-            del_student = st.selectbox(
-                "Select Student to Delete",
-                df_filtered["Student Name"].unique() if not df_filtered.empty else [],
-                key="tab6_delete_student"
-            )
 
-            if st.button("🗑️ Delete Selected Record"):
-                try:
-                    df_display = df_display[
-                        ~((df_display["Student Name"] == del_student) & (df_display["Test Name"] == test_name))
-                    ]
-                    df_display.to_csv(TEST_RESULTS_FILE, index=False)
-                    st.success(f"✅ Deleted record for **{del_student}** in **{test_name}**.")
-                except Exception as e:
-                    st.error(f"Error deleting record: {e}")
+# -------------------------- APP START -------------------------- #
+SECTIONS = {
+    "Rubric Reference": render_rubric,
+    "Marks Entry": render_marks_entry,
+    "Student Scores": render_student_scores,
+    "Dashboard": render_dashboard,
+    "Import Students": render_import_students,
+    "Test Performance": render_test_performance,
+    "Gradebook": render_gradebook,
+}
+
+# "sidebar" (default) renders only the section picked in the sidebar;
+# "tabs" renders every section on every rerun inside st.tabs.
+NAVIGATION = os.environ.get("GRADING_NAVIGATION", "sidebar").lower()
+
+if check_password():
+    st.title("📊 Grading Application")
+    st.write("Secure grading system with tutorial **numerical rubric scoring** (0–4 per criterion) and for test advancement analysis .")
+
+    # -------------------------- SIDEBAR NAVIGATION -------------------------- #
+    st.sidebar.title("📚 Navigation")
+    partition = partition_sidebar()
+    st.sidebar.text_input("🧑‍🏫 Grader", key="grader", placeholder="Your name",
+                          help="Saved with every mark you enter, so the rubric analysis can compare graders.")
+
+    # Scores/test results backend for the active partition (CSV files by default, SQLite if configured)
+    store = data_store.backend(partition)
+    if partition:
+        st.caption(f"🏫 Working in **{partitions.label(partition)}**")
+
+    # Define sidebar radio buttons (shortcuts to tabs)
+    selected_tab = st.sidebar.radio("Jump to:", list(SECTIONS), key="selected_tab")
+    st.sidebar.checkbox(
+        "🔬 Profiling", value=profiling.ENABLED, key="profiling",
+        help="Time every section, file read/write and export on each rerun and log it to " + profiling.LOG_FILE,
+    )
+
+    # -------------------------- SECTIONS -------------------------- #
+    count_rerun("app")
+    st.session_state["section_timings"] = {}
+    with profiled("app", selected_tab if NAVIGATION != "tabs" else "all tabs") as recorder:
+        if NAVIGATION == "tabs":
+            for name, tab in zip(SECTIONS, st.tabs(list(SECTIONS))):
+                with tab, section_timer(name):
+                    SECTIONS[name]()
         else:
-            st.info("No saved test results yet.")
+            # Only the selected section's code runs on this rerun
+            with section_timer(selected_tab):
+                SECTIONS[selected_tab]()
+
+    # Render times for this rerun (fragment reruns update their own entries)
+    with st.sidebar:
+        st.markdown("---")
+        for name, ms in st.session_state["section_timings"].items():
+            st.caption(f"⏱️ {name}: {ms:.0f} ms")
+        counts = st.session_state["rerun_counts"]
+        st.caption(f"🔁 Reruns this session: {counts['app']} app · {counts['fragment']} fragment")
+    if recorder is not None:
+        render_profile(recorder)
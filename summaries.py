@@ -0,0 +1,468 @@
+# summaries.py
+# Running dashboard aggregates, kept up to date by every write.
+#
+# The dashboard's grade counts, per-student averages, top/bottom performers
+# and per-test mean/min/max used to be recomputed from every row on every
+# rerun. Summaries keeps them per assessment and per test in a small JSON
+# sidecar next to the data: row count, count/sum/sum of squares/min/max,
+# grade counts, per-student sums and a bounded top/bottom-k list. Each save
+# or delete folds in only the rows it added or removed, so the dashboard
+# reads O(#assessments) data. A removal that takes out a group's min/max or
+# a top-k entry recomputes just that group from its rows.
+#
+# The sidecar records the data signature it describes (file signatures for
+# CSV, the data version for SQLite). If the data changed behind its back
+# (edited by hand, an interrupted write) it is rebuilt from scratch on the
+# next read.
+#
+#     python summaries.py rebuild
+#     python summaries.py check
+import json
+import math
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+import coordinator
+import data_store
+import profiling
+
+SUMMARY_FILE = "summaries.json"
+TEST_METRICS = ["MCQ", "SAQ", "Total", "Weighted (%)"]
+
+# Length of the top/bottom lists kept per assessment
+TOP_K = 10
+
+
+# -------------------------- RUNNING STATS -------------------------- #
+def _empty_stats():
+    return {"count": 0, "sum": 0.0, "sumsq": 0.0, "min": None, "max": None}
+
+
+def _fold_stats(stats, values, sign):
+    """Add values to stats (sign=1) or take them out (sign=-1).
+
+    Returns False when a removed value was the min or max, which the
+    remaining values cannot tell us; the group then has to be recomputed.
+    """
+    v = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=float)
+    if not len(v):
+        return True
+    stats["count"] += sign * len(v)
+    stats["sum"] += sign * float(v.sum())
+    stats["sumsq"] += sign * float((v * v).sum())
+    if sign > 0:
+        lo, hi = float(v.min()), float(v.max())
+        stats["min"] = lo if stats["min"] is None else min(stats["min"], lo)
+        stats["max"] = hi if stats["max"] is None else max(stats["max"], hi)
+        return True
+    if stats["count"] <= 0:
+        stats.update(_empty_stats())
+        return True
+    return v.min() > stats["min"] and v.max() < stats["max"]
+
+
+def merge_stats(parts):
+    """Combine several stats dicts, adding mean and (population) std."""
+    count = sum(p["count"] for p in parts)
+    merged = {"count": count, "mean": None, "std": None, "min": None, "max": None}
+    if count:
+        total = sum(p["sum"] for p in parts)
+        mean = total / count
+        variance = max(sum(p["sumsq"] for p in parts) / count - mean * mean, 0.0)
+        merged.update(
+            mean=mean,
+            std=math.sqrt(variance),
+            min=min(p["min"] for p in parts if p["count"]),
+            max=max(p["max"] for p in parts if p["count"]),
+        )
+    return merged
+
+
+def _bump(counts, key, n):
+    counts[key] = counts.get(key, 0) + n
+    if counts[key] <= 0:
+        del counts[key]
+
+
+# -------------------------- GROUPS -------------------------- #
+def _empty_scores():
+    return {"rows": 0, "stats": _empty_stats(), "grades": {}, "students": {}, "top": [], "bottom": []}
+
+
+def _ranked(entries, largest):
+    entries.sort(key=lambda e: e[0], reverse=largest)
+    return entries[:TOP_K]
+
+
+def _fold_scores(group, rows, sign):
+    """Add score rows to (sign=1) or remove them from (sign=-1) one assessment."""
+    pct = pd.to_numeric(rows["Percentage"], errors="coerce")
+    group["rows"] += sign * len(rows)
+    exact = _fold_stats(group["stats"], pct, sign)
+
+    for grade, n in rows["Grade"].dropna().astype(str).value_counts().items():
+        _bump(group["grades"], grade, sign * int(n))
+
+    by_name = pd.DataFrame({"Name": rows["Name"], "p": pct}).dropna().groupby("Name", observed=True)["p"].agg(["sum", "count"])
+    for name, total, count in zip(by_name.index, by_name["sum"], by_name["count"]):
+        entry = group["students"].setdefault(str(name), [0.0, 0])
+        entry[0] += sign * float(total)
+        entry[1] += sign * int(count)
+        if entry[1] <= 0:
+            del group["students"][str(name)]
+
+    ranked = pd.DataFrame({"p": pct, "id": rows["Student ID"].astype(str), "name": rows["Name"].astype(str)}).dropna()
+    if sign < 0:
+        # A removed top/bottom entry leaves a gap only the full group can fill
+        listed = {e[1] for e in group["top"] + group["bottom"]}
+        return exact and listed.isdisjoint(ranked["id"])
+    for side, largest in (("top", True), ("bottom", False)):
+        best = ranked.nlargest(TOP_K, "p") if largest else ranked.nsmallest(TOP_K, "p")
+        group[side] = _ranked(group[side] + best[["p", "id", "name"]].values.tolist(), largest)
+    return exact
+
+
+def _empty_tests():
+    return {"rows": 0, "metrics": {m: _empty_stats() for m in TEST_METRICS}}
+
+
+def _fold_tests(group, rows, sign):
+    """Add test rows to (sign=1) or remove them from (sign=-1) one test."""
+    group["rows"] += sign * len(rows)
+    exact = True
+    for m in TEST_METRICS:
+        if m in rows.columns:
+            exact = _fold_stats(group["metrics"][m], rows[m], sign) and exact
+    return exact
+
+
+_KINDS = {
+    "scores": ("Assessment", _empty_scores, _fold_scores),
+    "tests": ("Test Name", _empty_tests, _fold_tests),
+}
+
+
+def build_groups(kind, df):
+    """Aggregates for every group in df, from scratch."""
+    column, empty, fold = _KINDS[kind]
+    groups = {}
+    if df is None or df.empty or column not in df.columns:
+        return groups
+    for key, rows in df.groupby(column, sort=False, observed=True):
+        group = empty()
+        fold(group, rows, 1)
+        groups[str(key)] = group
+    return groups
+
+
+def _apply(kind, groups, removed, added):
+    """Fold removed and added rows into groups; returns keys needing a recompute."""
+    column, empty, fold = _KINDS[kind]
+    dirty = set()
+    for sign, rows in ((-1, removed), (1, added)):
+        if rows is None or rows.empty or column not in rows.columns:
+            continue
+        for key, part in rows.groupby(column, sort=False, observed=True):
+            key = str(key)
+            group = groups.setdefault(key, empty())
+            if not fold(group, part, sign):
+                dirty.add(key)
+            if group["rows"] <= 0:
+                del groups[key]
+                dirty.discard(key)
+    return dirty
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _read_json(path, signature):
+    # signature is only part of the cache key; it changes whenever the file does.
+    # Shared without copying: readers must not mutate it (updating() copies).
+    with profiling.io("read", path), open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# -------------------------- SUMMARY STORE -------------------------- #
+class _Update:
+    """Changes recorded by one write, applied when Summaries.updating() exits."""
+
+    def __init__(self, state):
+        self.state = state
+        self.dirty = {"scores": set(), "tests": set()}
+
+    def scores(self, removed, added):
+        if added is not None:
+            added = added.drop_duplicates(subset=list(data_store.SCORE_KEYS), keep="last")
+        self.dirty["scores"] |= _apply("scores", self.state["scores"], removed, added)
+
+    def tests(self, removed, added):
+        if added is not None:
+            added = added.drop_duplicates(subset=list(data_store.TEST_KEYS), keep="last")
+        self.dirty["tests"] |= _apply("tests", self.state["tests"], removed, added)
+
+    def replace_scores(self, df):
+        self.state["scores"] = build_groups("scores", df)
+        self.dirty["scores"].clear()
+
+    def replace_tests(self, df):
+        self.state["tests"] = build_groups("tests", df)
+        self.dirty["tests"].clear()
+
+
+class Summaries:
+    """Dashboard aggregates for one backend, stored in a JSON sidecar.
+
+    The backend must provide data_signature(), has_scores(),
+    has_test_results(), load_scores(), load_test_results(), query_scores()
+    and query_test_results().
+    """
+
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+
+    # ---- persistence ----
+    def _saved(self):
+        signature = data_store.file_signature(self.path)
+        if signature is None:
+            return None
+        try:
+            return _read_json(self.path, signature)
+        except ValueError:
+            return None
+
+    def _write(self, state):
+        # dumps() uses the C encoder; dump() to a file does not
+        text = json.dumps(state)
+
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        with profiling.io("write", self.path):
+            coordinator.atomic_write(self.path, write)
+
+    def _full_data(self):
+        scores = self.store.load_scores() if self.store.has_scores() else None
+        tests = self.store.load_test_results() if self.store.has_test_results() else None
+        return scores, tests
+
+    @profiling.timed("summaries.rebuild")
+    def rebuild(self):
+        """Recompute every summary from the full data and save it."""
+        # Signature first: if a write lands while we read, the saved
+        # summaries look stale and get rebuilt again, rather than the reverse
+        signature = _jsonable(self.store.data_signature())
+        scores, tests = self._full_data()
+        state = {
+            "signature": signature,
+            "scores": build_groups("scores", scores),
+            "tests": build_groups("tests", tests),
+        }
+        self._write(state)
+        return state
+
+    def state(self):
+        """Current summaries, rebuilt first if they no longer match the data."""
+        state = self._saved()
+        if state is None or state.get("signature") != _jsonable(self.store.data_signature()):
+            state = self.rebuild()
+        return state
+
+    @contextmanager
+    def updating(self):
+        """Wrap a write: record its removed/added rows on the yielded object.
+
+        Nothing is saved if the write raises; the stale signature then makes
+        the next read rebuild from scratch.
+        """
+        update = _Update(_jsonable(self.state()))
+        yield update
+        for key in update.dirty["scores"]:
+            rows = self.store.query_scores(assessment=key)
+            update.state["scores"].update(build_groups("scores", rows))
+            if rows.empty:
+                update.state["scores"].pop(key, None)
+        for key in update.dirty["tests"]:
+            rows = self.store.query_test_results(test_name=key)
+            update.state["tests"].update(build_groups("tests", rows))
+            if rows.empty:
+                update.state["tests"].pop(key, None)
+        update.state["signature"] = _jsonable(self.store.data_signature())
+        self._write(update.state)
+
+    def check(self):
+        """Compare the saved summaries with a full recompute.
+
+        Returns a list of differences (empty when consistent).
+        """
+        saved = self._saved()
+        if saved is None:
+            return ["no summaries saved yet"]
+        problems = []
+        if saved.get("signature") != _jsonable(self.store.data_signature()):
+            problems.append("signature does not match the data (stale)")
+        scores, tests = self._full_data()
+        for kind, df in (("scores", scores), ("tests", tests)):
+            problems += _diff(kind, saved.get(kind, {}), build_groups(kind, df))
+        return problems
+
+    # ---- tutorial scores ----
+    def _score_groups(self, assessment=None):
+        groups = self.state()["scores"]
+        if assessment is None:
+            return list(groups.values())
+        return [groups[assessment]] if assessment in groups else []
+
+    def assessments(self):
+        return list(self.state()["scores"])
+
+    def student_names(self):
+        return list(dict.fromkeys(name for g in self._score_groups() for name in g["students"]))
+
+    def count_scores(self, assessment=None):
+        return sum(g["rows"] for g in self._score_groups(assessment))
+
+    def score_stats(self, assessment=None):
+        """count/mean/std/min/max of Percentage."""
+        return merge_stats([g["stats"] for g in self._score_groups(assessment)])
+
+    def assessment_summary(self):
+        """One row per assessment: row count, Percentage stats and grade counts."""
+        records = []
+        for name, g in self.state()["scores"].items():
+            stats = merge_stats([g["stats"]])
+            record = {"Assessment": name, "Records": g["rows"]}
+            for stat in ("mean", "std", "min", "max"):
+                record[f"Percentage_{stat}"] = stats[stat]
+            record.update({f"Grade {grade}": n for grade, n in sorted(g["grades"].items())})
+            records.append(record)
+        return pd.DataFrame(records)
+
+    def grade_counts(self, assessment=None):
+        counts = {}
+        for g in self._score_groups(assessment):
+            for grade, n in g["grades"].items():
+                _bump(counts, grade, n)
+        df = pd.DataFrame(list(counts.items()), columns=["Grade", "Count"])
+        return df.sort_values("Count", ascending=False, kind="stable").reset_index(drop=True)
+
+    def average_by_student(self, assessment=None):
+        sums = {}
+        for g in self._score_groups(assessment):
+            for name, (total, count) in g["students"].items():
+                entry = sums.setdefault(name, [0.0, 0])
+                entry[0] += total
+                entry[1] += count
+        df = pd.DataFrame(
+            [(name, total / count) for name, (total, count) in sums.items()],
+            columns=["Name", "Percentage"],
+        )
+        return df.sort_values("Name").reset_index(drop=True)
+
+    def top_scores(self, n, assessment=None, largest=True):
+        if n > TOP_K:
+            # Longer than the kept lists; fall back to the rows themselves
+            return data_store.FrameScores(self.store.query_scores(assessment)).top_scores(n, None, largest)
+        side = "top" if largest else "bottom"
+        entries = [e for g in self._score_groups(assessment) for e in g[side]]
+        entries.sort(key=lambda e: e[0], reverse=largest)
+        return pd.DataFrame(
+            [(sid, name, p) for p, sid, name in entries[:n]],
+            columns=["Student ID", "Name", "Percentage"],
+        )
+
+    # ---- test results ----
+    def _test_groups(self, test_name=None):
+        groups = self.state()["tests"]
+        if test_name is None:
+            return groups
+        return {test_name: groups[test_name]} if test_name in groups else {}
+
+    def test_names(self):
+        return list(self.state()["tests"])
+
+    def test_overall(self, test_name=None):
+        """{metric: count/mean/std/min/max} over one test or all tests."""
+        groups = self._test_groups(test_name).values()
+        return {m: merge_stats([g["metrics"][m] for g in groups]) for m in TEST_METRICS}
+
+    def test_summary(self, test_name=None):
+        """One row per test with <metric>_mean, _min and _max columns."""
+        records = []
+        for name, g in self._test_groups(test_name).items():
+            record = {"Test Name": name}
+            for m in TEST_METRICS:
+                stats = merge_stats([g["metrics"][m]])
+                for stat in ("mean", "min", "max"):
+                    record[f"{m}_{stat}"] = stats[stat]
+            records.append(record)
+        columns = ["Test Name"] + [f"{m}_{stat}" for m in TEST_METRICS for stat in ("mean", "min", "max")]
+        return pd.DataFrame(records, columns=columns)
+
+
+# -------------------------- CONSISTENCY CHECK -------------------------- #
+def _close(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def _diff_stats(where, saved, fresh):
+    problems = []
+    for field in ("count", "sum", "sumsq", "min", "max"):
+        if not _close(saved[field], fresh[field]):
+            problems.append(f"{where} {field}: saved {saved[field]}, recomputed {fresh[field]}")
+    return problems
+
+
+def _diff(kind, saved, fresh):
+    problems = []
+    for key in saved.keys() - fresh.keys():
+        problems.append(f"{kind}[{key}]: saved but has no rows")
+    for key in fresh.keys() - saved.keys():
+        problems.append(f"{kind}[{key}]: missing from summaries")
+    for key in saved.keys() & fresh.keys():
+        s, f, where = saved[key], fresh[key], f"{kind}[{key}]"
+        if s["rows"] != f["rows"]:
+            problems.append(f"{where} rows: saved {s['rows']}, recomputed {f['rows']}")
+        if kind == "tests":
+            for m in TEST_METRICS:
+                problems += _diff_stats(f"{where}.{m}", s["metrics"][m], f["metrics"][m])
+            continue
+        problems += _diff_stats(where, s["stats"], f["stats"])
+        if s["grades"] != f["grades"]:
+            problems.append(f"{where} grades: saved {s['grades']}, recomputed {f['grades']}")
+        if s["students"].keys() != f["students"].keys() or not all(
+            _close(s["students"][n][0], f["students"][n][0]) and s["students"][n][1] == f["students"][n][1]
+            for n in f["students"]
+        ):
+            problems.append(f"{where} per-student sums differ")
+        for side in ("top", "bottom"):
+            saved_p, fresh_p = [e[0] for e in s[side]], [e[0] for e in f[side]]
+            if len(saved_p) != len(fresh_p) or not all(map(_close, saved_p, fresh_p)):
+                problems.append(f"{where} {side}-{TOP_K}: saved {saved_p}, recomputed {fresh_p}")
+    return problems
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = data_store.backend()
+    if sys.argv[1:] == ["rebuild"]:
+        state = store.summaries.rebuild()
+        print(f"{store.name}: rebuilt summaries for {len(state['scores'])} assessment(s) "
+              f"and {len(state['tests'])} test(s) in {store.summaries.path}")
+    elif sys.argv[1:] == ["check"]:
+        problems = store.summaries.check()
+        for problem in problems:
+            print(problem)
+        print(f"{store.name}: summaries {'consistent' if not problems else 'INCONSISTENT'}")
+        sys.exit(1 if problems else 0)
+    else:
+        print("usage: python summaries.py rebuild|check")
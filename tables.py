@@ -0,0 +1,143 @@
+# tables.py
+# Server-side paging, sorting and filtering for the Student Scores tab.
+#
+# st.dataframe serializes every row it is given and sends it to the browser.
+# A TableView keeps the whole table on the server instead. Only the requested
+# page is sliced out and displayed. A view is built once per data version
+# (scores_view/roster_view cache it with st.cache_resource on the data
+# signature) and shared read-only between sessions. Everything derived from
+# the rows is computed on first use and kept on the view until the data
+# changes:
+#   - a lower-cased search text per row (Student ID, Name, Assessment),
+#   - one sort order per column and direction,
+#   - the summary statistics.
+# The record pickers search the same text and return at most PICKER_LIMIT
+# matches, so a selectbox never holds the whole table.
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import data_store
+
+PAGE_SIZES = [25, 50, 100, 250]
+# Upper bound on records offered by a picker
+PICKER_LIMIT = 100
+# Columns matched by the search box, when present
+SEARCH_COLUMNS = ["Student ID", "Name", "Assessment"]
+# Left out of the summary statistics: free text and per-row IDs
+SUMMARY_SKIP = ["Feedback", data_store.RECORD_ID]
+
+
+class TableView:
+    """Filter/sort/page a read-only frame without copying it per rerun."""
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._search_text = None
+        self._summary = None
+
+    def __len__(self):
+        return len(self.df)
+
+    # ---- search ---- #
+    def search_text(self):
+        if self._search_text is None:
+            columns = [c for c in SEARCH_COLUMNS if c in self.df.columns] or list(self.df.columns[:2])
+            text = self.df[columns[0]].astype("str")
+            for column in columns[1:]:
+                text = text + " " + self.df[column].astype("str")
+            self._search_text = text.str.lower()
+        return self._search_text
+
+    def matches(self, query):
+        """Boolean mask of rows containing every word of query (any case)."""
+        mask = np.ones(len(self.df), dtype=bool)
+        for word in str(query or "").lower().split():
+            mask &= self.search_text().str.contains(word, regex=False).to_numpy(dtype=bool)
+        return mask
+
+    # ---- sort, filter, page ---- #
+    def order(self, column=None, ascending=True):
+        """Row positions sorted by column (stable, missing values last)."""
+        if column is None:
+            return np.arange(len(self.df))
+        key = (column, ascending)
+        with self._lock:
+            if key not in self._orders:
+                values = self.df[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    # Category codes follow category order, not the values
+                    values = values.astype("str")
+                self._orders[key] = values.sort_values(
+                    ascending=ascending, kind="stable", na_position="last"
+                ).index.to_numpy()
+            return self._orders[key]
+
+    def select(self, query="", filters=None, sort_by=None, ascending=True):
+        """Positions of the matching rows, in display order."""
+        mask = self.matches(query)
+        for column, allowed in (filters or {}).items():
+            if allowed:
+                mask &= self.df[column].astype("str").isin([str(v) for v in allowed]).to_numpy()
+        order = self.order(sort_by, ascending)
+        return order[mask[order]]
+
+    def page(self, positions, page, size):
+        """Rows of page (1-based) of the selection."""
+        start = (page - 1) * size
+        return self.df.iloc[positions[start:start + size]]
+
+    def values(self, column):
+        """Sorted distinct values of column, for filter widgets."""
+        return sorted(self.df[column].dropna().astype("str").unique())
+
+    # ---- pickers ---- #
+    def search(self, query, column, limit=PICKER_LIMIT):
+        """Distinct values of column on matching rows: (first limit, total)."""
+        found = self.df.loc[self.matches(query), column].dropna().astype("str").unique()
+        return list(found[:limit]), len(found)
+
+    def rows_for(self, column, values):
+        return self.df[self.df[column].astype("str").isin([str(v) for v in values])]
+
+    # ---- statistics ---- #
+    def summary(self):
+        """(numeric, text) describe() tables, computed once per data version."""
+        with self._lock:
+            if self._summary is None:
+                df = self.df.drop(columns=[c for c in SUMMARY_SKIP if c in self.df.columns])
+                # Student IDs are labels even when they look like numbers
+                numeric = df.select_dtypes("number").drop(columns=["Student ID"], errors="ignore")
+                text = df.drop(columns=numeric.columns)
+                self._summary = (
+                    numeric.describe() if len(numeric.columns) else None,
+                    # One row per column, so each statistic keeps a single type
+                    text.astype("str").describe().T.infer_objects() if len(text.columns) else None,
+                )
+            return self._summary
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _scores_view(_store, name, partition, signature):
+    # name, partition and signature are the cache key; _store is not hashed
+    scores = _store.load_scores()
+    return TableView(scores[[c for c in [*data_store.SCORE_COLUMNS, data_store.GRADER, data_store.RECORD_ID] if c in scores.columns]])
+
+
+def scores_view(store):
+    """TableView of the saved scores (raises FileNotFoundError when there are none)."""
+    return _scores_view(store, store.name, store.partition, store.scores_version())
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _roster_view(path, signature):
+    return TableView(data_store.load_student_list(path))
+
+
+def roster_view(path):
+    """TableView of the imported student list."""
+    return _roster_view(path, data_store.file_signature(path))